@@ -0,0 +1,96 @@
+"""Replay harness for continuous capture: feed WAV files through the VAD endpointer.
+
+Reports every detected utterance, the endpointing delay (end of speech to
+decision) and the processing cost, next to the fixed per-turn overhead of the
+old listen() (0.6 s ambient calibration + 0.8 s pause threshold).
+
+    python -m benchmarks.bench_capture recording1.wav recording2.wav
+    python -m benchmarks.bench_capture --synthetic 5        # generated fixture
+"""
+import argparse
+import math
+import os
+import random
+import tempfile
+import time
+import wave
+from array import array
+from typing import List
+
+from benchmarks.common import print_row
+from src.jarvis_core.vad import ContinuousListener, EnergyVAD, WavSource
+
+LEGACY_OVERHEAD = 0.6 + 0.8  # adjust_for_ambient_noise + recognizer pause_threshold
+
+
+def synthetic_wav(path: str, utterances: int, rate: int = 16000, seed: int = 7) -> List[float]:
+    """Write background noise with ``utterances`` voiced bursts; returns their end times."""
+    rnd = random.Random(seed)
+    samples = array("h")
+    ends: List[float] = []
+
+    def noise(seconds: float, amp: float = 120.0) -> None:
+        for _ in range(int(seconds * rate)):
+            samples.append(int(rnd.gauss(0, amp)))
+
+    noise(1.0)
+    for _ in range(utterances):
+        length = rnd.uniform(0.8, 2.5)
+        f0 = rnd.uniform(110, 220)
+        for i in range(int(length * rate)):
+            t = i / rate
+            envelope = 0.5 + 0.5 * math.sin(2 * math.pi * 4 * t)  # ~4 syllables/s
+            v = sum(math.sin(2 * math.pi * f0 * k * t) / k for k in (1, 2, 3))
+            samples.append(int(4000 * envelope * v + rnd.gauss(0, 120)))
+        ends.append(len(samples) / rate)
+        noise(rnd.uniform(1.0, 2.0))
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(samples.tobytes())
+    return ends
+
+
+def replay(path: str, realtime: bool) -> List[float]:
+    probe = WavSource(path, 0)
+    vad = EnergyVAD(sample_rate=probe.sample_rate)
+    source = WavSource(path, vad.frame_bytes, realtime=realtime)
+    listener = ContinuousListener(source, vad)
+    delays: List[float] = []
+    t0 = time.perf_counter()
+    for i, utt in enumerate(listener, start=1):
+        delays.append(utt.endpoint_delay)
+        print(f"  {os.path.basename(path)} #{i}: speech {utt.start:6.2f}s-{utt.end:6.2f}s "
+              f"({utt.duration:4.2f}s captured) endpoint delay {utt.endpoint_delay * 1e3:5.0f} ms "
+              f"threshold {vad.threshold:6.0f}")
+    elapsed = time.perf_counter() - t0
+    audio = vad._frames_seen * vad.frame_ms / 1000.0
+    print(f"  processed {audio:.1f}s of audio in {elapsed * 1e3:.1f} ms "
+          f"({elapsed / audio * 1e3:.2f} ms CPU per audio second)")
+    return delays
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("wavs", nargs="*", help="16-bit PCM WAV recordings")
+    ap.add_argument("--synthetic", type=int, default=0, help="generate a fixture with N utterances")
+    ap.add_argument("--realtime", action="store_true", help="pace frames like a live microphone")
+    args = ap.parse_args()
+
+    paths = list(args.wavs)
+    if args.synthetic or not paths:
+        path = os.path.join(tempfile.mkdtemp(), "synthetic.wav")
+        ends = synthetic_wav(path, args.synthetic or 5)
+        print(f"synthetic fixture {path}: speech ends at " + ", ".join(f"{e:.2f}s" for e in ends))
+        paths.append(path)
+
+    delays: List[float] = []
+    for path in paths:
+        delays.extend(replay(path, args.realtime))
+    print_row("VAD endpoint delay", delays)
+    print(f"old listen() fixed overhead per turn: {LEGACY_OVERHEAD * 1e3:.0f} ms (+ Enter keypress)")
+
+
+if __name__ == "__main__":
+    main()
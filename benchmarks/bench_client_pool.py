@@ -0,0 +1,58 @@
+"""Per-turn latency with a fresh OpenAI client per turn vs the shared pooled client.
+
+Runs against the local stand-in server, with ``--connect-delay`` emulating the
+TCP+TLS handshake a new connection pays against the real API.
+
+    python -m benchmarks.bench_client_pool --turns 50 --connect-delay 0.08
+"""
+import argparse
+import time
+from typing import List
+
+from benchmarks.common import print_row
+from src.jarvis_core.llm import close_clients, get_client, make_client
+from src.jarvis_core.standin import StandinServer
+
+MESSAGES = [{"role": "user", "content": "Diga apenas: Jarvis OK."}]
+
+
+def _turn(client) -> float:
+    t0 = time.perf_counter()
+    client.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES, max_tokens=20)
+    return time.perf_counter() - t0
+
+
+def run(turns: int, latency: float, connect_delay: float) -> None:
+    with StandinServer(latency=latency, connect_delay=connect_delay) as server:
+        fresh: List[float] = []
+        before = server.connections
+        for _ in range(turns):
+            client = make_client(api_key="sk-local", base_url=server.base_url)
+            fresh.append(_turn(client))
+            client.close()
+        fresh_conns = server.connections - before
+
+        pooled: List[float] = []
+        before = server.connections
+        client = get_client(api_key="sk-local", base_url=server.base_url)
+        for _ in range(turns):
+            pooled.append(_turn(client))
+        pooled_conns = server.connections - before
+        close_clients()
+
+    print(f"turns={turns} server_latency={latency * 1e3:.0f}ms connect_delay={connect_delay * 1e3:.0f}ms")
+    print_row(f"new client/turn ({fresh_conns} conns)", fresh)
+    print_row(f"pooled client ({pooled_conns} conns)", pooled)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--turns", type=int, default=50)
+    ap.add_argument("--latency", type=float, default=0.02, help="server think time (s)")
+    ap.add_argument("--connect-delay", type=float, default=0.08, help="per-connection setup cost (s)")
+    args = ap.parse_args()
+    run(args.turns, args.latency, args.connect_delay)
+
+
+if __name__ == "__main__":
+    main()
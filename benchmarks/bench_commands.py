@@ -0,0 +1,119 @@
+"""Dispatch accuracy and per-input cost: old substring chain vs the compiled CommandRouter.
+
+Exits with status 1 if the router misroutes anything in the corpus.
+
+    python -m benchmarks.bench_commands --repeat 2000
+"""
+import argparse
+import sys
+import time
+from typing import Callable, List, Optional, Tuple
+
+from src.jarvis_core.commands import BUILTIN_COMMANDS, CommandRouter
+
+# (input, expected command or None for "goes to the LLM")
+CORPUS: List[Tuple[str, Optional[str]]] = [
+    ("que horas são?", "time"),
+    ("Que HORAS são", "time"),
+    ("me diz a hora", "time"),
+    ("qual o horário agora", "time"),
+    ("horas são?", "time"),
+    ("qual meu ip", "ip"),
+    ("Qual é o meu IP?", "ip"),
+    ("ip", "ip"),
+    ("spawn cubo", "spawn"),
+    ("criar cubo por favor", "spawn"),
+    ("criar 200 cubos em grade", "spawn"),
+    ("crie 5 esferas vermelhas em linha", "spawn"),
+    ("parar", "exit"),
+    ("Sair!", "exit"),
+    ("tchau", "exit"),
+    ("/reset", "reset"),
+    ("limpar memória", "reset"),
+    ("/mem", "mem"),
+    ("Memória", "mem"),
+    ("/save", "save"),
+    ("/cache", "cache"),
+    ("abrir jupyter", "open_jupyter"),
+    ("abrir vs code", "open_vscode"),
+    ("/stage4", "stage4"),
+    # these used to be swallowed by substring checks
+    ("que tipo de modelo você usa?", None),
+    ("como motivar a equipe", None),
+    ("vou embora amanhã, me lembra de algo?", None),
+    ("o que é uma tipografia serifada", None),
+    ("escreva um poema sobre a chuva", None),
+    ("qual a capital da Austrália", None),
+    ("explique recursão passo a passo", None),
+    ("como funciona a hipoteca", None),
+    ("traduza 'good morning' para o português", None),
+    ("sair do loop em python, como faço?", None),
+    ("quantas horas tem um dia?", None),
+    ("trabalhei oito horas hoje", None),
+]
+
+
+def legacy(c: str) -> Optional[str]:
+    """The pre-router jarvis_cli.handle chain, kept here as the baseline."""
+    c = c.strip().lower()
+    if c in {"parar", "sair", "quit", "exit"}:
+        return "exit"
+    if c in {"/reset", "reset", "limpar memória", "limpar memoria"}:
+        return "reset"
+    if c in {"/mem", "memoria", "memória"}:
+        return "mem"
+    if c in {"/save", "salvar"}:
+        return "save"
+    if "hora" in c:
+        return "time"
+    if "ip" in c:
+        return "ip"
+    if "spawn cubo" in c or "criar cubo" in c:
+        return "spawn"
+    return None
+
+
+def build_router() -> CommandRouter:
+    router = CommandRouter()
+    for name in BUILTIN_COMMANDS:
+        router.command(name)(lambda m: None)
+    return router
+
+
+def accuracy(fn: Callable[[str], Optional[str]]) -> Tuple[int, List[Tuple[str, Optional[str], Optional[str]]]]:
+    wrong = [(text, want, fn(text)) for text, want in CORPUS if fn(text) != want]
+    return len(CORPUS) - len(wrong), wrong
+
+
+def per_input_ns(fn: Callable[[str], object], repeat: int) -> float:
+    inputs = [text for text, _ in CORPUS]
+    t0 = time.perf_counter_ns()
+    for _ in range(repeat):
+        for text in inputs:
+            fn(text)
+    return (time.perf_counter_ns() - t0) / (repeat * len(inputs))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--repeat", type=int, default=2000)
+    args = ap.parse_args()
+
+    router = build_router()
+
+    def routed(text: str) -> Optional[str]:
+        m = router.match(text)
+        return m.name if m else None
+
+    for label, fn in (("legacy substring chain", legacy), ("CommandRouter", routed)):
+        ok, wrong = accuracy(fn)
+        print(f"{label:<24} accuracy {ok}/{len(CORPUS)}  {per_input_ns(fn, args.repeat):8.0f} ns/input")
+        for text, want, got in wrong:
+            print(f"    {text!r}: expected {want}, got {got}")
+
+    if accuracy(routed)[1]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
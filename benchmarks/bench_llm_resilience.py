@@ -0,0 +1,75 @@
+"""Streamed LLM calls against a flaky stand-in: plain SDK retries vs deadline + retries vs hedging.
+
+The stand-in fails ``--error-rate`` of requests with a 503 and stalls
+``--slow-rate`` more for ``--slow-latency`` seconds. Each mode runs the same
+number of sequential streamed calls, each with a fresh stand-in using the same
+seed. The report gives latency percentiles, failed or degraded calls and the
+upstream requests spent.
+
+    python -m benchmarks.bench_llm_resilience --calls 200 --error-rate 0.05 --slow-rate 0.05
+"""
+import argparse
+import logging
+import time
+from typing import List
+
+from benchmarks.common import print_row
+from src.jarvis_core.llm import make_client, stream_chat
+from src.jarvis_core.resilience import CallPolicy, LLMUnavailable, ResilientLLM
+from src.jarvis_core.standin import StandinServer
+
+PARAMS = dict(model="gpt-4o-mini", messages=[{"role": "user", "content": "Diga apenas: Jarvis OK."}], max_tokens=40)
+
+
+def run_mode(mode: str, args) -> None:
+    with StandinServer(latency=args.latency, token_delay=args.token_delay, error_rate=args.error_rate,
+                       slow_rate=args.slow_rate, slow_latency=args.slow_latency, seed=args.seed) as server:
+        client = make_client(api_key="sk-local", base_url=server.base_url)
+        llm = None
+        if mode == "retry":
+            llm = ResilientLLM(CallPolicy(budget=args.budget, hedges=0))
+        elif mode == "hedge":
+            llm = ResilientLLM(CallPolicy(budget=args.budget))
+        times: List[float] = []
+        failed = degraded = 0
+        for _ in range(args.calls):
+            t0 = time.perf_counter()
+            try:
+                if llm is None:  # what llm_reply did before: one call, the SDK's own retries, no deadline
+                    "".join(stream_chat(client, **PARAMS))
+                else:
+                    llm.complete(client, PARAMS, on_token=lambda d: None)
+            except LLMUnavailable as e:
+                degraded += bool(e.partial)
+                failed += not e.partial
+            except Exception:
+                failed += 1
+            times.append(time.perf_counter() - t0)
+        extra = f" {llm.summary()}" if llm is not None else ""
+        print_row(mode, times)
+        print(f"{'':<28} failed={failed} partial={degraded} upstream={server.requests} "
+              f"(injected {server.errors} errors, {server.slow} stalls){extra}")
+        client.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--calls", type=int, default=200)
+    ap.add_argument("--latency", type=float, default=0.05)
+    ap.add_argument("--token-delay", type=float, default=0.002)
+    ap.add_argument("--error-rate", type=float, default=0.05)
+    ap.add_argument("--slow-rate", type=float, default=0.05)
+    ap.add_argument("--slow-latency", type=float, default=2.0)
+    ap.add_argument("--budget", type=float, default=1.5, help="deadline per call for the resilient modes (s)")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--modes", nargs="+", default=["sdk", "retry", "hedge"], choices=["sdk", "retry", "hedge"])
+    args = ap.parse_args()
+    logging.getLogger("src.jarvis_core.resilience").setLevel(logging.ERROR)  # one line per give-up otherwise
+    print(f"{args.calls} streamed calls, upstream {args.latency * 1e3:.0f}ms, {args.error_rate:.0%} errors, "
+          f"{args.slow_rate:.0%} stalls of {args.slow_latency:.1f}s, budget {args.budget:.1f}s")
+    for mode in args.modes:
+        run_mode(mode, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Overhead of the latency spans, enabled and disabled.
+
+Times an empty ``with METRICS.span(...)`` block (and a full turn with four
+spans) against a bare loop, so the per-span cost can be compared with the
+stages it measures (milliseconds to seconds).
+
+    python -m benchmarks.bench_metrics --iterations 200000
+"""
+import argparse
+import time
+
+from src.jarvis_core.metrics import WINDOW, Metrics
+
+STAGES = ("dispatch", "context", "llm", "memory")
+
+
+def per_call(fn, iterations: int) -> float:
+    t0 = time.perf_counter()
+    fn(iterations)
+    return (time.perf_counter() - t0) / iterations
+
+
+def bare(n: int) -> None:
+    for _ in range(n):
+        pass
+
+
+def spans(metrics: Metrics):
+    def run(n: int) -> None:
+        span = metrics.span
+        for _ in range(n):
+            with span("llm"):
+                pass
+    return run
+
+
+def turns(metrics: Metrics):
+    def run(n: int) -> None:
+        for _ in range(n):
+            with metrics.turn():
+                for stage in STAGES:
+                    with metrics.span(stage):
+                        pass
+    return run
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--iterations", type=int, default=200_000)
+    args = ap.parse_args()
+
+    n = args.iterations
+    base = per_call(bare, n)
+    for label, enabled in (("disabled", False), ("enabled", True)):
+        m = Metrics(enabled=enabled)
+        span = per_call(spans(m), n) - base
+        turn = per_call(turns(m), n // 4) - base
+        print(f"{label:<9} span={span * 1e9:8.0f}ns  turn(4 spans)={turn * 1e6:7.2f}µs")
+    m = Metrics()
+    spans(m)(WINDOW)
+    t0 = time.perf_counter()
+    for _ in range(100):
+        m.snapshot()
+    print(f"snapshot of a full {WINDOW}-sample window: {(time.perf_counter() - t0) / 100 * 1e3:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Adaptive routing vs the old fixed ``max_tokens``: classifier cost and latency/token effect per route.
+
+A mixed set of prompts is streamed against the local stand-in. The stand-in
+writes a long answer cut at ``max_tokens`` words, with ``--token-delay``
+between tokens, so the reply length drives the latency the way it does with
+the real API. Three modes are compared: fixed (300 tokens, temperature 0.6,
+as the CLI/web used to do), routed text, and routed voice.
+
+    python -m benchmarks.bench_routing --rounds 3 --token-delay 0.004
+"""
+import argparse
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from benchmarks.common import print_row
+from src.jarvis_core.llm import make_client, stream_chat
+from src.jarvis_core.routing import ModelRouter, Route, classify
+from src.jarvis_core.standin import StandinServer
+
+PROMPTS = [
+    "Oi, Jarvis!",
+    "Qual a capital da Austrália?",
+    "É verdade que o sol é uma estrela?",
+    "Você sabe que dia é hoje?",
+    "Me fale sobre a Revolução Francesa.",
+    "O que devo levar numa viagem para a praia?",
+    "Explique como funciona a fotossíntese, passo a passo.",
+    "Qual a diferença entre TCP e UDP?",
+    "Por que o céu é azul?",
+    "Escreva um poema curto sobre o mar.",
+    "Me dê ideias de nome para um gato.",
+    "Tenho um bug nesta função Python que soma listas, pode ajudar?",
+    "Como escrevo uma regex para validar e-mails?",
+]
+LONG_REPLY = " ".join(f"palavra{i}" for i in range(1000))
+FIXED = Route("fixed", "gpt-4o-mini", 300, 0.6)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--latency", type=float, default=0.05)
+    ap.add_argument("--token-delay", type=float, default=0.002)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    n = 0
+    for _ in range(1000):
+        for prompt in PROMPTS:
+            classify(prompt)
+            n += 1
+    print(f"classifier: {(time.perf_counter() - t0) / n * 1e6:.1f}µs per prompt")
+
+    router = ModelRouter(enabled=True)
+    with StandinServer(latency=args.latency, token_delay=args.token_delay, reply=LONG_REPLY) as server:
+        client = make_client(api_key="sk-local", base_url=server.base_url)
+        for mode in ("fixed", "text", "voice"):
+            latency: Dict[str, List[float]] = defaultdict(list)
+            tokens: Dict[str, int] = defaultdict(int)
+            for _ in range(args.rounds):
+                for prompt in PROMPTS:
+                    route = FIXED if mode == "fixed" else router.route(prompt, voice=mode == "voice")
+                    messages = [{"role": "user", "content": prompt}]
+                    t0 = time.perf_counter()
+                    reply = "".join(stream_chat(client, messages=messages, **route.params()))
+                    latency[route.name].append(time.perf_counter() - t0)
+                    latency["all"].append(latency[route.name][-1])
+                    tokens[route.name] += len(reply.split())
+                    tokens["all"] += len(reply.split())
+            print(f"--- {mode}: {tokens['all']} reply tokens")
+            for name in sorted(latency, key=lambda k: (k == "all", k)):
+                print_row(f"{mode}/{name} ({tokens[name]} tok)", latency[name])
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Spawning N objects: one new connection per POST vs pooled per-object vs batched.
+
+Runs against the bundled stand-in scene server.
+
+    python -m benchmarks.bench_scene --count 200 --latency 0.002
+"""
+import argparse
+import time
+
+from src.jarvis_core.scene import SceneClient
+from src.jarvis_core.scene_server import SceneStandin
+
+
+def legacy(url: str, objects) -> None:
+    """What spawn_cubo used to do: a fresh httpx connection per object."""
+    import httpx
+
+    for obj in objects:
+        httpx.post(f"{url}/spawn", json=obj, timeout=3.0)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--count", type=int, default=200)
+    ap.add_argument("--latency", type=float, default=0.002, help="server time per request (s)")
+    ap.add_argument("--batch-size", type=int, default=50)
+    args = ap.parse_args()
+
+    print(f"spawning {args.count} cubes, server latency {args.latency * 1e3:.1f}ms/request")
+    for label, batch in (("new connection per object", None), ("pooled, one per object", False),
+                         ("pooled + batch", True)):
+        with SceneStandin(latency=args.latency, batch=batch is not False) as server:
+            client = SceneClient(server.url, batch_size=args.batch_size)
+            objects = client.make_objects("cube", args.count)
+            t0 = time.perf_counter()
+            if batch is None:
+                legacy(server.url, objects)
+            else:
+                client.spawn_many(objects)
+            elapsed = time.perf_counter() - t0
+            client.close()
+            assert len(server.objects) == args.count
+            print(f"{label:<28} {elapsed * 1e3:9.1f} ms  requests={server.requests:<5} "
+                  f"connections={server.connections}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Build and query cost of the long-term semantic memory at 10k and 100k turns.
+
+Turns are synthetic pt-BR question/answer pairs drawn from topic templates; a
+few "needle" turns with unique facts are planted, and every query asks about
+one of them, so the run also reports recall@k next to the timings.
+
+    python -m benchmarks.bench_semantic_memory --sizes 10000 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import List, Tuple
+
+from benchmarks.common import print_row
+from src.jarvis_core.semantic_memory import SemanticMemory
+
+TOPICS = {
+    "python": ["lista", "dicionario", "funcao", "classe", "excecao", "modulo", "pacote", "teste"],
+    "culinaria": ["arroz", "feijao", "bolo", "molho", "forno", "tempero", "receita", "massa"],
+    "viagem": ["passagem", "hotel", "mala", "aeroporto", "roteiro", "praia", "museu", "trem"],
+    "saude": ["sono", "corrida", "alongamento", "agua", "proteina", "academia", "postura", "dieta"],
+    "financas": ["investimento", "poupanca", "juros", "cartao", "orcamento", "imposto", "reserva", "acao"],
+}
+QUESTIONS = ["como funciona {a} com {b}?", "me explica {a} e {b}", "qual a melhor forma de usar {a}?", "dica sobre {a} para {b}"]
+ANSWERS = ["Para {a}, comece pelo básico e depois veja {b}.", "Em geral {a} depende de {b}.", "Use {a} com cuidado; {b} ajuda."]
+
+
+def synthetic_turns(n: int, rnd: random.Random) -> List[Tuple[str, str]]:
+    turns = []
+    topics = list(TOPICS.values())
+    for _ in range(n):
+        words = rnd.choice(topics)
+        a, b = rnd.sample(words, 2)
+        turns.append((rnd.choice(QUESTIONS).format(a=a, b=b), rnd.choice(ANSWERS).format(a=a, b=b)))
+    return turns
+
+
+def needles(count: int, rnd: random.Random) -> List[Tuple[str, str, str]]:
+    """(user, assistant, query) triples with facts found nowhere else."""
+    names = ["Bidu", "Floquinho", "Pipoca", "Tufão", "Zeca", "Jujuba", "Faísca", "Tainha", "Biscoito", "Paçoca"]
+    things = ["cachorro", "papagaio", "tartaruga", "hamster", "coelho", "jabuti", "peixe", "furão", "gato", "calopsita"]
+    out = []
+    for i in range(count):
+        name, thing = names[i % len(names)], things[i % len(things)]
+        code = rnd.randint(1000, 9999)
+        out.append((
+            f"Meu {thing} se chama {name} e a senha do portão é {code}",
+            f"Anotado: o {thing} {name}, portão {code}.",
+            f"qual o nome do meu {thing}?",
+        ))
+    return out
+
+
+def run(size: int, queries: int, k: int, seed: int) -> None:
+    rnd = random.Random(seed)
+    turns = synthetic_turns(size, rnd)
+    planted = needles(min(queries, 10), rnd)
+    for i, (u, a, _) in enumerate(planted):
+        turns[rnd.randrange(size // 2) + i] = (u, a)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "longterm.jsonl")
+        mem = SemanticMemory(path, snapshot_every=size + 1)
+        t0 = time.perf_counter()
+        mem.add_many(turns)
+        build = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        mem.save()
+        save = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        reloaded = SemanticMemory(path)
+        reload = time.perf_counter() - t0
+        assert len(reloaded) == size
+
+        adds = []
+        for u, a in synthetic_turns(200, rnd):
+            t0 = time.perf_counter()
+            mem.add(u, a)
+            adds.append(time.perf_counter() - t0)
+
+        times, found = [], 0
+        for i in range(queries):
+            user, _, query = planted[i % len(planted)]
+            t0 = time.perf_counter()
+            hits = mem.search(query, k=k)
+            times.append(time.perf_counter() - t0)
+            found += any(h.user == user for h in hits)
+
+    print(f"--- {size} turns (index {mem.nbytes / 2**20:.0f} MB, dim={mem.vectorizer.dim})")
+    print(f"build {build:7.2f}s ({build / size * 1e6:.1f}µs/turn)  snapshot save {save * 1e3:.0f}ms  "
+          f"reload from snapshot {reload:.2f}s  recall@{k} {found}/{queries}")
+    print_row("  add (incremental)", adds)
+    print_row("  search top-k", times)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("-k", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+    for size in args.sizes:
+        run(size, args.queries, args.k, args.seed)
+
+
+if __name__ == "__main__":
+    main()
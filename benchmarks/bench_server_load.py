@@ -0,0 +1,161 @@
+"""Load test for the headless server against the local OpenAI stand-in.
+
+Each simulated user opens one connection (keep-alive HTTP with SSE, or a
+WebSocket) and runs ``--turns`` streamed turns with unique prompts, so every
+turn reaches the upstream stand-in. ``--concurrency`` users are active at once.
+Reports sessions/s, turns/s, time to first delta and turn latency
+percentiles, plus how many turns the server refused as busy.
+
+    python -m benchmarks.bench_server_load --sessions 200 --concurrency 50 --mode http
+    python -m benchmarks.bench_server_load --sessions 200 --concurrency 50 --mode ws
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.common import print_row
+from src.jarvis_core.llm import make_async_client
+from src.jarvis_core.response_cache import ResponseCache
+from src.jarvis_core.server import JarvisServer, JarvisService, read_message, send_message
+from src.jarvis_core.standin import StandinServer
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str]]:
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            return status, headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+async def http_turn(reader, writer, host: str, session: str, message: str) -> Tuple[float, float, str]:
+    """One streamed turn over keep-alive HTTP; returns (ttft, total, outcome)."""
+    body = json.dumps({"session": session, "message": message, "stream": True}).encode("utf-8")
+    t0 = time.perf_counter()
+    writer.write(
+        f"POST /v1/chat HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    status, headers = await _read_head(reader)
+    if headers.get("transfer-encoding") != "chunked":
+        await reader.readexactly(int(headers.get("content-length") or 0))
+        return 0.0, time.perf_counter() - t0, "busy" if status == 503 else f"http {status}"
+    ttft, outcome = 0.0, "error"
+    while True:
+        size = int((await reader.readline()).strip(), 16)
+        if size == 0:
+            await reader.readline()
+            break
+        event = json.loads((await reader.readexactly(size + 2))[6:-4])
+        if event["type"] == "delta" and not ttft:
+            ttft = time.perf_counter() - t0
+        elif event["type"] == "done":
+            outcome = "ok"
+        elif event["type"] == "error":
+            outcome = event["error"]
+    return ttft, time.perf_counter() - t0, outcome
+
+
+async def ws_connect(host: str, port: int, session: str):
+    reader, writer = await asyncio.open_connection(host, port)
+    key = base64.b64encode(os.urandom(16)).decode("ascii")
+    writer.write(
+        f"GET /v1/ws?session={session} HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\n"
+        f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode("latin-1")
+    )
+    await writer.drain()
+    status, _ = await _read_head(reader)
+    assert status == 101, status
+    await read_message(reader, writer, mask=True)  # {"type": "session", ...}
+    return reader, writer
+
+
+async def ws_turn(reader, writer, message: str) -> Tuple[float, float, str]:
+    t0 = time.perf_counter()
+    await send_message(writer, {"message": message}, mask=True)
+    ttft = 0.0
+    while True:
+        event = json.loads(await read_message(reader, writer, mask=True))
+        if event["type"] == "delta":
+            ttft = ttft or time.perf_counter() - t0
+        elif event["type"] == "done":
+            return ttft, time.perf_counter() - t0, "ok"
+        else:
+            return ttft, time.perf_counter() - t0, event["error"]
+
+
+async def user(idx: int, args, port: int, out: Dict[str, List]) -> None:
+    session = f"user{idx}"
+    if args.mode == "ws":
+        reader, writer = await ws_connect("127.0.0.1", port, session)
+    else:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for turn in range(args.turns):
+            message = f"pergunta {turn} do usuário {idx}"
+            if args.mode == "ws":
+                ttft, total, outcome = await ws_turn(reader, writer, message)
+            else:
+                ttft, total, outcome = await http_turn(reader, writer, f"127.0.0.1:{port}", session, message)
+            out["outcome"].append(outcome)
+            if outcome == "ok":
+                out["ttft"].append(ttft)
+                out["turn"].append(total)
+    finally:
+        writer.close()
+
+
+async def run(args) -> None:
+    with StandinServer(latency=args.latency, token_delay=args.token_delay) as standin:
+        client = make_async_client(api_key="sk-local", base_url=standin.base_url, pool_size=args.max_upstream)
+        service = JarvisService(client, cache=ResponseCache(), max_upstream=args.max_upstream,
+                                max_waiting=args.max_waiting)
+        server = await JarvisServer(service, port=0).start()
+        out: Dict[str, List] = {"ttft": [], "turn": [], "outcome": []}
+        slots = asyncio.Semaphore(args.concurrency)
+
+        async def one(i: int) -> None:
+            async with slots:
+                await user(i, args, server.port, out)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.sessions)))
+        wall = time.perf_counter() - t0
+        health = service.health()
+        await server.close()
+        await client.close()
+
+    outcomes = {k: out["outcome"].count(k) for k in set(out["outcome"])}
+    print(f"mode={args.mode} sessions={args.sessions} concurrency={args.concurrency} turns/session={args.turns} "
+          f"max_upstream={args.max_upstream} upstream latency={args.latency * 1e3:.0f}ms "
+          f"+ {args.token_delay * 1e3:.0f}ms/token; upstream requests={standin.requests}")
+    print(f"wall={wall:.2f}s  {args.sessions / wall:.1f} sessions/s  {len(out['outcome']) / wall:.1f} turns/s  "
+          f"outcomes={outcomes}  server={health}")
+    print_row("time to first delta", out["ttft"])
+    print_row("turn latency", out["turn"])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sessions", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=50, help="users active at once")
+    ap.add_argument("--turns", type=int, default=3, help="turns per session")
+    ap.add_argument("--mode", choices=["http", "ws"], default="http")
+    ap.add_argument("--max-upstream", type=int, default=32)
+    ap.add_argument("--max-waiting", type=int, default=None)
+    ap.add_argument("--latency", type=float, default=0.05, help="stand-in think time (s)")
+    ap.add_argument("--token-delay", type=float, default=0.002, help="stand-in delay between tokens (s)")
+    args = ap.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
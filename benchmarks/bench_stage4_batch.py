@@ -0,0 +1,38 @@
+"""Throughput of the Stage 4 batch runner over many goals.
+
+Runs the same goal list in-process (``--processes 1``) and across process
+pools of increasing size, writing JSONL to /dev/null. Reports wall time,
+goals/s and per-goal latency percentiles.
+
+    python -m benchmarks.bench_stage4_batch --goals 10000 --processes 1 2 4 8
+"""
+import argparse
+import os
+
+from src.stage4_agents.batch import write_batch
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--goals", type=int, default=10_000)
+    ap.add_argument("--processes", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}))
+    ap.add_argument("--chunksize", type=int, default=64)
+    ap.add_argument("--step-workers", type=int, default=1)
+    args = ap.parse_args()
+
+    goals = [f"Build churn prediction system #{i}" for i in range(args.goals)]
+    print(f"{args.goals} goals, chunksize={args.chunksize}, step_workers={args.step_workers}, cpus={os.cpu_count()}")
+    base = None
+    with open(os.devnull, "w", encoding="utf-8") as out:
+        for n in args.processes:
+            s = write_batch(goals, out, processes=n, chunksize=args.chunksize, step_workers=args.step_workers)
+            base = base or s["goals_per_s"]
+            print(
+                f"processes={n:<3} wall={s['wall_s']:7.2f}s {s['goals_per_s']:9.1f} goals/s "
+                f"(x{s['goals_per_s'] / base:4.2f}) goal p50={s['goal_ms_p50']:.2f}ms "
+                f"p95={s['goal_ms_p95']:.2f}ms p99={s['goal_ms_p99']:.2f}ms errors={s['errors']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Serial vs DAG execution of Stage 4 plans with latency-bearing mock tools.
+
+Each tool sleeps like a remote call would. The plan fans out over several data
+sources (extract -> featurize per source), trains one model per source
+(``model_trainer`` is limited to 2 concurrent runs), then joins into
+evaluation and a single deployment.
+
+    python -m benchmarks.bench_stage4_dag --sources 6 --latency 0.05
+"""
+import argparse
+import time
+from typing import List
+
+from benchmarks.common import print_row
+from src.stage4_agents.agent_demo import Memory, ToolRegistry, Worker
+from src.stage4_agents.dag import PlanStep
+
+
+def slow(result: str, seconds: float):
+    def tool() -> str:
+        time.sleep(seconds)
+        return result
+    return tool
+
+
+def make_tools(latency: float, trainer_limit: int) -> ToolRegistry:
+    tools = ToolRegistry(limits={"model_trainer": trainer_limit})
+    tools.register("data_extractor", slow("Fetched dataset", latency))
+    tools.register("featurizer", slow("Built features", latency))
+    tools.register("model_trainer", slow("Trained model", 2 * latency))
+    tools.register("evaluation_suite", slow("Evaluated", latency))
+    tools.register("deployment_pipeline", slow("Deployed", latency))
+    return tools
+
+
+def fan_out_plan(sources: int) -> List[PlanStep]:
+    steps = [PlanStep(1, "Analyze goal")]
+    trained = []
+    for i in range(sources):
+        base = 2 + 3 * i
+        steps.append(PlanStep(base, f"Extract source {i}", "data_extractor", (1,)))
+        steps.append(PlanStep(base + 1, f"Featurize source {i}", "featurizer", (base,)))
+        steps.append(PlanStep(base + 2, f"Train on source {i}", "model_trainer", (base + 1,)))
+        trained.append(base + 2)
+    evaluate = 2 + 3 * sources
+    steps.append(PlanStep(evaluate, "Evaluate ensemble", "evaluation_suite", tuple(trained)))
+    steps.append(PlanStep(evaluate + 1, "Deploy system", "deployment_pipeline", (evaluate,)))
+    return steps
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sources", type=int, default=6)
+    ap.add_argument("--latency", type=float, default=0.05, help="seconds per tool call (training is 2x)")
+    ap.add_argument("--trainer-limit", type=int, default=2)
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    plan = fan_out_plan(args.sources)
+    tools = make_tools(args.latency, args.trainer_limit)
+    print(f"{len(plan)} steps, tool latency {args.latency * 1e3:.0f}ms, model_trainer limit {args.trainer_limit}")
+    reference = None
+    for workers in (1, 2, 4, 8):
+        times = []
+        for _ in range(args.runs):
+            memory = Memory()
+            t0 = time.perf_counter()
+            results = Worker(max_workers=workers).execute(plan, tools, memory)
+            times.append(time.perf_counter() - t0)
+            if reference is None:
+                reference = results
+            assert results == reference and memory.recall() == reference, "non-deterministic ordering"
+        print_row(f"max_workers={workers}", times)
+
+
+if __name__ == "__main__":
+    main()
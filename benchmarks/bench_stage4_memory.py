@@ -0,0 +1,130 @@
+"""Stage 4 Memory at 1M events: the old list-of-strings class vs the ring buffer.
+
+Measures write time, retained memory (tracemalloc), and the cost of the access
+pattern Critic.review used (``recall()`` length check + ``recent(1)`` twice)
+plus indexed lookups that the old class could only do by scanning.
+
+    python -m benchmarks.bench_stage4_memory --events 1000000
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import List, Optional
+
+from benchmarks.common import print_row
+from src.stage4_agents.memory import Memory
+
+TOOLS = ["data_extractor", "model_trainer", "evaluation_suite", "deployment_pipeline", None]
+STEPS = ["Collect relevant data", "Train baseline model", "Evaluate results", "Deploy system", "Confirm monitoring"]
+RESULTS = ["Fetched customer churn dataset", "Trained gradient boosting model", "Calculated ROC-AUC",
+           "Shipped model to production", "Executed step with no external tool"]
+
+
+class LegacyMemory:
+    """The previous implementation, verbatim."""
+
+    def __init__(self) -> None:
+        self.events: List[str] = []
+
+    def remember(self, entry: str) -> None:
+        self.events.append(entry)
+
+    def recall(self) -> List[str]:
+        return list(self.events)
+
+    def recent(self, limit: Optional[int] = None) -> List[str]:
+        if limit is None:
+            return self.recall()
+        return list(self.events[-limit:])
+
+
+def fill_legacy(n: int) -> LegacyMemory:
+    mem = LegacyMemory()
+    for i in range(n):
+        k = i % 5
+        step = f"{STEPS[k]} [tool:{TOOLS[k]}]" if TOOLS[k] else STEPS[k]
+        mem.remember(f"Step {i % 6 + 1}: {step} -> {RESULTS[k]}")
+    return mem
+
+
+def fill_ring(n: int, capacity: int, spill: Optional[str]) -> Memory:
+    mem = Memory(capacity=capacity, spill_path=spill)
+    for i in range(n):
+        k = i % 5
+        mem.record(i % 6 + 1, TOOLS[k], STEPS[k], RESULTS[k])
+    mem.flush()
+    return mem
+
+
+def measure_fill(label: str, fill) -> object:
+    """Time a fill without tracing, then measure retained memory on a traced second fill."""
+    gc.collect()
+    t0 = time.perf_counter()
+    mem = fill()
+    elapsed = time.perf_counter() - t0
+    del mem
+    tracemalloc.start()
+    mem = fill()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} write {elapsed:6.2f}s  retained {current / 2**20:8.1f} MB")
+    return mem
+
+
+def timed(fn, repeat: int) -> List[float]:
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--events", type=int, default=1_000_000)
+    ap.add_argument("--capacity", type=int, default=10_000)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+    n = args.events
+
+    legacy = measure_fill("legacy list", lambda: fill_legacy(n))
+    ring = measure_fill(f"ring (capacity {args.capacity})", lambda: fill_ring(n, args.capacity, None))
+    full = measure_fill(f"ring (capacity {n})", lambda: fill_ring(n, n, None))
+    with tempfile.TemporaryDirectory() as tmp:
+        spill = os.path.join(tmp, "spill.jsonl")
+
+        def fill_spill() -> Memory:
+            if os.path.exists(spill):
+                os.remove(spill)
+            return fill_ring(n, args.capacity, spill)
+
+        spilled = measure_fill("ring + spill to disk", fill_spill)
+        print(f"{'':<28} spilled {spilled.spilled} events, {os.path.getsize(spill) / 2**20:.0f} MB on disk")
+        spilled.close()
+
+    def legacy_review():
+        len(legacy.recall()) < 6
+        legacy.recent(1)
+        legacy.recent(1)[0].split(":")[0]
+
+    def ring_review(mem: Memory):
+        def review():
+            mem.total < 6
+            last = mem.last()
+            str(last).split(":")[0]
+        return review
+
+    print_row("legacy critic checks", timed(legacy_review, args.repeat))
+    print_row("ring critic checks", timed(ring_review(full), args.repeat))
+    print_row("legacy recent(100)", timed(lambda: legacy.recent(100), args.repeat))
+    print_row("ring recent(100) + iterate", timed(lambda: list(full.recent(100)), args.repeat))
+    print_row("legacy scan for tool", timed(lambda: [e for e in legacy.events if "[tool:model_trainer]" in e], 3))
+    print_row("ring by_tool (10k retained)", timed(lambda: ring.by_tool("model_trainer"), args.repeat))
+
+
+if __name__ == "__main__":
+    main()
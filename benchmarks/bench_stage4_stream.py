@@ -0,0 +1,77 @@
+"""Streaming vs materialized Stage 4 pipeline on long generated plans.
+
+The materialized path is what ``run_stage4_demo`` used to do: build the whole
+plan, execute it into a list, then review the list. The streaming path chains
+``Planner -> Worker.stream -> Critic.watch`` generators. Reports time to the
+first result and first critic feedback, total time and peak traced memory.
+
+    python -m benchmarks.bench_stage4_stream --steps 10000 100000
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Iterator
+
+from src.stage4_agents.agent_demo import Critic, Memory, ToolRegistry, Worker
+from src.stage4_agents.dag import PlanStep
+
+TOOLS = ["data_extractor", "model_trainer", "evaluation_suite", None]
+
+
+def long_plan(n: int) -> Iterator[PlanStep]:
+    """Step 1 deploys a canary (so feedback is due right away); then chains of 4 dependent steps."""
+    yield PlanStep(1, "Deploy canary", "deployment_pipeline")
+    for i in range(2, n + 1):
+        deps = (i - 1,) if i % 4 else ()
+        yield PlanStep(i, f"Process shard {i}", TOOLS[i % 4], deps)
+
+
+def materialized(n: int, workers: int):
+    memory, tools, t0 = Memory(), ToolRegistry(), time.perf_counter()
+    plan = list(long_plan(n))
+    results = Worker(workers).execute(plan, tools, memory)
+    first_result = time.perf_counter() - t0  # nothing is visible before execute() returns
+    feedback = Critic().review(results, memory)
+    first_feedback = time.perf_counter() - t0
+    return first_result, first_feedback, len(results), len(feedback)
+
+
+def streaming(n: int, workers: int):
+    memory, tools, t0 = Memory(), ToolRegistry(), time.perf_counter()
+    first_result = first_feedback = None
+    results = feedback = 0
+    for kind, _ in Critic().watch(Worker(workers).stream(long_plan(n), tools, memory), memory):
+        if kind == "result":
+            results += 1
+            if first_result is None:
+                first_result = time.perf_counter() - t0
+        else:
+            feedback += 1
+            if first_feedback is None:
+                first_feedback = time.perf_counter() - t0
+    return first_result, first_feedback, results, feedback
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--steps", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args()
+
+    for n in args.steps:
+        for label, fn in (("materialized", materialized), ("streaming", streaming)):
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            first_result, first_feedback, results, feedback = fn(n, args.workers)
+            total = time.perf_counter() - t0
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{n:>7} steps {label:<13} first result {first_result * 1e3:9.1f}ms  "
+                f"first feedback {first_feedback * 1e3:9.1f}ms  total {total:6.2f}s  "
+                f"peak {peak / 2**20:7.1f} MB  ({results} results, {feedback} feedback)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Page rerun time of jarvis_streamlit.py with a long conversation history.
+
+Uses Streamlit's headless ``AppTest`` runner, so no browser or OpenAI key is
+needed. The history is injected into session state (nothing is written to the
+memory file). Compares full history rendering against the paginated view.
+
+    python -m benchmarks.bench_streamlit_rerun --turns 1000 --runs 10
+"""
+import argparse
+import os
+import time
+
+from benchmarks.common import print_row
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "jarvis_streamlit.py")
+
+
+def fake_history(turns: int):
+    conversation = []
+    for i in range(turns):
+        conversation.append({"role": "user", "content": f"Pergunta número {i}: como funciona o item {i}?"})
+        conversation.append({"role": "assistant", "content": f"Resposta {i}. " + "Explicação curta em markdown. " * 6})
+    return conversation
+
+
+def measure(turns: int, page: int, runs: int):
+    from streamlit.testing.v1 import AppTest
+
+    os.environ["JARVIS_HISTORY_TURNS"] = str(page)
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.session_state["conversation"] = fake_history(turns)
+    at.run()  # first run pays imports and cache_resource construction
+    if at.exception:
+        raise SystemExit(at.exception[0].message)
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - t0)
+    return times, len(at.chat_message)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--turns", type=int, default=1000)
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--page", type=int, default=25, help="turnos por página na versão paginada")
+    args = ap.parse_args()
+
+    for label, page in (("full history", 0), (f"paginated ({args.page} turns)", args.page)):
+        times, rendered = measure(args.turns, page, args.runs)
+        print_row(f"{label} [{rendered} msgs]", times)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Latency/accuracy comparison of the STT backends over pt-BR WAV fixtures.
+
+Fixtures live in ``benchmarks/fixtures/stt``: ``transcripts.tsv`` lists
+``file<TAB>reference`` pairs and the WAVs sit next to it. Record them once
+from the microphone (each prompt is shown before recording):
+
+    python -m benchmarks.bench_stt --record
+    python -m benchmarks.bench_stt --backends google vosk sphinx
+
+Per backend it reports model load time, per-utterance latency, real-time
+factor (processing time / audio duration, lower is better) and word error
+rate against the references.
+"""
+import argparse
+import os
+import time
+import wave
+from typing import List, Sequence, Tuple
+
+from benchmarks.common import print_row
+from src.jarvis_core.commands import normalize
+from src.jarvis_core.stt import BACKENDS, STTError, get_backend
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "stt")
+
+
+def load_fixtures(directory: str) -> List[Tuple[str, str]]:
+    items = []
+    with open(os.path.join(directory, "transcripts.tsv"), encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            name, ref = line.rstrip("\n").split("\t", 1)
+            items.append((os.path.join(directory, name), ref))
+    return items
+
+
+def words(text: str) -> List[str]:
+    return "".join(c if c.isalnum() else " " for c in normalize(text)).split()
+
+
+def word_errors(ref: Sequence[str], hyp: Sequence[str]) -> int:
+    """Levenshtein distance over words (substitutions + deletions + insertions)."""
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1]
+
+
+def wav_duration(path: str) -> float:
+    with wave.open(path, "rb") as w:
+        return w.getnframes() / float(w.getframerate())
+
+
+def record(items: List[Tuple[str, str]], seconds: int) -> None:
+    import speech_recognition as sr
+
+    r = sr.Recognizer()
+    with sr.Microphone(sample_rate=16000) as mic:
+        r.adjust_for_ambient_noise(mic, duration=1.0)
+        for path, ref in items:
+            input(f"\nLeia em voz alta: «{ref}»  [Enter para gravar]")
+            audio = r.listen(mic, phrase_time_limit=seconds)
+            with open(path, "wb") as f:
+                f.write(audio.get_wav_data(convert_rate=16000, convert_width=2))
+            print("  salvo em", os.path.basename(path))
+
+
+def bench_backend(name: str, items: List[Tuple[str, str]], verbose: bool) -> None:
+    import speech_recognition as sr
+
+    backend = get_backend(name)
+    t0 = time.perf_counter()
+    try:
+        backend.load()
+    except STTError as e:
+        print(f"{name:<8} indisponível: {e}")
+        return
+    load_time = time.perf_counter() - t0
+
+    latencies, rtfs = [], []
+    errors = total_words = failures = 0
+    for path, ref in items:
+        with sr.AudioFile(path) as src:
+            audio = sr.Recognizer().record(src)
+        t0 = time.perf_counter()
+        try:
+            hyp = backend.transcribe(audio)
+        except STTError as e:
+            failures += 1
+            hyp = ""
+            if verbose:
+                print(f"  {os.path.basename(path)}: erro {e}")
+        elapsed = time.perf_counter() - t0
+        latencies.append(elapsed)
+        rtfs.append(elapsed / max(wav_duration(path), 1e-6))
+        ref_w = words(ref)
+        errors += word_errors(ref_w, words(hyp))
+        total_words += len(ref_w)
+        if verbose:
+            print(f"  {os.path.basename(path)}: {hyp!r}")
+
+    wer = errors / max(total_words, 1)
+    print(f"{name:<8} load={load_time * 1e3:8.1f}ms  WER={wer:6.1%}  falhas={failures}")
+    print_row(f"  {name} latency", latencies)
+    print_row(f"  {name} RTF", rtfs, unit=1.0, suffix="x")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--fixtures", default=FIXTURES)
+    ap.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    ap.add_argument("--record", action="store_true", help="gravar as fixtures do microfone")
+    ap.add_argument("--seconds", type=int, default=6, help="limite por gravação")
+    ap.add_argument("--verbose", action="store_true")
+    args = ap.parse_args()
+
+    items = load_fixtures(args.fixtures)
+    if args.record:
+        record(items, args.seconds)
+        return
+    present = [(p, ref) for p, ref in items if os.path.exists(p)]
+    if not present:
+        raise SystemExit(f"nenhum WAV em {args.fixtures}; grave com --record")
+    audio_s = sum(wav_duration(p) for p, _ in present)
+    print(f"{len(present)} fixtures, {audio_s:.1f}s de áudio")
+    for name in args.backends:
+        bench_backend(name, present, args.verbose)
+
+
+if __name__ == "__main__":
+    main()
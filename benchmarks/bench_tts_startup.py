@@ -0,0 +1,72 @@
+"""Startup cost of the TTS engine: eager voice scan vs cached voice id vs lazy background init.
+
+Needs pyttsx3 and a working platform driver (SAPI5, NSSpeechSynthesizer or eSpeak).
+
+    python -m benchmarks.bench_tts_startup --runs 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+from benchmarks.common import print_row
+from src.jarvis_core.speech import SpeechWorker, find_ptbr_voice, init_engine
+
+
+def eager_scan() -> None:
+    """What init_tts did before: enumerate every voice and string-scan for pt-BR."""
+    import pyttsx3
+
+    eng = pyttsx3.init()
+    vid = find_ptbr_voice(eng.getProperty("voices"))
+    if vid:
+        eng.setProperty("voice", vid)
+    eng.setProperty("rate", 185)
+    eng.setProperty("volume", 1.0)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+    try:
+        import pyttsx3
+
+        pyttsx3.init()
+    except Exception as e:
+        sys.exit(f"pyttsx3 unavailable here ({e}); nothing to measure.")
+
+    cache = os.path.join(tempfile.mkdtemp(), "voice.json")
+    init_engine(voice_cache=cache)  # populate the cache once
+
+    eager: List[float] = []
+    cached: List[float] = []
+    to_prompt: List[float] = []
+    to_ready: List[float] = []
+    for _ in range(args.runs):
+        t0 = time.perf_counter()
+        eager_scan()
+        eager.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        init_engine(voice_cache=cache)
+        cached.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        worker = SpeechWorker(engine_factory=lambda: init_engine(voice_cache=cache))
+        worker.preload()
+        to_prompt.append(time.perf_counter() - t0)  # the prompt can be shown now
+        worker.wait()
+        to_ready.append(time.perf_counter() - t0)
+        worker.close()
+
+    print_row("eager scan (blocks prompt)", eager)
+    print_row("cached voice id", cached)
+    print_row("lazy: time to prompt", to_prompt)
+    print_row("lazy: engine ready (bg)", to_ready)
+
+
+if __name__ == "__main__":
+    main()
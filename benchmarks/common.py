@@ -0,0 +1,31 @@
+"""Small helpers shared by the benchmark scripts."""
+import math
+from typing import Dict, Sequence
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile; ``pct`` in [0, 100]."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values: Sequence[float]) -> Dict[str, float]:
+    return {
+        "n": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
+
+
+def print_row(label: str, values: Sequence[float], unit: float = 1e3, suffix: str = "ms") -> None:
+    s = summarize(values)
+    print(
+        f"{label:<28} n={s['n']:<6} mean={s['mean'] * unit:8.2f}{suffix} "
+        f"p50={s['p50'] * unit:8.2f}{suffix} p95={s['p95'] * unit:8.2f}{suffix} "
+        f"p99={s['p99'] * unit:8.2f}{suffix}"
+    )
@@ -1,48 +1,104 @@
-﻿import os, sys, time, platform, socket, subprocess
+﻿import os, sys, time, platform, socket, subprocess, argparse, asyncio, logging
 import speech_recognition as sr
-import pyttsx3
+
+from src.jarvis_core.commands import CommandRouter
+from src.jarvis_core.llm import get_client
+from src.jarvis_core.metrics import METRICS
+from src.jarvis_core.resilience import CallPolicy, Cancelled, LLMUnavailable, ResilientLLM
+from src.jarvis_core.routing import ModelRouter
+from src.jarvis_core.scene import get_scene_client
+from src.jarvis_core.speech import SentenceSplitter, SpeechWorker, init_engine
+from src.jarvis_core.stt import STTError, Transcriber
+from src.jarvis_core.vad import ContinuousListener, MicrophoneSource, WavSource
+from src.jarvis_core.voice_pipeline import VoicePipeline
 
 # ===== TTS (voz) =====
+HERE = os.path.dirname(os.path.abspath(__file__))
+VOICE_CACHE = os.path.join(HERE, "jarvis_voice.json")  # id da voz pt-BR escolhida
+
 def init_tts():
-    eng = pyttsx3.init()
-    # tenta voz pt-BR se existir
-    vid = None
-    for v in eng.getProperty("voices"):
-        name = (v.name or "").lower()
-        lang = "".join(v.languages).lower() if hasattr(v, "languages") else ""
-        if "portuguese" in name or "pt_" in lang or "brazil" in name:
-            vid = v.id; break
-    if vid: eng.setProperty("voice", vid)
-    eng.setProperty("rate", 185)   # velocidade
-    eng.setProperty("volume", 1.0)
-    return eng
-
-tts = init_tts()
+    return init_engine(rate=185, volume=1.0, voice_cache=VOICE_CACHE)
 
-def say(text:str):
-    print(f"Jarvis:", text)
+# o motor é criado sob demanda, na thread que fala (SpeechWorker ou etapa TTS do pipeline)
+tts = None
+
+def get_tts():
+    global tts
+    if tts is None:
+        tts = init_tts()
+    return tts
+
+def stop_tts():
+    if tts is not None:
+        tts.stop()
+
+# no modo assíncrono a fala vai para a fila do pipeline em vez de bloquear aqui
+speech_sink = None
+# e a vez em andamento tem um sinal de cancelamento (falar por cima o aciona)
+turn_cancel = None
+
+def speak(text:str):
     try:
-        tts.say(text); tts.runAndWait()
+        eng = get_tts()
+        if eng:
+            eng.say(text); eng.runAndWait()
     except Exception:
         pass
 
+# modo serial: fala numa thread própria, o loop não espera o runAndWait (criada em serial_loop)
+voice = None
+
+def say(text:str):
+    print(f"Jarvis:", text)
+    if speech_sink:
+        speech_sink(text); return
+    if voice:
+        voice.speak(text); return
+    speak(text)
+
 # ===== STT (escuta) =====
 r = sr.Recognizer()
 
-def listen(timeout=4, phrase_time_limit=8):
+def capture(timeout=4, phrase_time_limit=8):
+    """Grava uma fala do microfone (None se ninguém falou dentro do timeout)."""
     with sr.Microphone() as mic:
         r.adjust_for_ambient_noise(mic, duration=0.6)
-        audio = r.listen(mic, timeout=timeout, phrase_time_limit=phrase_time_limit)
-    try:
-        # usa serviço grátis do Google (precisa internet)
-        text = r.recognize_google(audio, language="pt-BR")
-        return text.strip()
-    except sr.UnknownValueError:
+        try:
+            return r.listen(mic, timeout=timeout, phrase_time_limit=phrase_time_limit)
+        except sr.WaitTimeoutError:
+            return None
+
+# backend escolhido por JARVIS_STT / --stt (google online; vosk e sphinx offline)
+transcriber = None
+
+def get_transcriber():
+    global transcriber
+    if transcriber is None:
+        transcriber = Transcriber()
+    return transcriber
+
+def recognize(audio):
+    if audio is None:
         return ""
+    try:
+        return get_transcriber()(audio)
     except Exception as e:
         print("STT erro:", e)
         return ""
 
+def listen(timeout=4, phrase_time_limit=8):
+    return recognize(capture(timeout, phrase_time_limit))
+
+def continuous_capture(source):
+    """Captura contínua: calibra o ruído uma vez e corta as falas por VAD, sem Enter."""
+    listener = ContinuousListener(source)
+    def _capture():
+        utt = listener.next_utterance()
+        if utt is None:
+            raise EOFError  # gravação acabou
+        return utt.to_audio_data()
+    return _capture
+
 # ===== util =====
 def get_ip():
     try:
@@ -54,81 +110,188 @@ def get_ip():
         return "desconhecido"
 
 # ===== OpenAI opcional =====
-def reply_llm(prompt:str):
+# voz pede resposta rápida: prazo curto por chamada (retries e hedge dentro dele)
+llm = ResilientLLM(CallPolicy(budget=float(os.getenv("JARVIS_VOICE_BUDGET", "8"))))
+# tudo aqui é falado: rotas de voz (max_tokens menor; modelo maior só para código)
+model_router = ModelRouter(voice=True)
+
+def reply_llm(prompt:str, on_sentence=None, cancel=None):
+    """Resposta do LLM. Com ``on_sentence``, cada frase é entregue assim que fica pronta (streaming).
+
+    Se o prazo estourar no meio do stream, o que já chegou é falado e devolvido.
+    Se ``cancel`` for acionado (barge-in), a chamada é abandonada e nada mais é falado.
+    """
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         return None
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
-        msg = client.chat.completions.create(
-            model="gpt-4o-mini",
+        client = get_client(api_key=api_key)
+        route = model_router.route(prompt)
+        params = dict(
             messages=[{"role":"system","content":"Responda em PT-BR, breve e útil."},
                       {"role":"user","content":prompt}],
-            temperature=0.6,
-            max_tokens=180
+            **route.params()
         )
-        return msg.choices[0].message.content.strip()
+        t0 = time.perf_counter()
+        with METRICS.span("llm"):
+            if on_sentence is None:
+                reply = llm.complete(client, params)
+                model_router.record(route, time.perf_counter() - t0, reply)
+                return reply
+            splitter = SentenceSplitter()
+            def on_delta(delta):
+                if cancel is not None and cancel.is_set():
+                    return
+                for sentence in splitter.feed(delta):
+                    on_sentence(sentence)
+            try:
+                reply = llm.complete(client, params, on_token=on_delta, cancel=cancel)
+                model_router.record(route, time.perf_counter() - t0, reply)
+            except Cancelled as e:
+                return e.partial
+            except LLMUnavailable as e:
+                if not e.partial:
+                    raise
+                print("OpenAI lento, resposta cortada:", e)
+                reply = e.partial
+            for sentence in splitter.flush():
+                on_sentence(sentence)
+            return reply
     except Exception as e:
         print("OpenAI erro:", e)
         return None
 
 # ===== Ações locais simples =====
-def handle_command(cmd:str):
-    c = cmd.lower()
+router = CommandRouter()
 
-    if c in ("sair","fechar","encerrar","tchau","parar"):
-        say("Encerrando. Até logo!"); sys.exit(0)
+@router.command("exit")
+def _cmd_exit(m):
+    say("Encerrando. Até logo!"); sys.exit(0)
 
-    if "que horas" in c or "hora" in c:
-        say(time.strftime("Agora são %H:%M.")); return
+@router.command("time")
+def _cmd_time(m):
+    say(time.strftime("Agora são %H:%M."))
 
-    if "ip" in c:
-        say(f"Seu IP local é {get_ip()}"); return
+@router.command("ip")
+def _cmd_ip(m):
+    say(f"Seu IP local é {get_ip()}")
 
-    if "abrir jupyter" in c:
-        subprocess.Popen(["cmd","/c","start","", "http://localhost:8888/lab"]); 
-        say("Abrindo Jupyter."); return
+@router.command("open_jupyter")
+def _cmd_jupyter(m):
+    subprocess.Popen(["cmd","/c","start","", "http://localhost:8888/lab"])
+    say("Abrindo Jupyter.")
 
-    if "abrir vscode" in c or "abrir vs code" in c:
-        subprocess.Popen(["cmd","/c","code","C:\\Dev\\projects\\MeuProjeto"])
-        say("Abrindo Visual Studio Code."); return
+@router.command("open_vscode")
+def _cmd_vscode(m):
+    subprocess.Popen(["cmd","/c","code","C:\\Dev\\projects\\MeuProjeto"])
+    say("Abrindo Visual Studio Code.")
 
-    if "spawn cubo" in c or "criar cubo" in c:
-        # exemplo: envia comando pro Jarvis server (se você rodar ele depois)
-        try:
-            import httpx
-            httpx.post("http://127.0.0.1:8000/spawn",
-                       json={"id":"cube1","type":"cube","pos":[0,1.2,0.5],"color":"#00ffff"},
-                       timeout=3.0)
-            say("Cubo criado.")
-        except Exception:
-            say("Não consegui falar com o servidor de cena.")
+@router.command("spawn")
+def _cmd_spawn(m):
+    # envia para o servidor de cena (ou rode o stand-in: python -m src.jarvis_core.scene_server)
+    say(get_scene_client("http://127.0.0.1:8000").spawn_command(m.args))
+
+def handle_command(cmd:str):
+    with METRICS.turn():
+        _handle_command(cmd)
+
+def _handle_command(cmd:str):
+    with METRICS.span("dispatch"):
+        match = router.match(cmd)
+    if match:
+        with METRICS.span("command"):
+            match.run()
         return
 
-    # fallback IA (se tiver key)
-    llm = reply_llm(cmd)
-    if llm:
-        say(llm)
-    else:
+    # fallback IA (se tiver key): fala frase a frase enquanto o modelo ainda gera
+    spoken = []
+    def say_sentence(sentence:str):
+        spoken.append(sentence); say(sentence)
+    cancel = turn_cancel() if turn_cancel else None
+    llm = reply_llm(cmd, on_sentence=say_sentence, cancel=cancel)
+    if cancel is not None and cancel.is_set():
+        return
+    if not llm and not spoken:
         say("Comando recebido, mas não tenho uma ação definida para isso.")
 
-def main():
+def serial_loop():
+    global voice
+    voice = SpeechWorker(speak_fn=speak, stop_fn=stop_tts)  # stop_tts: Enter corta a fala em curso
+    voice.preload(get_tts)  # carrega o TTS em segundo plano enquanto o prompt já aparece
     say("Jarvis online. Diga 'parar' para encerrar.")
     while True:
         try:
             input("Pressione Enter e fale... ")
+            voice.interrupt()  # Enter durante a fala corta a resposta anterior
             say("Estou ouvindo.")
+            voice.wait()  # não gravar a própria voz
             text = listen()
             if not text:
                 say("Não entendi. Pode repetir?")
                 continue
             print("Você:", text)
+            voice.begin_turn()
             handle_command(text)
+        except SystemExit:
+            voice.close(); raise
         except KeyboardInterrupt:
-            say("Encerrando por teclado."); break
+            say("Encerrando por teclado."); voice.close(); break
         except Exception as e:
             print("Loop erro:", e)
 
+def _respond(text:str):
+    print("Você:", text)
+    handle_command(text)
+
+async def pipeline_loop(wav=None):
+    """Escuta, reconhece, responde e fala em paralelo; falar por cima interrompe a voz.
+
+    ``wav`` reproduz uma gravação no lugar do microfone (para medir sem falar).
+    """
+    global speech_sink, turn_cancel
+    if wav:
+        probe = WavSource(wav, 0)
+        source = WavSource(wav, probe.sample_rate * 30 // 1000 * 2, realtime=True)
+    else:
+        source = MicrophoneSource()
+    pipeline = VoicePipeline(continuous_capture(source), recognize, _respond, speak,
+                             stop_speaking=stop_tts, warmup=get_tts,
+                             stop_capture=source.close)  # senão a thread de captura segura a saída até a próxima fala
+    speech_sink, turn_cancel = pipeline.say, pipeline.cancel_token
+    say("Jarvis online. Pode falar; diga 'parar' para encerrar.")
+    try:
+        await pipeline.run()
+    finally:
+        speech_sink = turn_cancel = None
+        if pipeline.timings:
+            print("Tempo médio por etapa (s):", pipeline.summary())
+        if logging.getLogger().isEnabledFor(logging.INFO):
+            print(METRICS.summary())
+            print(model_router.summary())
+
+def main():
+    ap = argparse.ArgumentParser(description="Jarvis por voz")
+    ap.add_argument("--serial", action="store_true", help="modo antigo: Enter antes de cada fala, etapas em série")
+    ap.add_argument("--wav", help="usar uma gravação WAV (16 bits) no lugar do microfone")
+    ap.add_argument("--verbose", action="store_true", help="mostrar a latência de cada etapa por turno")
+    ap.add_argument("--stt", help="reconhecimento de fala: google, vosk ou sphinx (padrão: JARVIS_STT ou google)")
+    ap.add_argument("--stt-fallback", help="backend usado quando o principal falha (ex.: vosk sem internet)")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(levelname)s: %(message)s")
+
+    global transcriber
+    try:
+        transcriber = Transcriber(args.stt, args.stt_fallback)
+        transcriber.preload()  # modelos offline carregam uma vez, antes da primeira fala
+    except STTError as e:
+        print("STT erro:", e); return
+
+    if args.serial:
+        serial_loop(); return
+    try:
+        asyncio.run(pipeline_loop(args.wav))
+    except KeyboardInterrupt:
+        say("Encerrando por teclado.")
+
 if __name__ == "__main__":
     main()
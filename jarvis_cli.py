@@ -1,96 +1,219 @@
 ﻿# -*- coding: utf-8 -*-
-import os, sys, time, socket, argparse, json
-from typing import Optional, List, Dict
+import os, sys, time, socket, argparse, json, logging
+from typing import Any, Optional, List, Dict, Callable, Tuple
+
+from src.jarvis_core.batch import BatchStats, RateLimiter, read_prompts, run_batch
+from src.jarvis_core.commands import CommandRouter
+from src.jarvis_core.context import ContextBuilder
+from src.jarvis_core.llm import StreamStats, get_client
+from src.jarvis_core.memory_store import ConversationJournal
+from src.jarvis_core.metrics import METRICS
+from src.jarvis_core.scene import get_scene_client
+from src.jarvis_core.speech import SentenceSplitter, SpeechWorker, init_engine
+from src.jarvis_core.resilience import PARTIAL_MARK, LLMUnavailable, ResilientLLM, degrade
+from src.jarvis_core.response_cache import ResponseCache, cache_key, split_bypass, window_for
+from src.jarvis_core.routing import ModelRouter
+
+try:  # memória de longo prazo precisa do numpy
+    from src.jarvis_core.semantic_memory import SemanticMemory, turn_pairs
+except ImportError:
+    SemanticMemory = None
 
 # ====== Config de memória persistente ======
 HERE = os.path.dirname(os.path.abspath(__file__))
-MEM_FILE = os.path.join(HERE, "jarvis_mem.json")
+MEM_FILE = os.path.join(HERE, "jarvis_mem.jsonl")  # journal append-only (1 linha por mensagem)
+LEGACY_MEM_FILE = os.path.join(HERE, "jarvis_mem.json")  # formato antigo, importado uma vez
 MAX_TURNS = 20  # limita a memória (últimas N mensagens user+assistant)
+MAX_HISTORY = 10 * MAX_TURNS  # histórico em RAM; o que vai ao modelo é limitado por tokens
+CONTEXT_BUDGET = int(os.getenv("JARVIS_CONTEXT_TOKENS", "1500"))  # orçamento de tokens do prompt
+LONG_MEM_FILE = os.path.join(HERE, "jarvis_longterm.jsonl")  # todos os turnos, para busca semântica
+RECALL_K = 3  # turnos antigos relevantes enviados junto com a janela recente
+
+LOGGER = logging.getLogger("jarvis.cli")
+
+journal = ConversationJournal(MEM_FILE, max_messages=2 * MAX_TURNS, legacy_path=LEGACY_MEM_FILE)
 
 def load_memory() -> List[Dict[str, str]]:
     try:
-        if os.path.exists(MEM_FILE):
-            with open(MEM_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            if isinstance(data, list):
-                return [m for m in data if "role" in m and "content" in m]
-    except Exception:
-        pass
-    return []
+        return journal.load()  # lê só o final do arquivo
+    except OSError as e:
+        print(f"(aviso: não consegui ler a memória: {e})")
+        return []
 
-def save_memory(conversation: List[Dict[str, str]]) -> None:
+def save_memory(messages: List[Dict[str, str]]) -> None:
+    """Acrescenta mensagens novas ao journal (custo constante por turno)."""
     try:
-        with open(MEM_FILE, "w", encoding="utf-8") as f:
-            json.dump(conversation[-2*MAX_TURNS:], f, ensure_ascii=False, indent=2)
-    except Exception:
-        pass
+        journal.append(messages)
+    except OSError as e:
+        print(f"(aviso: não consegui salvar a memória: {e})")
 
 # ====== IA (OpenAI) com memória ======
 conversation: List[Dict[str, str]] = load_memory()
 
-def llm_reply(prompt: str) -> str:
-    from openai import OpenAI
+def open_long_memory():
+    """Índice TF-IDF de todos os turnos (None sem numpy ou se o arquivo falhar)."""
+    if SemanticMemory is None:
+        return None
+    try:
+        mem = SemanticMemory(LONG_MEM_FILE)
+        if not len(mem) and conversation:
+            mem.add_many(turn_pairs(conversation))  # primeira vez: importa o que o journal tem
+        return mem
+    except OSError as e:
+        print(f"(aviso: memória de longo prazo indisponível: {e})")
+        return None
+
+long_memory = open_long_memory()
+
+def recall(prompt: str, history: Optional[List[Dict[str, str]]] = None) -> List[str]:
+    """Turnos antigos mais parecidos com ``prompt`` (fora os que ainda estão em ``history``, a conversa em RAM)."""
+    if long_memory is None:
+        return []
+    history = conversation if history is None else history
+    hits = long_memory.search(prompt, k=RECALL_K, skip_last=len(history) // 2)
+    return [h.text() for h in hits]
+
+def remember(prompt: str, reply: str) -> None:
+    if long_memory is None:
+        return
+    try:
+        long_memory.add(prompt, reply)
+    except OSError as e:
+        print(f"(aviso: não consegui gravar na memória de longo prazo: {e})")
+
+CACHE_WINDOW = 4  # mensagens anteriores que entram na chave do cache
+# cache de respostas (memória; defina JARVIS_LLM_CACHE=arquivo.sqlite para persistir em disco)
+response_cache = ResponseCache(disk_path=os.getenv("JARVIS_LLM_CACHE") or None)
+# prazo por chamada (JARVIS_LLM_BUDGET), retries com backoff e requisição duplicada (hedge) se a 1ª demorar
+llm = ResilientLLM()
+# modelo, max_tokens e temperatura escolhidos por pergunta (curta/detalhada/código...; voz = respostas curtas)
+model_router = ModelRouter()
+# turnos antigos viram um resumo incremental em vez de serem descartados
+context = ContextBuilder(budget=CONTEXT_BUDGET)
+
+SYSTEM_PROMPT = (
+    "Você é o Jarvis, um assistente útil e educado. "
+    "Responda em português BR por padrão. "
+    "Se o usuário pedir explicitamente outro idioma, responda nesse idioma. "
+    "Seja claro e objetivo; use explicações passo a passo apenas quando pedirem."
+)
+
+def complete(
+    prompt: str,
+    on_token: Optional[Callable[[str], None]] = None,
+    stats: Optional[StreamStats] = None,
+    use_cache: bool = True,
+    history: Optional[List[Dict[str, str]]] = None,
+    ctx: Optional[ContextBuilder] = None,
+    persist: bool = True,
+    voice: bool = False,
+    use_recall: bool = True,
+) -> Tuple[str, str]:
+    """Núcleo do ``llm_reply``: devolve ``(resposta, origem)`` e deixa os erros subirem.
+
+    ``history``/``ctx`` substituem a conversa e o contexto globais (o modo
+    ``--batch`` usa uma conversa isolada por item); ``persist=False`` não grava
+    o turno no journal nem na memória de longo prazo, e ``use_recall=False``
+    não busca nela. ``voice=True`` (resposta falada) faz o ``model_router``
+    preferir respostas curtas.
+    """
     key = os.getenv("OPENAI_API_KEY")
     if not key:
-        return "Sem OPENAI_API_KEY configurada. Defina a chave e tente novamente."
+        raise RuntimeError("Sem OPENAI_API_KEY configurada. Defina a chave e tente novamente.")
+    history = conversation if history is None else history
+    ctx = context if ctx is None else ctx
 
-    client = OpenAI(api_key=key)
-    conversation.append({"role": "user", "content": prompt})
-    if len(conversation) > 2 * MAX_TURNS:
-        del conversation[: len(conversation) - 2 * MAX_TURNS]
-
-    system_msg = {
-        "role": "system",
-        "content": (
-            "Você é o Jarvis, um assistente útil e educado. "
-            "Responda em português BR por padrão. "
-            "Se o usuário pedir explicitamente outro idioma, responda nesse idioma. "
-            "Seja claro e objetivo; use explicações passo a passo apenas quando pedirem."
-        ),
-    }
+    client = get_client(api_key=key)  # reaproveita o pool de conexões entre turnos
+    history.append({"role": "user", "content": prompt})
+    if len(history) > MAX_HISTORY:
+        del history[: len(history) - MAX_HISTORY]
 
+    system_msg = {"role": "system", "content": SYSTEM_PROMPT}
+
+    with METRICS.span("context"):
+        recalled = recall(prompt, history) if use_recall else []
+        messages, prompt_tokens = ctx.build(system_msg, history, recalled)
+    route = model_router.route(prompt, voice=voice)
+    params = dict(messages=messages, **route.params())
+
+    def ask() -> str:
+        return llm.complete(client, params, on_token, stats)
+
+    t0 = time.perf_counter()
+    source = "direct"
+    ck = cache_key(route.cache_tag, system_msg["content"], window_for(history, CACHE_WINDOW), prompt) if use_cache else None
+    with METRICS.span("llm"):
+        try:
+            if ck is not None:
+                reply, source = response_cache.get_or_compute(ck, ask)
+                if source != "miss" and on_token is not None:
+                    if stats is not None:
+                        stats.first_token = stats.finished = time.perf_counter()
+                    on_token(reply)  # resposta inteira veio do cache
+            else:
+                reply = ask()
+        except LLMUnavailable as e:
+            # estourou o prazo: fica o que já saiu no stream ou uma resposta antiga do cache
+            fallback = degrade(e, response_cache.stale(ck) if ck is not None else None)
+            if fallback is None:
+                raise
+            reply, source = fallback
+            if on_token is not None:
+                on_token(PARTIAL_MARK if source == "partial" else reply)
+    latency = time.perf_counter() - t0
+    if stats is not None and stats.ttft is not None:
+        METRICS.observe("llm_ttft", stats.ttft)
+    if source in ("miss", "direct"):
+        model_router.record(route, latency, reply)
+    LOGGER.info(
+        "llm route=%s prompt_tokens=%d window=%d summary=%s recalled=%d source=%s latency=%.2fs",
+        route.name, prompt_tokens, ctx.last_window, bool(ctx.summary), ctx.last_recalled, source, latency,
+    )
+    # memória só é gravada depois que o stream termina
+    history.append({"role": "assistant", "content": reply})
+    if persist and source not in ("partial", "stale"):  # resposta cortada ou antiga não vai para a memória
+        with METRICS.span("memory"):
+            save_memory(history[-2:])
+            remember(prompt, reply)
+    return reply, source
+
+def llm_reply(
+    prompt: str,
+    on_token: Optional[Callable[[str], None]] = None,
+    stats: Optional[StreamStats] = None,
+    use_cache: bool = True,
+    voice: bool = False,
+) -> str:
+    """Pergunta ao modelo. Com ``on_token``, a resposta chega em streaming (token a token).
+
+    Perguntas repetidas (mesmo contexto recente) saem do ``response_cache``; ``use_cache=False`` força a chamada.
+    """
+    if not os.getenv("OPENAI_API_KEY"):
+        return "Sem OPENAI_API_KEY configurada. Defina a chave e tente novamente."
     try:
-        msg = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[system_msg] + conversation,
-            temperature=0.6,
-            max_tokens=300,
-        )
-        reply = msg.choices[0].message.content.strip()
-        conversation.append({"role": "assistant", "content": reply})
-        save_memory(conversation)
-        return reply
+        return complete(prompt, on_token, stats, use_cache, voice=voice)[0]
+    except LLMUnavailable as e:
+        return f"O modelo não respondeu ({e}). Tente de novo."
     except Exception as e:
         return f"OpenAI erro: {e}"
 
 # ====== TTS opcional ======
+VOICE_CACHE = os.path.join(HERE, "jarvis_voice.json")  # voz pt-BR escolhida (evita varrer as vozes a cada início)
+
 def init_tts():
-    try:
-        import pyttsx3
-        eng = pyttsx3.init()
-        vid = None
-        for v in eng.getProperty("voices"):
-            name = (v.name or "").lower()
-            lang = "".join(getattr(v, "languages", [])).lower()
-            if "portuguese" in name or "pt_" in lang or "brazil" in name:
-                vid = v.id
-                break
-        if vid:
-            eng.setProperty("voice", vid)
-        eng.setProperty("rate", 185)
-        eng.setProperty("volume", 1.0)
-        return eng
-    except Exception:
-        return None
+    return init_engine(rate=185, volume=1.0, voice_cache=VOICE_CACHE)
+
+# no modo --batch as respostas dos comandos vão para o registro JSONL em vez da tela
+say_sink: Optional[Callable[[str], None]] = None
 
 def say(text: str, tts_engine=None, voice_on=False):
+    """Mostra o texto; com voz ligada, ``tts_engine`` (um SpeechWorker) fala em segundo plano."""
+    if say_sink is not None:
+        say_sink(text)
+        return
     print(f"Jarvis: {text}")
     if voice_on and tts_engine:
-        try:
-            tts_engine.say(text)
-            tts_engine.runAndWait()
-        except Exception:
-            pass
+        tts_engine.speak(text)
 
 # ====== Ações locais ======
 def ip_local() -> str:
@@ -103,83 +226,267 @@ def ip_local() -> str:
     except Exception:
         return "desconhecido"
 
-def spawn_cubo(url="http://127.0.0.1:8000"):
-    try:
-        import httpx
-        httpx.post(
-            f"{url}/spawn",
-            json={"id": "cube1", "type": "cube", "pos": [0, 1.2, 0.5], "color": "#00ffff"},
-            timeout=3.0,
-        )
-        return "Cubo criado."
-    except Exception:
-        return "Não consegui falar com o servidor de cena."
+def spawn_cubo(url="http://127.0.0.1:8000", args=None):
+    """Cria objetos na cena ("spawn cubo", "criar 200 cubos em grade", ...)."""
+    return get_scene_client(url).spawn_command(args)
 
-def handle(cmd: str, voice_on: bool, tts_engine, scene_url: str) -> Optional[bool]:
-    c = cmd.strip().lower()
+def stream_reply(cmd: str, tts_engine=None, voice_on=False, use_cache=True) -> str:
+    """Imprime a resposta do LLM conforme os tokens chegam e mostra TTFT/tempo total.
 
-    if c in {"parar", "sair", "quit", "exit"}:
-        say("Encerrando. Até logo!", tts_engine, voice_on)
-        return True
+    Com voz ligada, cada frase completa já vai para o TTS enquanto o resto ainda é gerado.
+    """
+    speaking = voice_on and tts_engine
+    splitter = SentenceSplitter()
+    if speaking:
+        tts_engine.begin_turn()
 
-    if c in {"/reset", "reset", "limpar memória", "limpar memoria"}:
-        conversation.clear()
-        save_memory(conversation)
-        say("Memória limpa.", tts_engine, voice_on)
-        return False
+    def on_token(delta: str) -> None:
+        print(delta, end="", flush=True)
+        if speaking:
+            for sentence in splitter.feed(delta):
+                tts_engine.speak(sentence)
 
-    if c in {"/mem", "memoria", "memória"}:
-        say(f"Itens na memória: {len(conversation)}", tts_engine, voice_on)
-        return False
+    stats = StreamStats()
+    print("Jarvis: ", end="", flush=True)
+    resp = llm_reply(cmd, on_token=on_token, stats=stats, use_cache=use_cache, voice=bool(speaking))
+    if stats.first_token is None:
+        # nada foi transmitido (erro ou sem chave): mostra a mensagem inteira
+        print(resp, end="")
+        splitter.feed(resp)
+    if speaking:
+        for sentence in splitter.flush():
+            tts_engine.speak(sentence)
+    print(f"\n({stats.summary()})")
+    return resp
+
+# ====== Comandos (registro compartilhado com jarvis.py e a versão web) ======
+router = CommandRouter()
+
+@router.command("exit")
+def _cmd_exit(m, tts_engine, voice_on, scene_url):
+    say("Encerrando. Até logo!", tts_engine, voice_on)
+    return True
 
-    if c in {"/save", "salvar"}:
-        save_memory(conversation)
+@router.command("reset")
+def _cmd_reset(m, tts_engine, voice_on, scene_url):
+    conversation.clear()
+    context.reset()
+    try:
+        journal.reset()
+        if long_memory is not None:
+            long_memory.reset()
+    except OSError as e:
+        print(f"(aviso: não consegui limpar a memória: {e})")
+    say("Memória limpa.", tts_engine, voice_on)
+    return False
+
+@router.command("mem")
+def _cmd_mem(m, tts_engine, voice_on, scene_url):
+    extra = f" ({len(long_memory)} turnos no longo prazo)" if long_memory is not None else ""
+    say(f"Itens na memória: {len(conversation)}{extra}", tts_engine, voice_on)
+    return False
+
+@router.command("save")
+def _cmd_save(m, tts_engine, voice_on, scene_url):
+    try:
+        journal.flush()
+        journal.compact()
+        if long_memory is not None:
+            long_memory.save()
         say("Memória salva.", tts_engine, voice_on)
-        return False
+    except OSError as e:
+        say(f"Não consegui salvar a memória: {e}", tts_engine, voice_on)
+    return False
 
-    if "hora" in c:
-        say(time.strftime("Agora são %H:%M."), tts_engine, voice_on)
-        return False
+@router.command("cache")
+def _cmd_cache(m, tts_engine, voice_on, scene_url):
+    say(response_cache.summary(), tts_engine, voice_on)
+    return False
 
-    if "ip" in c:
-        say(f"Seu IP local é {ip_local()}", tts_engine, voice_on)
-        return False
+@router.command("stats")
+def _cmd_stats(m, tts_engine, voice_on, scene_url):
+    say("\n" + METRICS.summary() + "\n" + llm.summary() + "\n" + model_router.summary())  # tabela: só na tela, não é falada
+    return False
+
+@router.command("time")
+def _cmd_time(m, tts_engine, voice_on, scene_url):
+    say(time.strftime("Agora são %H:%M."), tts_engine, voice_on)
+    return False
+
+@router.command("ip")
+def _cmd_ip(m, tts_engine, voice_on, scene_url):
+    say(f"Seu IP local é {ip_local()}", tts_engine, voice_on)
+    return False
+
+@router.command("spawn")
+def _cmd_spawn(m, tts_engine, voice_on, scene_url):
+    say(spawn_cubo(scene_url, m.args), tts_engine, voice_on)
+    return False
+
+def handle(
+    cmd: str, voice_on: bool, tts_engine, scene_url: str, stream: bool = False, use_cache: bool = True
+) -> Optional[bool]:
+    with METRICS.turn():  # cada etapa do turno entra nos histogramas do /stats
+        return _handle(cmd, voice_on, tts_engine, scene_url, stream, use_cache)
+
+def _handle(cmd: str, voice_on: bool, tts_engine, scene_url: str, stream: bool, use_cache: bool) -> Optional[bool]:
+    cmd, bypass = split_bypass(cmd.strip())  # '/fresh ...' ou '!...' ignora o cache
+    use_cache = use_cache and not bypass
 
-    if "spawn cubo" in c or "criar cubo" in c:
-        say(spawn_cubo(scene_url), tts_engine, voice_on)
+    with METRICS.span("dispatch"):
+        match = router.match(cmd)
+    if match:
+        with METRICS.span("command"):
+            return match.run(tts_engine, voice_on, scene_url)
+
+    if stream:
+        stream_reply(cmd, tts_engine, voice_on, use_cache)
         return False
 
-    resp = llm_reply(cmd)
+    resp = llm_reply(cmd, use_cache=use_cache, voice=bool(voice_on and tts_engine))
     say(resp, tts_engine, voice_on)
     return False
 
+# ====== Modo não interativo (--batch) ======
+BATCH_REFUSED = {"reset", "save"}  # apagariam ou compactariam o journal e a memória de longo prazo reais
+
+def run_batch_mode(
+    path: str,
+    out_path: Optional[str] = None,
+    concurrency: int = 4,
+    rate: float = 0.0,
+    shared: bool = False,
+    use_cache: bool = True,
+    scene_url: str = "http://127.0.0.1:8000",
+) -> Dict[str, Any]:
+    """Responde cada linha de ``path`` (``-`` = stdin) e grava um JSON por item em ``out_path`` (ou stdout).
+
+    Comandos locais rodam na hora, em ordem; perguntas ao LLM vão em paralelo
+    (até ``concurrency`` por vez, no máximo ``rate`` por segundo). Cada
+    pergunta tem conversa própria; com ``shared`` todas usam a conversa
+    carregada da memória, uma de cada vez, na ordem do arquivo; só nesse modo
+    a memória de longo prazo é consultada. Nada é gravado no journal, e
+    ``/reset`` e ``/save`` são recusados (mexeriam na memória da sessão
+    interativa). Devolve o resumo de vazão (também mostrado no stderr).
+    """
+    global say_sink
+    if shared and concurrency > 1:
+        LOGGER.warning("--context shared: perguntas enviadas uma de cada vez (cada uma depende da anterior)")
+        concurrency = 1
+
+    def ask(index: int, prompt: str) -> Dict[str, Any]:
+        prompt, bypass = split_bypass(prompt)
+        with METRICS.turn():
+            if shared:
+                reply, source = complete(prompt, use_cache=use_cache and not bypass, persist=False)
+            else:
+                reply, source = complete(
+                    prompt, use_cache=use_cache and not bypass, persist=False,
+                    history=[], ctx=ContextBuilder(budget=CONTEXT_BUDGET), use_recall=False,
+                )
+        return {"kind": "llm", "reply": reply, "source": source}
+
+    said: List[str] = []
+
+    def inline(index: int, prompt: str) -> Optional[Dict[str, Any]]:
+        match = router.match(split_bypass(prompt)[0])
+        if match is None:
+            return None
+        if match.name in BATCH_REFUSED:
+            return {"kind": "command", "command": match.name, "error": "comando indisponível no modo --batch"}
+        said.clear()
+        with METRICS.turn():
+            done = match.run(None, False, scene_url)
+        return {"kind": "command", "command": match.name, "reply": "\n".join(said).strip(), "stop": bool(done)}
+
+    say_sink = said.append  # comandos rodam só nesta thread
+    if os.getenv("OPENAI_API_KEY"):
+        get_client(api_key=os.getenv("OPENAI_API_KEY"))  # importa o SDK e abre o pool antes do 1º item
+    source = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    out = sys.stdout if out_path in (None, "-") else open(out_path, "w", encoding="utf-8")
+    stats = BatchStats()
+    try:
+        limiter = RateLimiter(rate, burst=max(1, concurrency))
+        for record in run_batch(read_prompts(source), ask, concurrency, limiter, inline):
+            stats.add(record)
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        say_sink = None
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    summary = stats.summary()
+    print(
+        f"(batch: {summary['items']} itens — {summary['llm']} LLM, {summary['commands']} comandos, "
+        f"{summary['errors']} erros — em {summary['wall_s']:.2f}s, {summary['items_per_s']:.1f} itens/s; "
+        f"latência LLM p50={summary['latency_ms_p50']:.0f}ms p95={summary['latency_ms_p95']:.0f}ms "
+        f"p99={summary['latency_ms_p99']:.0f}ms)",
+        file=sys.stderr,
+    )
+    return summary
+
 def main():
     ap = argparse.ArgumentParser(description="Jarvis CLI (texto)")
     ap.add_argument("--voice", choices=["on", "off"], default="off", help="voz TTS local")
     ap.add_argument("--scene", default="http://127.0.0.1:8000", help="URL do servidor de cena")
+    ap.add_argument("--stream", choices=["on", "off"], default="on", help="mostrar a resposta do LLM token a token")
+    ap.add_argument("--cache", choices=["on", "off"], default="on", help="reaproveitar respostas repetidas do LLM")
+    ap.add_argument("--warm", action="store_true", help="carregar o motor de voz já na inicialização (em segundo plano)")
+    ap.add_argument("--verbose", action="store_true", help="logar tokens de prompt e latência de cada chamada")
+    ap.add_argument("--metrics-export", metavar="ARQUIVO",
+                    help="ao sair, gravar as métricas de latência (.prom = Prometheus, senão JSON lines)")
+    ap.add_argument("--batch", metavar="ARQUIVO", help="modo não interativo: uma pergunta/comando por linha ('-' = stdin)")
+    ap.add_argument("--batch-out", metavar="ARQUIVO", help="--batch: arquivo JSONL de saída (padrão: stdout)")
+    ap.add_argument("--concurrency", type=int, default=4, help="--batch: chamadas ao LLM em paralelo")
+    ap.add_argument("--rate", type=float, default=0.0, help="--batch: máximo de chamadas ao LLM por segundo (0 = sem limite)")
+    ap.add_argument("--context", choices=["isolated", "shared"], default="isolated",
+                    help="--batch: conversa própria por pergunta, ou a conversa da memória compartilhada (em ordem)")
     args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(levelname)s: %(message)s")
 
-    voice_on = args.voice == "on"
-    tts_engine = init_tts() if voice_on else None
-
-    print("Jarvis: online. Digite comandos. ('parar' para sair)")
-    print("Dicas: 'que horas são', 'qual meu ip', 'spawn cubo', '/reset', '/mem', '/save', ou qualquer pergunta de IA.")
-    if conversation:
-        print(f"(memória carregada: {len(conversation)} itens)")
+    voice_on = args.voice == "on" and not args.batch
+    stream = args.stream == "on"
+    use_cache = args.cache == "on"
+    # o motor pyttsx3 é criado e usado só na thread do SpeechWorker (na 1ª fala, ou já com --warm)
+    tts_engine = SpeechWorker(engine_factory=init_tts) if voice_on else None
+    if tts_engine and args.warm:
+        tts_engine.preload()
 
     try:
+        if args.batch:
+            run_batch_mode(args.batch, args.batch_out, args.concurrency, args.rate,
+                           args.context == "shared", use_cache, args.scene)
+            return
+
+        print("Jarvis: online. Digite comandos. ('parar' para sair)")
+        print("Dicas: 'que horas são', 'qual meu ip', 'spawn cubo', 'criar 20 esferas azuis em grade', '/reset', '/mem', '/save', '/cache', '/stats', '/fresh <pergunta>', ou qualquer pergunta de IA.")
+        if conversation:
+            print(f"(memória carregada: {len(conversation)} itens)")
+
         while True:
             cmd = input("Você> ").strip()
             if not cmd:
                 continue
-            done = handle(cmd, voice_on, tts_engine, args.scene)
+            done = handle(cmd, voice_on, tts_engine, args.scene, stream, use_cache)
             if done:
                 break
     except (KeyboardInterrupt, EOFError):
         print()
         say("Encerrando. Até logo!", tts_engine, voice_on)
     finally:
-        save_memory(conversation)
+        if tts_engine:
+            tts_engine.close()  # termina de falar o que já está na fila
+        journal.close()
+        if long_memory is not None:
+            long_memory.close()
+        if args.metrics_export:
+            try:
+                METRICS.export(args.metrics_export)
+            except OSError as e:
+                print(f"(aviso: não consegui exportar as métricas: {e})")
+        METRICS.close()
 
 if __name__ == "__main__":
     main()
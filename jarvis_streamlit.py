@@ -1,62 +1,145 @@
 ﻿import streamlit as st
-import json, os, time, socket
-from typing import List, Dict
-from openai import OpenAI
-
-from io import StringIO
-from contextlib import redirect_stdout, redirect_stderr
+from streamlit.errors import StreamlitAPIException
+import os, time, socket, logging
+
+from src.jarvis_core.commands import CommandRouter
+from src.jarvis_core.context import ContextBuilder
+from src.jarvis_core.llm import StreamStats, get_client
+from src.jarvis_core.memory_store import ConversationJournal
+from src.jarvis_core.metrics import METRICS
+from src.jarvis_core.scene import get_scene_client
+from src.jarvis_core.resilience import PARTIAL_MARK, LLMUnavailable, ResilientLLM, degrade
+from src.jarvis_core.response_cache import ResponseCache, cache_key, split_bypass, window_for
+from src.jarvis_core.routing import ModelRouter
+from src.jarvis_core.semantic_memory import SemanticMemory, turn_pairs
+from src.stage4_agents.background import Stage4Runner
 
 HERE = os.path.dirname(os.path.abspath(__file__))
-MEM_FILE = os.path.join(HERE, "jarvis_mem.json")
+MEM_FILE = os.path.join(HERE, "jarvis_mem.jsonl")
+LEGACY_MEM_FILE = os.path.join(HERE, "jarvis_mem.json")
 MAX_TURNS = 20
+MAX_HISTORY = 10 * MAX_TURNS  # messages kept in the session; what reaches the model is bounded by tokens
+CACHE_WINDOW = 4  # previous messages folded into the response-cache key
+CONTEXT_BUDGET = int(os.getenv("JARVIS_CONTEXT_TOKENS", "1500"))  # prompt token budget per request
+LONG_MEM_FILE = os.path.join(HERE, "jarvis_longterm.jsonl")  # every turn, for semantic recall
+RECALL_K = 3
+
+LOGGER = logging.getLogger("jarvis.streamlit")
+
+HISTORY_TURNS = int(os.getenv("JARVIS_HISTORY_TURNS", "25"))  # turns rendered per page (0 = all)
+STAGE4_POLL = 0.25  # seconds between progress refreshes while a Stage 4 run is in flight
+STAGE4_TIMEOUT = 120  # the /stage4 chat command waits this long for its run
+
+# st.fragment (1.37+) reruns only the chat section on input; older versions rerun the page
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
 
 # ---------------------------
 # Stage 4 demo (safe import)
 # ---------------------------
-STAGE4_AVAILABLE = True
-STAGE4_IMPORT_ERROR = ""
+@st.cache_resource
+def stage4():
+    """Import Stage 4 once per server process: (run_stage4_demo, error message)."""
+    try:
+        from src.stage4_agents.agent_demo import run_stage4_demo
+        return run_stage4_demo, ""
+    except Exception as e:
+        return None, str(e)
 
-try:
-    from src.stage4_agents.agent_demo import run_stage4_demo
-except Exception as e:
-    STAGE4_AVAILABLE = False
-    STAGE4_IMPORT_ERROR = str(e)
 
+@st.cache_resource
+def stage4_runner():
+    """Background executor shared by all sessions; finished runs are cached by parameters."""
+    run_stage4_demo, _ = stage4()
+    return Stage4Runner(run_stage4_demo)
 
-def run_stage4_and_capture(verbose: bool = True) -> str:
-    """Run Stage 4 demo and capture stdout/stderr to display in Streamlit."""
-    if not STAGE4_AVAILABLE:
-        return f"Stage 4 indisponível (erro no import): {STAGE4_IMPORT_ERROR}"
 
-    buf = StringIO()
-    with redirect_stdout(buf), redirect_stderr(buf):
-        run_stage4_demo(verbose=verbose)
+def run_stage4_and_capture(verbose: bool = True) -> str:
+    """Run Stage 4 off the script thread and return its captured output (for the /stage4 command)."""
+    run_stage4_demo, error = stage4()
+    if run_stage4_demo is None:
+        return f"Stage 4 indisponível (erro no import): {error}"
 
-    out = buf.getvalue().strip()
+    try:
+        out = stage4_runner().submit(verbose=verbose).wait(STAGE4_TIMEOUT)
+    except Exception as e:
+        return f"Stage 4 falhou: {e}"
     return out if out else "Stage 4 executou, mas não houve output capturado. Verifique os logs do app."
 
 
+def _rerun_fragment():
+    try:
+        st.rerun(scope="fragment")
+    except (TypeError, StreamlitAPIException):  # Streamlit < 1.37, or a full-page run: rerun the page
+        st.rerun()
+
+
+@fragment
+def stage4_panel():
+    """Runs go to the background executor; while one is in flight only this fragment reruns to show progress."""
+    verbose = st.checkbox("Verbose (mostrar output do demo)", value=True)
+    run_col, again_col = st.columns(2)
+    if run_col.button("Run Stage 4 Demo"):
+        st.session_state.stage4_run = stage4_runner().submit(verbose=verbose)
+    if again_col.button("Rodar de novo (ignorar cache)"):
+        st.session_state.stage4_run = stage4_runner().submit(force=True, verbose=verbose)
+
+    run = st.session_state.get("stage4_run")
+    if run is None:
+        return
+    output = run.text()
+    if not run.done:
+        st.caption(f"⏳ Rodando em segundo plano… {run.elapsed:.1f}s")
+        st.code(output or "…")
+        time.sleep(STAGE4_POLL)
+        _rerun_fragment()
+    elif run.error is not None:
+        st.error(f"Stage 4 falhou: {run.error}")
+        if output:
+            st.code(output)
+    else:
+        st.caption(f"✅ Concluído em {run.elapsed:.2f}s (execução #{run.id})")
+        st.code(output or "Stage 4 executou, mas não houve output capturado. Verifique os logs do app.")
+
+
 # ---------------------------
 # Memory
 # ---------------------------
+@st.cache_resource
+def memory_journal():
+    """Single journal per server process; it serializes writes from all sessions."""
+    return ConversationJournal(MEM_FILE, max_messages=2 * MAX_TURNS, legacy_path=LEGACY_MEM_FILE)
+
+
 def load_memory():
-    if os.path.exists(MEM_FILE):
-        try:
-            with open(MEM_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            if isinstance(data, list):
-                return data[-2 * MAX_TURNS :]
-        except:
-            pass
-    return []
+    try:
+        return memory_journal().load()
+    except OSError as e:
+        st.warning(f"Não consegui ler a memória: {e}")
+        return []
+
 
+def trim_history(conversation):
+    """Drop the oldest messages past ``MAX_HISTORY`` (the rolling summary already covers them)."""
+    if len(conversation) > MAX_HISTORY:
+        del conversation[: len(conversation) - MAX_HISTORY]
+        st.session_state.remembered = min(st.session_state.get("remembered", 0), len(conversation) // 2)
 
-def save_memory(conv):
+
+def save_memory(messages):
+    """Append only the new messages (one user/assistant pair per turn)."""
     try:
-        with open(MEM_FILE, "w", encoding="utf-8") as f:
-            json.dump(conv[-2 * MAX_TURNS:], f, ensure_ascii=False, indent=2)
-    except:
-        pass
+        memory_journal().append(messages)
+    except OSError as e:
+        st.warning(f"Não consegui salvar a memória: {e}")
+
+
+@st.cache_resource
+def long_memory():
+    """TF-IDF index over every past turn, shared by all sessions."""
+    mem = SemanticMemory(LONG_MEM_FILE)
+    if not len(mem):
+        mem.add_many(turn_pairs(memory_journal().load()))  # first start: import the journal
+    return mem
 
 
 # ---------------------------
@@ -73,24 +156,50 @@ def ip_local():
         return "desconhecido"
 
 
-def spawn_cubo(url="http://127.0.0.1:8000"):
-    try:
-        import httpx
-        httpx.post(
-            f"{url}/spawn",
-            json={"id": "cube1", "type": "cube", "pos": [0, 1.2, 0.5], "color": "#00ffff"},
-            timeout=3,
-        )
-        return "Cubo criado."
-    except:
-        return "Não consegui falar com o servidor de cena."
+def spawn_cubo(url="http://127.0.0.1:8000", args=None):
+    return get_scene_client(url).spawn_command(args)
 
 
 # ---------------------------
 # LLM
 # ---------------------------
-def llm_reply(prompt, conversation):
-    client = OpenAI()
+@st.cache_resource
+def openai_client():
+    """One pooled client shared by every session and rerun of this server."""
+    return get_client()
+
+
+@st.cache_resource
+def response_cache():
+    """Reply cache shared by all sessions; JARVIS_LLM_CACHE=<file.sqlite> adds a disk tier."""
+    return ResponseCache(disk_path=os.getenv("JARVIS_LLM_CACHE") or None)
+
+
+@st.cache_resource
+def resilient_llm():
+    """Deadline, retries and hedging for every LLM call; the hedge delay learns from all sessions."""
+    return ResilientLLM()
+
+
+@st.cache_resource
+def model_router():
+    """Per-prompt model, max_tokens and temperature; its per-route totals cover every session."""
+    return ModelRouter()
+
+
+def llm_reply(prompt, conversation, on_token=None, stats=None, use_cache=True, context=None):
+    """Ask the model. With ``on_token`` the reply is streamed and each delta is passed to it.
+
+    Identical prompts (same recent context) are answered from ``response_cache()``
+    and concurrent duplicates share one upstream call. ``context`` (a
+    ``ContextBuilder``) keeps the prompt under ``CONTEXT_BUDGET`` tokens; the
+    most relevant older turns from ``long_memory()`` are sent along with it,
+    minus the ``remembered`` turns this session still has in ``conversation``.
+    When the call runs out of time, the streamed part or a stale cached reply
+    is returned instead of an error.
+    """
+    context = context if context is not None else ContextBuilder(budget=CONTEXT_BUDGET)
+    client = openai_client()
     system_msg = {
         "role": "system",
         "content": (
@@ -101,19 +210,59 @@ def llm_reply(prompt, conversation):
 
     # Append user once (do NOT append elsewhere)
     conversation.append({"role": "user", "content": prompt})
+    trim_history(conversation)
+
+    with METRICS.span("context"):
+        hits = long_memory().search(prompt, k=RECALL_K, skip_last=st.session_state.get("remembered", 0))
+        msgs, prompt_tokens = context.build(system_msg, conversation, [h.text() for h in hits])
+    route = model_router().route(prompt)
+    params = dict(messages=msgs, **route.params())
 
-    msgs = [system_msg] + conversation[-2 * MAX_TURNS :]
+    def ask():
+        return resilient_llm().complete(client, params, on_token, stats)
+
+    t0 = time.perf_counter()
+    source = "direct"
+    ck = cache_key(route.cache_tag, system_msg["content"], window_for(conversation, CACHE_WINDOW), prompt) if use_cache else None
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=msgs,
-            temperature=0.6,
-            max_tokens=300,
+        with METRICS.span("llm"):
+            try:
+                if ck is not None:
+                    reply, source = response_cache().get_or_compute(ck, ask)
+                    if source != "miss" and on_token is not None:
+                        if stats is not None:
+                            stats.first_token = stats.finished = time.perf_counter()
+                        on_token(reply)
+                else:
+                    reply = ask()
+            except LLMUnavailable as e:
+                fallback = degrade(e, response_cache().stale(ck) if ck is not None else None)
+                if fallback is None:
+                    raise
+                reply, source = fallback
+                if on_token is not None:
+                    on_token(PARTIAL_MARK if source == "partial" else reply)
+        latency = time.perf_counter() - t0
+        if stats is not None and stats.ttft is not None:
+            METRICS.observe("llm_ttft", stats.ttft)
+        if source in ("miss", "direct"):
+            model_router().record(route, latency, reply)
+        LOGGER.info(
+            "llm route=%s prompt_tokens=%d window=%d summary=%s recalled=%d source=%s latency=%.2fs",
+            route.name, prompt_tokens, context.last_window, bool(context.summary), context.last_recalled, source,
+            latency,
         )
-        reply = resp.choices[0].message.content.strip()
+        # Persist only once the full reply is in
         conversation.append({"role": "assistant", "content": reply})
-        save_memory(conversation)
+        if source not in ("partial", "stale"):  # a cut-off or outdated answer is not persisted
+            with METRICS.span("memory"):
+                save_memory(conversation[-2:])
+                long_memory().add(prompt, reply)
+                st.session_state.remembered = st.session_state.get("remembered", 0) + 1
+        trim_history(conversation)
         return reply
+    except LLMUnavailable as e:
+        return f"O modelo não respondeu ({e}). Tente de novo."
     except Exception as e:
         return f"OpenAI erro: {e}"
 
@@ -128,71 +277,181 @@ st.caption("Assistente IA com memória persistente, comandos especiais e suporte
 if "conversation" not in st.session_state:
     st.session_state.conversation = load_memory()
 
+if "remembered" not in st.session_state:
+    # LLM turns added to long_memory() by this session (commands never are): the recall skips them
+    st.session_state.remembered = 0
+
+if "context" not in st.session_state:
+    st.session_state.context = ContextBuilder(budget=CONTEXT_BUDGET)
+
+if "history_turns" not in st.session_state:
+    st.session_state.history_turns = HISTORY_TURNS
+
 conversation = st.session_state.conversation
+context = st.session_state.context
 
 with st.expander("📚 Memória"):
-    st.write(conversation[-10:])
+    st.json(conversation[-10:], expanded=False)
 
 with st.expander("🧪 Stage 4 — Agent Demo"):
-    if not STAGE4_AVAILABLE:
-        st.error(f"Não consegui importar Stage 4: {STAGE4_IMPORT_ERROR}")
+    _, stage4_error = stage4()
+    if stage4_error:
+        st.error(f"Não consegui importar Stage 4: {stage4_error}")
         st.info("Dica: crie src/__init__.py e src/stage4_agents/__init__.py (arquivos vazios) e reinicie o app.")
     else:
-        stage4_verbose = st.checkbox("Verbose (mostrar output do demo)", value=True)
-        if st.button("Run Stage 4 Demo"):
-            output = run_stage4_and_capture(verbose=stage4_verbose)
-            st.code(output)
-
-user_input = st.chat_input("Digite sua mensagem...")
-
-
-def process_command(cmd):
-    c = cmd.lower().strip()
-
-    if c in {"parar", "sair", "exit", "quit"}:
+        stage4_panel()
+
+
+@fragment
+def metrics_panel():
+    """Latency per stage for this server process (all sessions); "Atualizar" reruns only this fragment."""
+    st.button("Atualizar", key="metrics_refresh")
+    snap = METRICS.snapshot()
+    if not snap:
+        st.caption(METRICS.summary())
+        return
+    st.dataframe(
+        [
+            {"etapa": name, "n": s["count"], **{k: round(s[k] * 1e3, 1) for k in ("p50", "p95", "p99", "max")}}
+            for name, s in snap.items()
+        ],
+        hide_index=True,
+    )
+    st.caption("Tempos em ms.")
+    prom_col, jsonl_col = st.columns(2)
+    prom_col.download_button("Prometheus", METRICS.to_prometheus(), "jarvis_metrics.prom", "text/plain")
+    jsonl_col.download_button("JSON lines", METRICS.to_json_lines(), "jarvis_metrics.jsonl", "application/x-ndjson")
+
+
+with st.expander("📈 Métricas de latência"):
+    metrics_panel()
+
+stream_on = st.sidebar.toggle("Streaming de resposta", value=True)
+st.sidebar.caption(response_cache().summary())
+
+
+@st.cache_resource
+def command_router():
+    """Compiled once per server; handlers get the session's state as arguments."""
+    router = CommandRouter()
+
+    @router.command("exit")
+    def _exit(m, conversation, context):
         return "Encerrando (simulado na versão web)."
 
-    if c in {"/reset", "reset"}:
+    @router.command("reset")
+    def _reset(m, conversation, context):
         conversation.clear()
-        save_memory(conversation)
+        context.reset()
+        st.session_state.remembered = 0
+        try:
+            memory_journal().reset()
+            long_memory().reset()
+        except OSError as e:
+            st.warning(f"Não consegui limpar a memória: {e}")
         return "Memória limpa."
 
-    if c in {"/mem", "memoria", "memória"}:
-        return f"Itens na memória: {len(conversation)}"
+    @router.command("mem")
+    def _mem(m, conversation, context):
+        return f"Itens na memória: {len(conversation)} ({len(long_memory())} turnos no longo prazo)"
+
+    @router.command("cache")
+    def _cache(m, conversation, context):
+        return response_cache().summary()
+
+    @router.command("stats")
+    def _stats(m, conversation, context):
+        return f"```\n{METRICS.summary()}\n{resilient_llm().summary()}\n{model_router().summary()}\n```"
 
-    if c in {"/stage4", "stage4", "rodar stage4"}:
+    @router.command("stage4")
+    def _stage4(m, conversation, context):
         return run_stage4_and_capture(verbose=True)
 
-    if "hora" in c:
+    @router.command("time")
+    def _time(m, conversation, context):
         return time.strftime("Agora são %H:%M.")
 
-    if "ip" in c:
+    @router.command("ip")
+    def _ip(m, conversation, context):
         return f"Seu IP local é {ip_local()}"
 
-    if "spawn cubo" in c or "criar cubo" in c:
-        return spawn_cubo()
+    @router.command("spawn")
+    def _spawn(m, conversation, context):
+        return spawn_cubo(args=m.args)
 
-    return None
+    return router
 
 
-# Render chat history
-for msg in conversation:
-    if msg.get("role") == "user":
-        st.chat_message("user").write(msg.get("content", ""))
-    else:
-        st.chat_message("assistant").write(msg.get("content", ""))
+def process_command(cmd):
+    with METRICS.span("dispatch"):
+        match = command_router().match(cmd)
+    if match is None:
+        return None
+    with METRICS.span("command"):
+        return match.run(conversation, context)
+
+
+def _load_more():
+    st.session_state.history_turns += HISTORY_TURNS
+
+
+def render_history():
+    """Only the last ``history_turns`` turns; older ones come in on demand."""
+    turns = st.session_state.history_turns
+    start = max(0, len(conversation) - 2 * turns) if turns > 0 else 0
+    if start > 0:
+        st.button(f"⬆️ Carregar mais ({start // 2} turnos anteriores)", key="load_more", on_click=_load_more)
+    for msg in conversation[start:]:
+        role = "user" if msg.get("role") == "user" else "assistant"
+        st.chat_message(role).write(msg.get("content", ""))
+
+
+@fragment
+def chat():
+    """Chat section; a message or "load more" reruns just this fragment, not the page."""
+    render_history()
+
+    user_input = st.chat_input("Digite sua mensagem...")
+    if not user_input:
+        return
+
+    with METRICS.turn():
+        respond(user_input)
+
 
-# Input handling
-if user_input:
+def respond(user_input):
+    """One turn: a command or an LLM reply, rendered into the chat."""
     st.chat_message("user").write(user_input)
+    # "/fresh <pergunta>" or "!<pergunta>" skips the response cache
+    user_input, bypass_cache = split_bypass(user_input.strip())
 
     cmd_result = process_command(user_input)
     if cmd_result:
         st.chat_message("assistant").write(cmd_result)
         conversation.append({"role": "user", "content": user_input})
         conversation.append({"role": "assistant", "content": cmd_result})
-        save_memory(conversation)
+        trim_history(conversation)
+        save_memory(conversation[-2:])
     else:
-        reply = llm_reply(user_input, conversation)
-        st.chat_message("assistant").write(reply)
-        save_memory(conversation)
+        if stream_on:
+            with st.chat_message("assistant"):
+                placeholder = st.empty()
+                parts = []
+
+                def _render(delta):
+                    parts.append(delta)
+                    placeholder.markdown("".join(parts) + "▌")
+
+                stats = StreamStats()
+                reply = llm_reply(
+                    user_input, conversation, on_token=_render, stats=stats,
+                    use_cache=not bypass_cache, context=context,
+                )
+                placeholder.markdown(reply)
+                st.caption(f"{stats.summary()} · {context.last_prompt_tokens} tokens de prompt")
+        else:
+            reply = llm_reply(user_input, conversation, use_cache=not bypass_cache, context=context)
+            st.chat_message("assistant").write(reply)
+
+
+chat()
@@ -0,0 +1,151 @@
+"""Non-interactive runs: prompt files, a rate limiter and a bounded concurrent runner.
+
+``run_batch`` reads prompts lazily. Items that ``inline`` handles (local
+commands) are answered right away on the calling thread. The rest go to a
+thread pool, at most ``concurrency`` at a time, with starts paced by a
+:class:`RateLimiter`. Records are yielded as soon as they finish, in
+completion order, so callers stream them out as JSON lines. Each record
+carries its input ``index``.
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, TextIO
+
+Record = Dict[str, Any]
+
+
+def read_prompts(source: TextIO) -> Iterator[str]:
+    """One prompt per line; blank lines and ``#`` comments are skipped."""
+    for line in source:
+        prompt = line.strip()
+        if prompt and not prompt.startswith("#"):
+            yield prompt
+
+
+class RateLimiter:
+    """Token bucket allowing ``rate`` acquisitions per second with bursts of ``burst``; ``rate <= 0`` is unlimited.
+
+    Thread-safe. Each caller reserves its slot under the lock and sleeps
+    outside it, so waiting callers are served in arrival order.
+    """
+
+    def __init__(self, rate: float = 0.0, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until it is available; returns the seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1.0
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay:
+            time.sleep(delay)
+        return delay
+
+
+def run_batch(
+    prompts: Iterable[str],
+    ask: Callable[[int, str], Record],
+    concurrency: int = 4,
+    limiter: Optional[RateLimiter] = None,
+    inline: Optional[Callable[[int, str], Optional[Record]]] = None,
+) -> Iterator[Record]:
+    """Yield one record per prompt, each with ``index``, ``prompt`` and ``latency_ms`` filled in.
+
+    ``inline(index, prompt)`` returns a record for prompts it handles itself,
+    or ``None`` to hand the prompt to ``ask``. A record with ``"stop": True``
+    ends the batch once the prompts already submitted have finished. An
+    exception in ``ask`` becomes an ``error`` field on that record.
+    """
+    limiter = limiter or RateLimiter()
+
+    def timed(fn: Callable[[int, str], Optional[Record]], index: int, prompt: str) -> Optional[Record]:
+        t0 = time.perf_counter()
+        try:
+            record = fn(index, prompt)
+        except Exception as e:
+            record = {"error": f"{type(e).__name__}: {e}"}
+        if record is None:
+            return None
+        record = {"index": index, "prompt": prompt, **record}
+        record["latency_ms"] = round((time.perf_counter() - t0) * 1e3, 2)
+        return record
+
+    def paced(index: int, prompt: str) -> Optional[Record]:
+        waited = limiter.acquire()
+        record = timed(ask, index, prompt)
+        if waited and record is not None:
+            record["queued_ms"] = round(waited * 1e3, 2)  # rate-limit wait, not counted in latency_ms
+        return record
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="jarvis-batch") as pool:
+        pending: Set[Future] = set()
+
+        def finished(block: bool) -> List[Record]:
+            nonlocal pending
+            if not pending:
+                return []
+            done, pending = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+            return [f.result() for f in done]
+
+        for index, prompt in enumerate(prompts):
+            yield from finished(block=False)
+            record = timed(inline, index, prompt) if inline is not None else None
+            if record is not None:
+                yield record
+                if record.get("stop"):
+                    break
+                continue
+            while len(pending) >= max(1, concurrency):
+                yield from finished(block=True)  # backpressure: read no further until a slot frees up
+            pending.add(pool.submit(paced, index, prompt))
+        while pending:
+            yield from finished(block=True)
+
+
+class BatchStats:
+    """Running totals over yielded records, for the final throughput summary."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.latencies: List[float] = []
+        self.items = 0
+        self.errors = 0
+        self.commands = 0
+
+    def add(self, record: Record) -> None:
+        self.items += 1
+        if record.get("error"):
+            self.errors += 1
+        if record.get("kind") == "command":
+            self.commands += 1
+        else:
+            self.latencies.append(record["latency_ms"])
+
+    def summary(self) -> Dict[str, Any]:
+        wall = time.perf_counter() - self.started
+        ordered = sorted(self.latencies)
+
+        def pct(p: float) -> float:
+            return ordered[min(len(ordered) - 1, max(0, int(-(-len(ordered) * p // 100)) - 1))] if ordered else 0.0
+
+        return {
+            "items": self.items,
+            "llm": len(ordered),
+            "commands": self.commands,
+            "errors": self.errors,
+            "wall_s": round(wall, 3),
+            "items_per_s": round(self.items / wall, 2) if wall > 0 else 0.0,
+            "latency_ms_p50": pct(50),
+            "latency_ms_p95": pct(95),
+            "latency_ms_p99": pct(99),
+        }
@@ -0,0 +1,179 @@
+"""Command registry shared by the Jarvis front-ends.
+
+Inputs are normalized once (case-folded, accents stripped) and matched with
+an exact-alias dict lookup, then one precompiled alternation regex over every
+registered phrase and pattern. Phrases only match whole words, so "tipo" no
+longer triggers ``ip`` and "equipe" no longer reaches it. Front-ends register
+handlers for the commands they support; anything unmatched falls through to
+the LLM.
+"""
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Pattern, Sequence
+
+from src.jarvis_core.scene import SPAWN_PATTERN
+
+Handler = Callable[..., Any]
+
+_COMBINING = re.compile(r"[\u0300-\u036f]")
+_WORD = re.compile(r"\w+")
+_EDGE_PUNCT = " \"'.,;:!?…¿¡"
+_NAMED_GROUP = re.compile(r"\(\?P<\w+>")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and collapse whitespace ("Que HORAS são?" -> "que horas sao?")."""
+    text = text.casefold()
+    if not text.isascii():
+        text = _COMBINING.sub("", unicodedata.normalize("NFKD", text))
+    return " ".join(text.split())
+
+
+@dataclass(frozen=True)
+class CommandSpec:
+    """How a command is recognized.
+
+    ``aliases`` must equal the whole input (ignoring edge punctuation);
+    ``phrases`` may appear anywhere as whole words; ``pattern`` is a regex over
+    the normalized input, tried where a word starts, whose named groups become
+    :attr:`CommandMatch.args` (no backreferences).
+    """
+
+    name: str
+    aliases: Sequence[str] = ()
+    phrases: Sequence[str] = ()
+    pattern: Optional[str] = None
+
+
+# Built-in commands, in priority order (earlier wins when several match).
+BUILTIN_COMMANDS: Dict[str, CommandSpec] = {
+    spec.name: spec
+    for spec in (
+        CommandSpec("exit", aliases=("parar", "sair", "fechar", "encerrar", "tchau", "quit", "exit")),
+        CommandSpec("reset", aliases=("/reset", "reset", "limpar memoria")),
+        CommandSpec("mem", aliases=("/mem", "memoria")),
+        CommandSpec("save", aliases=("/save", "salvar")),
+        CommandSpec("cache", aliases=("/cache", "cache")),
+        CommandSpec("stats", aliases=("/stats", "stats", "metricas")),
+        CommandSpec("stage4", aliases=("/stage4", "stage4", "rodar stage4")),
+        CommandSpec("time", phrases=("que horas", "horas sao", "que hora e", "diz a hora", "dizer a hora",
+                                     "hora certa", "horario agora", "que horario")),
+        CommandSpec("ip", phrases=("ip", "endereco ip")),
+        CommandSpec("open_jupyter", phrases=("abrir jupyter",)),
+        CommandSpec("open_vscode", phrases=("abrir vscode", "abrir vs code")),
+        CommandSpec("spawn", phrases=("spawn cubo", "criar cubo"), pattern=SPAWN_PATTERN),
+    )
+}
+
+
+@dataclass
+class CommandMatch:
+    name: str
+    text: str
+    handler: Optional[Handler] = None
+    args: Dict[str, Optional[str]] = field(default_factory=dict)
+
+    def run(self, *args: Any, **kwargs: Any) -> Any:
+        """Call the bound handler as ``handler(match, *args, **kwargs)``."""
+        if self.handler is None:
+            raise LookupError(f"no handler bound for command {self.name!r}")
+        return self.handler(self, *args, **kwargs)
+
+
+@dataclass
+class _Entry:
+    spec: CommandSpec
+    handler: Optional[Handler]
+    regex: Optional[Pattern] = None
+
+
+class CommandRouter:
+    """Registry of commands compiled into an alias table and one regex."""
+
+    def __init__(self) -> None:
+        self._entries: List[_Entry] = []
+        self._by_name: Dict[str, _Entry] = {}
+        self._aliases: Dict[str, _Entry] = {}
+        self._combined: Optional[Pattern] = None
+        self._dirty = True
+
+    def register(self, spec: CommandSpec, handler: Optional[Handler] = None) -> None:
+        """Add (or replace) a command; registration order is match priority."""
+        entry = _Entry(spec, handler)
+        if spec.name in self._by_name:
+            self._entries[self._entries.index(self._by_name[spec.name])] = entry
+        else:
+            self._entries.append(entry)
+        self._by_name[spec.name] = entry
+        self._dirty = True
+
+    def command(
+        self,
+        name: str,
+        aliases: Sequence[str] = (),
+        phrases: Sequence[str] = (),
+        pattern: Optional[str] = None,
+    ) -> Callable[[Handler], Handler]:
+        """Decorator: bind a handler to ``name``.
+
+        Without matchers, the built-in spec of the same name is used.
+        """
+
+        def deco(fn: Handler) -> Handler:
+            if aliases or phrases or pattern:
+                spec = CommandSpec(name, tuple(aliases), tuple(phrases), pattern)
+            elif name in BUILTIN_COMMANDS:
+                spec = BUILTIN_COMMANDS[name]
+            else:
+                raise KeyError(f"unknown command {name!r}: pass aliases, phrases or a pattern")
+            self.register(spec, fn)
+            return fn
+
+        return deco
+
+    def names(self) -> List[str]:
+        return [e.spec.name for e in self._entries]
+
+    def _compile(self) -> None:
+        """One branch per command, in priority order, tried only where a word starts.
+
+        The branches sit in a lookahead, so matching consumes nothing and a
+        lower-priority match cannot hide a higher-priority one further on.
+        """
+        self._aliases = {}
+        branches = []
+        for idx, entry in enumerate(self._entries):
+            spec = entry.spec
+            for alias in spec.aliases:
+                self._aliases.setdefault(normalize(alias).strip(_EDGE_PUNCT), entry)
+            alternatives = [
+                r"\W+".join(map(re.escape, words)) + r"(?!\w)"
+                for words in (_WORD.findall(normalize(phrase)) for phrase in spec.phrases)
+                if words
+            ]
+            if spec.pattern:
+                alternatives.append(_NAMED_GROUP.sub("(?:", spec.pattern))
+            entry.regex = re.compile(spec.pattern) if spec.pattern else None
+            if alternatives:
+                branches.append(f"(?P<_c{idx}>{'|'.join(alternatives)})")
+        self._combined = re.compile(r"(?<!\w)(?=" + "|".join(branches) + ")") if branches else None
+        self._dirty = False
+
+    def match(self, text: str) -> Optional[CommandMatch]:
+        if self._dirty:
+            self._compile()
+        norm = normalize(text)
+        entry = self._aliases.get(norm.strip(_EDGE_PUNCT))
+        if entry is None and self._combined is not None:
+            best = min((int(m.lastgroup[2:]) for m in self._combined.finditer(norm)), default=None)
+            if best is not None:
+                entry = self._entries[best]
+        if entry is None:
+            return None
+        args: Dict[str, Optional[str]] = {}
+        if entry.regex is not None:
+            m = entry.regex.search(norm)
+            if m:
+                args = m.groupdict()
+        return CommandMatch(entry.spec.name, text, entry.handler, args)
@@ -0,0 +1,170 @@
+"""Token-budgeted prompt assembly with an incrementally maintained rolling summary.
+
+The newest messages are kept verbatim while they fit in the token budget;
+anything older is folded into a short summary that is only extended when the
+window slides forward, so each turn summarizes just the newly evicted messages.
+"""
+import logging
+import re
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+Message = Dict[str, str]
+Summarizer = Callable[[str, Sequence[Message]], str]
+
+MESSAGE_OVERHEAD = 4  # role/separators the chat format adds per message
+_PIECES = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_SENTENCE = re.compile(r"(?<=[.!?…])\s+")
+
+try:  # exact counts when tiktoken is installed; otherwise a local estimate
+    import tiktoken
+
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _ENCODING = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count for ``text`` (tiktoken if available, else a word-piece estimate)."""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    # ~1 token per short word/punctuation mark, long words split every 4 chars
+    return sum(1 + (len(p) - 1) // 4 for p in _PIECES.findall(text))
+
+
+def message_tokens(message: Message) -> int:
+    return estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD
+
+
+def count_tokens(messages: Sequence[Message]) -> int:
+    return sum(message_tokens(m) for m in messages)
+
+
+def extractive_summary(previous: str, evicted: Sequence[Message], max_tokens: int = 300) -> str:
+    """Offline summarizer: first sentence of each evicted message, oldest lines dropped past ``max_tokens``."""
+    lines = previous.splitlines() if previous else []
+    for m in evicted:
+        content = " ".join(m.get("content", "").split())
+        if not content:
+            continue
+        first = _SENTENCE.split(content, 1)[0][:160]
+        who = "Usuário" if m.get("role") == "user" else "Jarvis"
+        lines.append(f"- {who}: {first}")
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class ContextBuilder:
+    """Build the ``messages`` list for one request under ``budget`` prompt tokens.
+
+    ``summary_budget`` tokens (default: a quarter of the budget) are set aside
+    for the rolling summary once a request evicts turns; until then, only
+    what the current summary uses is reserved. Up to ``recall_budget``
+    (default: a fifth) for relevant older turns retrieved from long-term memory;
+    recall tokens that go unused stay available to the recent window. The
+    builder remembers the last message it summarized (by identity), so callers
+    may trim their history from the front without re-summarizing; call
+    :meth:`reset` when the conversation is cleared.
+    """
+
+    def __init__(
+        self,
+        budget: int = 1500,
+        summary_budget: Optional[int] = None,
+        summarizer: Optional[Summarizer] = None,
+        recall_budget: Optional[int] = None,
+    ) -> None:
+        self.budget = budget
+        self.summary_budget = summary_budget if summary_budget is not None else budget // 4
+        self.recall_budget = recall_budget if recall_budget is not None else budget // 5
+        self.summarizer = summarizer or (lambda prev, ev: extractive_summary(prev, ev, self.summary_budget))
+        self.summary = ""
+        self._last_summarized: Optional[Message] = None
+        self.last_prompt_tokens = 0
+        self.last_window = 0
+        self.last_recalled = 0
+
+    def reset(self) -> None:
+        self.summary = ""
+        self._last_summarized = None
+
+    def _summarized_upto(self, conversation: Sequence[Message]) -> int:
+        """Index just after the last summarized message (0 if it was trimmed away)."""
+        if self._last_summarized is None:
+            return 0
+        for i in range(len(conversation) - 1, -1, -1):
+            if conversation[i] is self._last_summarized:
+                return i + 1
+        return 0
+
+    def _recall_message(self, recalled: Sequence[str]) -> Optional[Message]:
+        """Recalled turns (best first) that fit in ``recall_budget``, as one system message."""
+        header = "Trechos relevantes de conversas antigas:"
+        parts: List[str] = []
+        used = estimate_tokens(header) + MESSAGE_OVERHEAD
+        for text in recalled:
+            cost = estimate_tokens(text) + 1
+            if used + cost > self.recall_budget:
+                continue  # too long; a shorter, less relevant one may still fit
+            parts.append(text)
+            used += cost
+        self.last_recalled = len(parts)
+        if not parts:
+            return None
+        return {"role": "system", "content": header + "\n" + "\n---\n".join(parts)}
+
+    def _summary_message(self) -> Optional[Message]:
+        if not self.summary:
+            return None
+        return {"role": "system", "content": "Resumo da conversa anterior:\n" + self.summary}
+
+    @staticmethod
+    def _cut(conversation: Sequence[Message], available: int) -> int:
+        """Index of the oldest message of the newest suffix that fits in ``available`` tokens."""
+        cut = len(conversation)
+        used = 0
+        while cut > 0:
+            cost = message_tokens(conversation[cut - 1])
+            if used + cost > available and cut < len(conversation):
+                break  # the newest message is always sent, even if oversized
+            used += cost
+            cut -= 1
+        return cut
+
+    def build(
+        self, system_msg: Message, conversation: Sequence[Message], recalled: Sequence[str] = ()
+    ) -> Tuple[List[Message], int]:
+        """Return ``(messages, prompt_tokens)`` for the chat API.
+
+        ``recalled`` holds older turns from long-term memory, most relevant first.
+        """
+        recall_msg = self._recall_message(recalled)
+        available = self.budget - message_tokens(system_msg)
+        if recall_msg is not None:
+            available -= message_tokens(recall_msg)
+        summary_msg = self._summary_message()
+        cut = self._cut(conversation, available - (message_tokens(summary_msg) if summary_msg else 0))
+        done = self._summarized_upto(conversation)
+        if cut > done:
+            # new messages get folded in: leave the summary room to grow
+            cut = self._cut(conversation, available - self.summary_budget)
+            evicted = conversation[done:cut]
+            self.summary = self.summarizer(self.summary, evicted)
+            self._last_summarized = conversation[cut - 1]
+            summary_msg = self._summary_message()
+            LOGGER.debug("Folded %d messages into the rolling summary", len(evicted))
+
+        messages: List[Message] = [system_msg]
+        if recall_msg is not None:
+            messages.append(recall_msg)
+        if summary_msg is not None:
+            messages.append(summary_msg)
+        window = list(conversation[max(cut, done):])
+        messages.extend(window)
+        self.last_prompt_tokens = count_tokens(messages)
+        self.last_window = len(window)
+        return messages, self.last_prompt_tokens
@@ -0,0 +1,156 @@
+"""Shared helpers for talking to the OpenAI chat API from the Jarvis front-ends."""
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+# Pool/timeouts for the shared client (override through the environment).
+POOL_SIZE = int(os.getenv("JARVIS_OPENAI_POOL_SIZE", "10"))
+TIMEOUT = float(os.getenv("JARVIS_OPENAI_TIMEOUT", "30"))
+CONNECT_TIMEOUT = float(os.getenv("JARVIS_OPENAI_CONNECT_TIMEOUT", "5"))
+KEEPALIVE_EXPIRY = float(os.getenv("JARVIS_OPENAI_KEEPALIVE", "60"))
+
+_clients: Dict[Tuple[Optional[str], Optional[str]], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def make_client(
+    api_key: Optional[str] = None,
+    base_url: Optional[str] = None,
+    pool_size: int = POOL_SIZE,
+    timeout: float = TIMEOUT,
+    connect_timeout: float = CONNECT_TIMEOUT,
+) -> Any:
+    """Build an ``OpenAI`` client backed by a keep-alive httpx connection pool."""
+    import httpx
+    from openai import OpenAI
+
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+    )
+    return OpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+
+
+def make_async_client(
+    api_key: Optional[str] = None,
+    base_url: Optional[str] = None,
+    pool_size: int = POOL_SIZE,
+    timeout: float = TIMEOUT,
+    connect_timeout: float = CONNECT_TIMEOUT,
+) -> Any:
+    """``AsyncOpenAI`` twin of :func:`make_client`; create it on the event loop that will use it."""
+    import httpx
+    from openai import AsyncOpenAI
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+    )
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+
+
+def get_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> Any:
+    """Return the process-wide client for ``(api_key, base_url)``, creating it on first use.
+
+    ``None`` means "let the SDK read ``OPENAI_API_KEY`` / ``OPENAI_BASE_URL``".
+    """
+    key = (api_key, base_url)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = make_client(api_key=api_key, base_url=base_url)
+                _clients[key] = client
+    return client
+
+
+def close_clients() -> None:
+    """Close and forget every pooled client (tests, shutdown, key rotation)."""
+    with _clients_lock:
+        for client in _clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _clients.clear()
+
+
+@dataclass
+class StreamStats:
+    """Wall-clock timings for one chat completion (perf_counter based)."""
+
+    started: float = field(default_factory=time.perf_counter)
+    first_token: Optional[float] = None
+    finished: Optional[float] = None
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Seconds until the first content token arrived."""
+        if self.first_token is None:
+            return None
+        return self.first_token - self.started
+
+    @property
+    def total(self) -> Optional[float]:
+        if self.finished is None:
+            return None
+        return self.finished - self.started
+
+    def summary(self) -> str:
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "-"
+        total = f"{self.total:.2f}s" if self.total is not None else "-"
+        return f"TTFT {ttft} · total {total}"
+
+
+def stream_chat(client: Any, stats: Optional[StreamStats] = None, **kwargs: Any) -> Iterator[str]:
+    """Yield content deltas from a streamed chat completion.
+
+    ``kwargs`` are forwarded to ``client.chat.completions.create``; ``stream``
+    is forced on. ``stats`` (if given) is filled in as tokens arrive.
+    """
+    stats = stats if stats is not None else StreamStats()
+    stream = None
+    try:
+        stream = client.chat.completions.create(stream=True, **kwargs)
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if stats.first_token is None:
+                stats.first_token = time.perf_counter()
+            yield delta
+    finally:
+        stats.finished = time.perf_counter()
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()  # release the pooled connection even when the caller stops early
+
+
+async def astream_chat(client: Any, stats: Optional[StreamStats] = None, **kwargs: Any) -> AsyncIterator[str]:
+    """Async :func:`stream_chat` for an ``AsyncOpenAI`` client."""
+    stats = stats if stats is not None else StreamStats()
+    try:
+        async for chunk in await client.chat.completions.create(stream=True, **kwargs):
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if stats.first_token is None:
+                stats.first_token = time.perf_counter()
+            yield delta
+    finally:
+        stats.finished = time.perf_counter()
@@ -0,0 +1,248 @@
+"""Append-only JSONL journal for the persistent conversation memory.
+
+Each line is one message (``{"role": ..., "content": ...}``) or a reset marker
+(``{"op": "reset"}``). A turn costs one ``O_APPEND`` write regardless of history
+size; fsyncs are batched and the file is periodically compacted (atomically,
+via ``os.replace``) down to the last ``max_messages`` entries. Loading only reads
+the tail of the file.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+Message = Dict[str, str]
+
+_RESET = {"op": "reset"}
+_BLOCK = 64 * 1024
+
+try:  # POSIX
+    import fcntl
+
+    def _lock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def _unlock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+except ImportError:  # Windows
+    import msvcrt
+
+    def _lock(fd: int) -> None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+    def _unlock(fd: int) -> None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def _valid(entry: object) -> bool:
+    return isinstance(entry, dict) and "role" in entry and "content" in entry
+
+
+class ConversationJournal:
+    """Crash-safe conversation log shared by threads and processes.
+
+    Threads in one process serialize on a ``threading.Lock``; processes serialize
+    on an advisory lock over ``<path>.lock``. Writers notice when another process
+    compacted the file (inode changed) and reopen it before appending.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_messages: int = 40,
+        fsync_every: int = 8,
+        fsync_interval: float = 2.0,
+        compact_every: int = 200,
+        legacy_path: Optional[str] = None,
+    ) -> None:
+        self.path = path
+        self.max_messages = max_messages
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._lock_fd: Optional[int] = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._since_compact = 0
+
+    # ---- locking / file handles -------------------------------------------
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            if self._lock_fd is None:
+                self._lock_fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+            _lock(self._lock_fd)
+            try:
+                yield
+            finally:
+                _unlock(self._lock_fd)
+
+    def _handle(self) -> int:
+        """Return an append fd for ``path``, reopening if the file was replaced."""
+        if self._fd is not None:
+            try:
+                if os.fstat(self._fd).st_ino == os.stat(self.path).st_ino:
+                    return self._fd
+            except FileNotFoundError:
+                pass
+            os.close(self._fd)
+            self._fd = None
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._terminate_torn_line()
+        return self._fd
+
+    def _terminate_torn_line(self) -> None:
+        """After a crash mid-write, start the next record on a fresh line."""
+        try:
+            with open(self.path, "rb") as f:
+                if f.seek(0, os.SEEK_END) == 0:
+                    return
+                f.seek(-1, os.SEEK_END)
+                last = f.read(1)
+            if last != b"\n":
+                os.write(self._fd, b"\n")
+        except OSError:
+            pass
+
+    def _sync(self, force: bool = False) -> None:
+        if self._fd is None or not self._unsynced:
+            return
+        due = self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval
+        if force or due:
+            os.fsync(self._fd)
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    # ---- writes -------------------------------------------------------------
+    def _write(self, entries: Iterable[dict]) -> None:
+        data = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries).encode("utf-8")
+        if not data:
+            return
+        with self._locked():
+            self._migrate_legacy()
+            fd = self._handle()
+            os.write(fd, data)  # single O_APPEND write: lines never interleave
+            self._unsynced += 1
+            self._since_compact += 1
+            self._sync()
+            if self._since_compact >= self.compact_every:
+                self._compact_locked()
+
+    def append(self, messages: Iterable[Message]) -> None:
+        """Append messages (typically one user/assistant pair) to the journal."""
+        self._write({"role": m["role"], "content": m["content"]} for m in messages)
+
+    def reset(self) -> None:
+        """Forget everything written so far (recorded as a marker, compacted later)."""
+        self._write([_RESET])
+
+    def flush(self) -> None:
+        """fsync any batched writes now."""
+        with self._locked():
+            self._sync(force=True)
+
+    def compact(self) -> None:
+        with self._locked():
+            self._compact_locked()
+
+    def _compact_locked(self) -> None:
+        window = self._read_tail()
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for m in window:
+                f.write(json.dumps(m, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if self._fd is not None:  # Windows refuses to replace an open file
+            os.close(self._fd)
+            self._fd = None
+        os.replace(tmp, self.path)
+        self._unsynced = 0
+        self._since_compact = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                if self._unsynced:
+                    os.fsync(self._fd)
+                os.close(self._fd)
+                self._fd = None
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+
+    # ---- reads --------------------------------------------------------------
+    def load(self) -> List[Message]:
+        """Return the last ``max_messages`` messages, reading only the file tail."""
+        with self._locked():
+            self._migrate_legacy()
+            return self._read_tail()
+
+    def _read_tail(self) -> List[Message]:
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return []
+        out: List[Message] = []
+        with f:
+            pos = f.seek(0, os.SEEK_END)
+            buf = b""
+            while True:
+                start = max(0, pos - _BLOCK)
+                f.seek(start)
+                buf = f.read(pos - start) + buf
+                pos = start
+                lines = buf.split(b"\n")
+                # the first piece may be a partial line unless we reached BOF
+                complete = lines if pos == 0 else lines[1:]
+                out, hit_reset = self._parse_backwards(complete)
+                if hit_reset or len(out) >= self.max_messages or pos == 0:
+                    break
+        return out[-self.max_messages:]
+
+    @staticmethod
+    def _parse_backwards(lines: List[bytes]):
+        found: List[Message] = []
+        for raw in reversed(lines):
+            if not raw.strip():
+                continue
+            try:
+                entry = json.loads(raw)
+            except ValueError:
+                continue  # torn write from a crash
+            if entry == _RESET:
+                return list(reversed(found)), True
+            if _valid(entry):
+                found.append({"role": entry["role"], "content": entry["content"]})
+        return list(reversed(found)), False
+
+    def _migrate_legacy(self) -> None:
+        """Import the old whole-file ``jarvis_mem.json`` once, if present."""
+        if not self.legacy_path or os.path.exists(self.path) or not os.path.exists(self.legacy_path):
+            return
+        try:
+            with open(self.legacy_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            LOGGER.warning("Ignoring unreadable legacy memory %s: %s", self.legacy_path, e)
+            return
+        if isinstance(data, list):
+            entries = [m for m in data if _valid(m)][-self.max_messages:]
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for m in entries:
+                    f.write(json.dumps({"role": m["role"], "content": m["content"]}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
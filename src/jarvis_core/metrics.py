@@ -0,0 +1,224 @@
+"""Latency spans and in-process histograms for the Jarvis turn stages.
+
+    with METRICS.turn():
+        with METRICS.span("llm"):
+            ...
+
+Each stage (stt, dispatch, command, context, llm, memory, tts, turn) has a
+histogram. The histogram keeps cumulative Prometheus-style buckets for export
+and a window of recent samples for exact p50/p95/p99. Spans opened inside
+``turn()`` on the same thread are also collected into one per-turn record,
+which is appended to ``JARVIS_METRICS_LOG`` (JSON lines) when that is set.
+
+``JARVIS_METRICS=0`` disables the layer: ``span()`` then returns a shared
+no-op context manager, so instrumented code pays one attribute check.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, ContextManager, Deque, Dict, Optional, Sequence, TextIO
+
+# upper bounds in seconds (Prometheus ``le``); +Inf is implicit
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+WINDOW = 2048  # recent samples kept per stage for percentiles
+
+_NOOP = nullcontext()
+
+
+def _percentile(ordered: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+class Histogram:
+    """Cumulative buckets plus a bounded window of recent samples. Not locked: :class:`Metrics` locks."""
+
+    __slots__ = ("buckets", "counts", "count", "sum", "max", "recent")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, window: int = WINDOW) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.recent.append(seconds)
+
+    def snapshot(self) -> Dict[str, float]:
+        ordered = sorted(self.recent)
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": _percentile(ordered, 50),
+            "p95": _percentile(ordered, 95),
+            "p99": _percentile(ordered, 99),
+            "max": self.max,
+        }
+
+
+class _Span:
+    __slots__ = ("_metrics", "_name", "_t0")
+
+    def __init__(self, metrics: "Metrics", name: str) -> None:
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self) -> "_Span":
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._metrics.observe(self._name, time.perf_counter() - self._t0)
+
+
+class _Turn:
+    __slots__ = ("_metrics", "_t0", "spans")
+
+    def __init__(self, metrics: "Metrics") -> None:
+        self._metrics = metrics
+        self.spans: Dict[str, float] = {}
+
+    def __enter__(self) -> "_Turn":
+        self._metrics._local.turn = self
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        total = time.perf_counter() - self._t0
+        self._metrics._local.turn = None
+        self._metrics.observe("turn", total)
+        self._metrics._log_turn(total, self.spans)
+
+
+class Metrics:
+    """Thread-safe registry of per-stage histograms."""
+
+    def __init__(self, enabled: bool = True, log_path: Optional[str] = None) -> None:
+        self.enabled = enabled
+        self.log_path = log_path
+        self.started = time.time()
+        self._hist: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._log: Optional[TextIO] = None
+
+    def span(self, name: str) -> ContextManager[Any]:
+        """Time a block as stage ``name``."""
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name)
+
+    def turn(self) -> ContextManager[Any]:
+        """Time a whole turn; spans opened inside it on this thread are logged with it."""
+        if not self.enabled:
+            return _NOOP
+        return _Turn(self)
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record a duration measured elsewhere (e.g. a stream's time to first token)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._hist.get(name)
+            if hist is None:
+                hist = self._hist[name] = Histogram()
+            hist.observe(seconds)
+        turn = getattr(self._local, "turn", None)
+        if turn is not None and name != "turn":
+            turn.spans[name] = turn.spans.get(name, 0.0) + seconds
+
+    def _log_turn(self, total: float, spans: Dict[str, float]) -> None:
+        if not self.log_path:
+            return
+        line = json.dumps({"ts": round(time.time(), 3), "turn": round(total, 6),
+                           "spans": {k: round(v, 6) for k, v in spans.items()}})
+        with self._lock:
+            try:
+                if self._log is None:
+                    self._log = open(self.log_path, "a", encoding="utf-8")
+                self._log.write(line + "\n")
+                self._log.flush()
+            except OSError:
+                self.log_path = None  # stop trying; the histograms still work
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hist.clear()
+            self.started = time.time()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    # ---- reading / export ---------------------------------------------------
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """``{stage: {count, mean, p50, p95, p99, max}}`` in seconds."""
+        with self._lock:
+            return {name: hist.snapshot() for name, hist in sorted(self._hist.items())}
+
+    def summary(self) -> str:
+        snap = self.snapshot()
+        if not snap:
+            return "Sem métricas ainda." if self.enabled else "Métricas desligadas (JARVIS_METRICS=0)."
+        rows = [f"{'etapa':<10} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}"]
+        for name, s in snap.items():
+            rows.append(
+                f"{name:<10} {s['count']:>6} {s['p50'] * 1e3:>7.1f}ms {s['p95'] * 1e3:>7.1f}ms "
+                f"{s['p99'] * 1e3:>7.1f}ms {s['max'] * 1e3:>7.1f}ms"
+            )
+        return "\n".join(rows)
+
+    def to_prometheus(self, prefix: str = "jarvis_stage_seconds") -> str:
+        """Prometheus text exposition format (one histogram, labelled by stage)."""
+        with self._lock:
+            items = [(name, hist.buckets, list(hist.counts), hist.count, hist.sum)
+                     for name, hist in sorted(self._hist.items())]
+        lines = [f"# HELP {prefix} Latency of each Jarvis turn stage.", f"# TYPE {prefix} histogram"]
+        for name, buckets, counts, count, total in items:
+            cumulative = 0
+            for le, n in zip(buckets, counts):
+                cumulative += n
+                lines.append(f'{prefix}_bucket{{stage="{name}",le="{le:g}"}} {cumulative}')
+            lines.append(f'{prefix}_bucket{{stage="{name}",le="+Inf"}} {count}')
+            lines.append(f'{prefix}_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f'{prefix}_count{{stage="{name}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def to_json_lines(self) -> str:
+        """One JSON object per stage with its current percentiles."""
+        ts = round(time.time(), 3)
+        return "".join(
+            json.dumps({"ts": ts, "stage": name, **{k: round(v, 6) for k, v in s.items()}}) + "\n"
+            for name, s in self.snapshot().items()
+        )
+
+    def export(self, path: str) -> None:
+        """Write the current metrics to ``path``: Prometheus text for ``.prom``/``.txt``, else JSON lines."""
+        text = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json_lines()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def _enabled_from_env() -> bool:
+    return os.getenv("JARVIS_METRICS", "1").lower() not in {"0", "false", "no", "off"}
+
+
+# process-wide registry shared by the front-ends and jarvis_core
+METRICS = Metrics(enabled=_enabled_from_env(), log_path=os.getenv("JARVIS_METRICS_LOG") or None)
+
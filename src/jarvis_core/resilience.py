@@ -0,0 +1,385 @@
+"""Deadline-bounded LLM calls: retries with backoff and hedged duplicate requests.
+
+    llm = ResilientLLM(CallPolicy(budget=8.0))
+    reply = llm.complete(client, params, on_token=print)
+
+Every call gets a latency budget. A transient failure (connection error,
+timeout, 429, 5xx) is retried with exponential backoff and full jitter, as
+long as the budget allows it. If no answer has started after a hedge delay
+(the recent p95 of time-to-first-answer, clamped), one duplicate request is
+sent. The first attempt to produce output wins, and the others are abandoned.
+
+Attempts run on worker threads. ``on_token`` is always called on the calling
+thread, and only with the winning attempt's deltas, so callers that touch UI
+state (Streamlit) stay safe. When the budget runs out or the retries are
+spent, :class:`LLMUnavailable` carries whatever text had already streamed.
+:func:`degrade` turns that, or a stale cached reply, into a graceful answer.
+Setting the optional ``cancel`` event (barge-in) abandons the call with
+:class:`Cancelled`.
+
+:meth:`ResilientLLM.acomplete` is the asyncio twin for an ``AsyncOpenAI``
+client (the headless server). It has the same deadline, retries and
+counters, but no hedging.
+"""
+import asyncio
+import inspect
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from src.jarvis_core.llm import StreamStats, astream_chat, stream_chat
+
+LOGGER = logging.getLogger(__name__)
+
+BUDGET = float(os.getenv("JARVIS_LLM_BUDGET", "20"))  # seconds per LLM call, retries and hedges included
+RETRYABLE_STATUS = {408, 409, 429}
+PARTIAL_MARK = " …"
+CANCEL_POLL = 0.05  # seconds between checks of the ``cancel`` event while waiting
+
+
+class LLMUnavailable(Exception):
+    """No complete answer within the policy; ``partial`` is the text already streamed (may be empty)."""
+
+    def __init__(self, message: str, partial: str = "", cause: Optional[BaseException] = None) -> None:
+        super().__init__(message)
+        self.partial = partial
+        self.cause = cause
+
+
+class DeadlineExceeded(LLMUnavailable):
+    """The latency budget ran out."""
+
+
+class Cancelled(LLMUnavailable):
+    """The caller set ``cancel``; the reply is no longer wanted."""
+
+
+@dataclass
+class CallPolicy:
+    budget: float = BUDGET
+    retries: int = 2
+    backoff: float = 0.25  # first retry waits up to this long; doubles each time
+    max_backoff: float = 2.0
+    hedges: int = 1  # duplicate requests per call (0 disables hedging)
+    hedge_after: Optional[float] = None  # fixed hedge delay; None derives it from the recent p95
+    hedge_default: float = 2.0  # hedge delay until ``min_samples`` answers have been seen
+    hedge_min: float = 0.2
+    min_samples: int = 20
+
+
+class LatencyTracker:
+    """Recent time-to-first-answer samples (seconds) for deriving the hedge delay."""
+
+    def __init__(self, window: int = 512) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Connection problems, timeouts, 408/409/429 and 5xx are worth another try; other API errors are not."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        return not isinstance(error, (ValueError, TypeError, KeyError))
+    return status in RETRYABLE_STATUS or status >= 500
+
+
+class _Race:
+    __slots__ = ("winner", "closed")
+
+    def __init__(self) -> None:
+        self.winner: Optional[int] = None
+        self.closed = False
+
+    def lost(self, attempt: int) -> bool:
+        return self.closed or (self.winner is not None and self.winner != attempt)
+
+
+class ResilientLLM:
+    """Runs chat completions under a :class:`CallPolicy`; thread-safe, one instance per front-end."""
+
+    def __init__(self, policy: Optional[CallPolicy] = None, tracker: Optional[LatencyTracker] = None,
+                 max_workers: int = 32) -> None:
+        self.policy = policy or CallPolicy()
+        self.tracker = tracker or LatencyTracker()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="jarvis-llm")
+        self._no_retry: Dict[int, Tuple[Any, Any]] = {}  # id(client) -> (client, copy with SDK retries off)
+        self._lock = threading.Lock()
+        self.counts = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "failed": 0, "deadline": 0,
+                       "cancelled": 0}
+
+    def hedge_delay(self) -> float:
+        policy = self.policy
+        if policy.hedge_after is not None:
+            return policy.hedge_after
+        p95 = self.tracker.quantile(95) if len(self.tracker) >= policy.min_samples else None
+        delay = policy.hedge_default if p95 is None else max(p95, policy.hedge_min)
+        return min(delay, policy.budget / 2)  # leave the duplicate time to answer
+
+    def _client(self, client: Any) -> Any:
+        """``client`` with the SDK's own retries disabled: this class owns retrying and the deadline."""
+        with self._lock:
+            entry = self._no_retry.get(id(client))
+            if entry is None or entry[0] is not client:
+                with_options = getattr(client, "with_options", None)
+                entry = self._no_retry[id(client)] = (client, with_options(max_retries=0) if with_options else client)
+            return entry[1]
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] += 1
+
+    def complete(
+        self,
+        client: Any,
+        params: Dict[str, Any],
+        on_token: Optional[Callable[[str], None]] = None,
+        stats: Optional[StreamStats] = None,
+        budget: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> str:
+        """Return the reply text, streaming deltas to ``on_token`` when given.
+
+        Raises :class:`LLMUnavailable` (or :class:`DeadlineExceeded`) when no
+        complete answer arrives in time, :class:`Cancelled` soon after
+        ``cancel`` is set, and re-raises non-retryable API errors.
+        """
+        policy = self.policy
+        client = self._client(client)
+        stream = on_token is not None
+        start = time.monotonic()
+        deadline = start + (budget if budget is not None else policy.budget)
+        events: "queue.SimpleQueue[Tuple[int, str, Any]]" = queue.SimpleQueue()
+        race = _Race()
+        launched: Dict[int, float] = {}  # attempt -> monotonic start
+        hedged = set()  # attempts that are duplicates
+        parts = []
+        live = retries = hedges = 0
+        retry_at: Optional[float] = None
+        last_error: Optional[BaseException] = None
+        self._count("calls")
+
+        def launch(hedge: bool = False) -> None:
+            nonlocal live
+            n = len(launched)
+            launched[n] = time.monotonic()
+            if hedge:
+                hedged.add(n)
+            live += 1
+            self._pool.submit(self._attempt, client, params, n, stream, events, race, deadline)
+
+        def give_up(error: LLMUnavailable) -> LLMUnavailable:
+            race.closed = True
+            return self._give_up(error, parts, start, len(launched))
+
+        launch()
+        hedge_at = start + self.hedge_delay() if policy.hedges > 0 else None
+        while True:
+            now = time.monotonic()
+            if cancel is not None and cancel.is_set():
+                raise give_up(Cancelled("cancelado"))
+            if now >= deadline:
+                raise give_up(DeadlineExceeded(f"sem resposta em {deadline - start:.1f}s", cause=last_error))
+            wake = deadline if cancel is None else min(deadline, now + CANCEL_POLL)
+            if retry_at is not None:
+                wake = min(wake, retry_at)
+            if hedge_at is not None and race.winner is None and live == 1 and hedges < policy.hedges:
+                wake = min(wake, hedge_at)
+            try:
+                n, kind, payload = events.get(timeout=max(0.0, wake - now))
+            except queue.Empty:
+                now = time.monotonic()
+                if retry_at is not None and now >= retry_at:
+                    retry_at = None
+                    launch()
+                    hedge_at = now + self.hedge_delay() if policy.hedges > 0 else None
+                elif (hedge_at is not None and now >= hedge_at and race.winner is None
+                      and live == 1 and hedges < policy.hedges):
+                    hedges += 1
+                    self._count("hedges")
+                    LOGGER.info("llm hedge: no answer after %.2fs, sending a duplicate request", now - start)
+                    launch(hedge=True)
+                continue
+
+            if kind == "delta":
+                if race.winner is None:
+                    self._won(race, n, launched[n], n in hedged, stats)
+                if race.winner == n:
+                    parts.append(payload)
+                    on_token(payload)  # type: ignore[misc]
+            elif kind == "done":
+                live -= 1
+                if race.winner is None:
+                    self._won(race, n, launched[n], n in hedged, stats)
+                if race.winner == n:
+                    race.closed = True  # stop the losers at their next delta
+                    if stats is not None:
+                        stats.finished = time.perf_counter()
+                    return payload if payload is not None else "".join(parts).strip()
+            else:  # error
+                live -= 1
+                if race.winner == n:
+                    raise give_up(LLMUnavailable(f"stream interrompido: {payload}", cause=payload))
+                if race.winner is not None:
+                    continue  # a losing duplicate failed; irrelevant
+                last_error = payload
+                if not is_retryable(payload):
+                    race.closed = True
+                    raise payload
+                if live == 0 and retry_at is None:
+                    if retries >= policy.retries:
+                        raise give_up(LLMUnavailable(f"{len(launched)} tentativas falharam: {payload}", cause=payload))
+                    wait = random.uniform(0, min(policy.max_backoff, policy.backoff * 2 ** retries))
+                    if time.monotonic() + wait >= deadline:
+                        raise give_up(DeadlineExceeded(f"sem tempo para tentar de novo: {payload}", cause=payload))
+                    retries += 1
+                    self._count("retries")
+                    LOGGER.info("llm retry %d in %.2fs after %s", retries, wait, payload)
+                    retry_at = time.monotonic() + wait
+
+    def _give_up(self, error: LLMUnavailable, parts: List[str], start: float, attempts: int) -> LLMUnavailable:
+        error.partial = "".join(parts).strip()
+        if isinstance(error, Cancelled):
+            self._count("cancelled")
+            LOGGER.info("llm cancelled after %.2fs", time.monotonic() - start)
+            return error
+        self._count("deadline" if isinstance(error, DeadlineExceeded) else "failed")
+        LOGGER.warning("llm gave up after %.2fs (%d attempts, %d streamed chars): %s",
+                       time.monotonic() - start, attempts, len(error.partial), error)
+        return error
+
+    async def acomplete(
+        self,
+        client: Any,
+        params: Dict[str, Any],
+        on_token: Optional[Callable[[str], Union[None, Awaitable[None]]]] = None,
+        stats: Optional[StreamStats] = None,
+        budget: Optional[float] = None,
+    ) -> str:
+        """:meth:`complete` for an ``AsyncOpenAI`` client; ``on_token`` may be a coroutine function.
+
+        Each attempt runs under ``asyncio.wait_for`` with what is left of the
+        budget. Retries follow the policy. No duplicates are sent, so a busy
+        server does not double its upstream load.
+        """
+        policy = self.policy
+        client = self._client(client)
+        start = time.monotonic()
+        deadline = start + (budget if budget is not None else policy.budget)
+        parts: List[str] = []
+        retries = 0
+        self._count("calls")
+        while True:
+            try:
+                return await asyncio.wait_for(self._aattempt(client, params, parts, on_token, stats, deadline),
+                                              max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError as e:
+                raise self._give_up(DeadlineExceeded(f"sem resposta em {deadline - start:.1f}s", cause=e),
+                                    parts, start, retries + 1) from None
+            except Exception as e:
+                if parts:  # the user has seen part of this answer: no retry from scratch
+                    raise self._give_up(LLMUnavailable(f"stream interrompido: {e}", cause=e),
+                                        parts, start, retries + 1) from None
+                if not is_retryable(e):
+                    raise
+                if retries >= policy.retries:
+                    raise self._give_up(LLMUnavailable(f"{retries + 1} tentativas falharam: {e}", cause=e),
+                                        parts, start, retries + 1) from None
+                wait = random.uniform(0, min(policy.max_backoff, policy.backoff * 2 ** retries))
+                if time.monotonic() + wait >= deadline:
+                    raise self._give_up(DeadlineExceeded(f"sem tempo para tentar de novo: {e}", cause=e),
+                                        parts, start, retries + 1) from None
+                retries += 1
+                self._count("retries")
+                LOGGER.info("llm retry %d in %.2fs after %s", retries, wait, e)
+                await asyncio.sleep(wait)
+
+    async def _aattempt(self, client: Any, params: Dict[str, Any], parts: List[str],
+                        on_token: Optional[Callable[[str], Any]], stats: Optional[StreamStats],
+                        deadline: float) -> str:
+        started = time.monotonic()
+        timeout = max(0.05, deadline - started)
+        if on_token is None:
+            resp = await client.chat.completions.create(timeout=timeout, **params)
+            self.tracker.observe(time.monotonic() - started)
+            return resp.choices[0].message.content.strip()
+        async for delta in astream_chat(client, stats, timeout=timeout, **params):
+            if not parts:
+                self.tracker.observe(time.monotonic() - started)
+            parts.append(delta)
+            result = on_token(delta)
+            if inspect.isawaitable(result):
+                await result
+        return "".join(parts).strip()
+
+    def _won(self, race: _Race, n: int, started: float, hedge: bool, stats: Optional[StreamStats]) -> None:
+        race.winner = n
+        self.tracker.observe(time.monotonic() - started)
+        if stats is not None:
+            stats.first_token = time.perf_counter()
+        if hedge:
+            self._count("hedge_wins")
+
+    @staticmethod
+    def _attempt(client: Any, params: Dict[str, Any], n: int, stream: bool,
+                 events: "queue.SimpleQueue[Tuple[int, str, Any]]", race: _Race, deadline: float) -> None:
+        timeout = max(0.05, deadline - time.monotonic())
+        try:
+            if not stream:
+                resp = client.chat.completions.create(timeout=timeout, **params)
+                events.put((n, "done", resp.choices[0].message.content.strip()))
+                return
+            for delta in stream_chat(client, timeout=timeout, **params):
+                if race.lost(n):
+                    return  # closing the generator closes the HTTP stream
+                events.put((n, "delta", delta))
+            events.put((n, "done", None))
+        except Exception as e:
+            events.put((n, "error", e))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self.counts)
+        counts["hedge_delay_s"] = round(self.hedge_delay(), 3)
+        return counts
+
+    def summary(self) -> str:
+        s = self.stats()
+        return (
+            f"llm: {s['calls']} chamadas, {s['retries']} retries, {s['hedges']} hedges "
+            f"({s['hedge_wins']} venceram), {s['deadline']} estouraram o prazo, {s['failed']} falharam; "
+            f"hedge após {s['hedge_delay_s']:.2f}s"
+        )
+
+
+def degrade(error: LLMUnavailable, stale: Optional[str] = None) -> Optional[Tuple[str, str]]:
+    """Graceful ``(reply, source)`` after :class:`LLMUnavailable`, or ``None`` if there is nothing to offer.
+
+    Text that already streamed wins (the user has seen it). Otherwise a stale
+    cached reply for the same prompt and context is returned.
+    """
+    if error.partial:
+        return error.partial + PARTIAL_MARK, "partial"
+    if stale:
+        return stale, "stale"
+    return None
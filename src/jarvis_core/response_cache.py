@@ -0,0 +1,216 @@
+"""LLM response cache: LRU+TTL in memory, optional SQLite tier on disk, single-flight.
+
+Keys hash the model, system prompt, the recent conversation window and the
+normalized prompt, so "O que é X?" and "o que é x" share one upstream call.
+Concurrent identical requests are coalesced: one caller (the leader) calls the
+API, the others wait for its answer.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+_SPACES = re.compile(r"\s+")
+_TRAILING = re.compile(r"[\s?!.…]+$")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation."""
+    return _TRAILING.sub("", _SPACES.sub(" ", prompt.strip().casefold()))
+
+
+def cache_key(model: str, system_prompt: str, window: Sequence[Dict[str, str]], prompt: str) -> str:
+    payload = json.dumps(
+        {
+            "model": model,
+            "system": system_prompt,
+            "window": [[m.get("role", ""), m.get("content", "")] for m in window],
+            "prompt": normalize_prompt(prompt),
+        },
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _DiskTier:
+    """SQLite-backed key/value store (reply + original latency + timestamp)."""
+
+    def __init__(self, path: str) -> None:
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS replies (key TEXT PRIMARY KEY, reply TEXT, latency REAL, created REAL)"
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: str, ttl: float) -> Optional[Tuple[str, float, float]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT reply, latency, created FROM replies WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[2] > ttl:
+            return None
+        return row
+
+    def put(self, key: str, reply: str, latency: float, created: float) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO replies VALUES (?, ?, ?, ?)", (key, reply, latency, created)
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM replies")
+
+
+class ResponseCache:
+    """Thread-safe reply cache shared by every caller in the process."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0, disk_path: Optional[str] = None) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._mem: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()
+        self._disk = _DiskTier(disk_path) if disk_path else None
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.saved_seconds = 0.0
+
+    def _lookup(self, key: str) -> Optional[Tuple[str, float, float]]:
+        entry = self._mem.get(key)
+        if entry is not None and time.time() - entry[2] <= self.ttl:
+            self._mem.move_to_end(key)
+            return entry
+        # expired entries stay until LRU eviction or a fresh put, as fallbacks for ``stale``
+        if self._disk is not None:
+            entry = self._disk.get(key, self.ttl)
+            if entry is not None:
+                self.disk_hits += 1
+                self._store_mem(key, entry)
+                return entry
+        return None
+
+    def _store_mem(self, key: str, entry: Tuple[str, float, float]) -> None:
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                return None
+            self.hits += 1
+            self.saved_seconds += entry[1]
+            return entry[0]
+
+    def stale(self, key: str) -> Optional[str]:
+        """The last reply stored under ``key`` even if its TTL has passed (a fallback when the API is down)."""
+        with self._lock:
+            entry = self._mem.get(key)
+        if entry is None and self._disk is not None:
+            entry = self._disk.get(key, float("inf"))
+        return entry[0] if entry is not None else None
+
+    def put(self, key: str, reply: str, latency: float = 0.0) -> None:
+        entry = (reply, latency, time.time())
+        with self._lock:
+            self._store_mem(key, entry)
+        if self._disk is not None:
+            self._disk.put(key, *entry)
+
+    def get_or_compute(self, key: str, compute: Callable[[], str]) -> Tuple[str, str]:
+        """Return ``(reply, source)`` where source is ``"hit"``, ``"coalesced"`` or ``"miss"``.
+
+        Exceptions from ``compute`` propagate to the leader and every waiter and
+        nothing is cached.
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                self.saved_seconds += entry[1]
+                return entry[0], "hit"
+            waiting = self._inflight.get(key)
+            if waiting is None:
+                leader = Future()
+                self._inflight[key] = leader
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if waiting is not None:
+            t0 = time.perf_counter()
+            reply = waiting.result()
+            with self._lock:
+                # a coalesced caller saves whatever it would have waited on its own
+                self.saved_seconds += max(0.0, self._latency_hint(key) - (time.perf_counter() - t0))
+            return reply, "coalesced"
+
+        t0 = time.perf_counter()
+        try:
+            reply = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            leader.set_exception(e)
+            raise
+        self.put(key, reply, time.perf_counter() - t0)
+        with self._lock:
+            del self._inflight[key]
+        leader.set_result(reply)
+        return reply, "miss"
+
+    def _latency_hint(self, key: str) -> float:
+        entry = self._mem.get(key)
+        return entry[1] if entry else 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._mem),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+            }
+
+    def summary(self) -> str:
+        s = self.stats()
+        return (
+            f"cache: {s['hits']} hits ({s['disk_hits']} disco), {s['misses']} misses, "
+            f"{s['coalesced']} coalescidos, {s['hit_rate']:.0%} acerto, "
+            f"{s['saved_seconds']:.1f}s economizados"
+        )
+
+
+def split_bypass(prompt: str, prefixes: Sequence[str] = ("/fresh ", "!")) -> Tuple[str, bool]:
+    """Strip a cache-bypass prefix; return ``(prompt, bypass)``."""
+    for prefix in prefixes:
+        if prompt.startswith(prefix) and prompt[len(prefix):].strip():
+            return prompt[len(prefix):].strip(), True
+    return prompt, False
+
+
+def window_for(conversation: List[Dict[str, str]], size: int) -> List[Dict[str, str]]:
+    """Messages preceding the newest one that are folded into the cache key."""
+    return conversation[-size - 1:-1] if size > 0 else []
@@ -0,0 +1,173 @@
+"""Per-request model, max_tokens and temperature for the LLM fallback.
+
+A local rule-based classifier costs microseconds and needs no API call. It
+picks a route from the prompt length, intent keywords (whole words, matched on
+the normalized prompt, so accents and case don't matter) and whether the
+answer will be spoken:
+
+=========  ==============================  ================  =================
+route      trigger                         text              voice
+=========  ==============================  ================  =================
+code       code / programming words        deep, 600, 0.2    deep, 200, 0.2
+detailed   "explique", "passo a passo",    deep, 700, 0.5    fast, 250, 0.5
+           ... or a long prompt
+creative   "escreva", "poema", "ideias"    fast, 400, 0.9    fast, 150, 0.9
+brief      short question or greeting      fast, 80, 0.3     fast, 60, 0.3
+default    anything else                   fast, 300, 0.6    fast, 120, 0.6
+=========  ==============================  ================  =================
+
+``JARVIS_MODEL_FAST`` and ``JARVIS_MODEL_DEEP`` name the two models. The deep
+model is the fast one unless ``JARVIS_MODEL_DEEP`` is set, so by default
+routing only changes ``max_tokens`` and temperature. ``JARVIS_ROUTING=0`` pins
+every request to ``default``. Each decision is
+logged. :meth:`ModelRouter.record` adds the upstream latency and reply tokens
+per route, both to :meth:`ModelRouter.summary` and to the ``llm.<route>``
+histograms in :data:`METRICS`.
+"""
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from src.jarvis_core.commands import normalize
+from src.jarvis_core.context import estimate_tokens
+from src.jarvis_core.metrics import METRICS
+
+LOGGER = logging.getLogger(__name__)
+
+FAST_MODEL = os.getenv("JARVIS_MODEL_FAST", "gpt-4o-mini")
+DEEP_MODEL = os.getenv("JARVIS_MODEL_DEEP") or FAST_MODEL  # a pricier model only when asked for
+LONG_PROMPT = 60  # tokens; longer prompts usually want a longer answer
+SHORT_PROMPT = 12
+
+# route -> ((tier, max_tokens, temperature) for text, (...) for voice)
+PROFILES: Dict[str, Tuple[Tuple[str, int, float], Tuple[str, int, float]]] = {
+    "code": (("deep", 600, 0.2), ("deep", 200, 0.2)),
+    "detailed": (("deep", 700, 0.5), ("fast", 250, 0.5)),
+    "creative": (("fast", 400, 0.9), ("fast", 150, 0.9)),
+    "brief": (("fast", 80, 0.3), ("fast", 60, 0.3)),
+    "default": (("fast", 300, 0.6), ("fast", 120, 0.6)),
+}
+
+
+def _keywords(*words: str) -> "re.Pattern[str]":
+    """Any of ``words`` as whole words (normalized: no accents, lower case)."""
+    return re.compile(r"\b(?:" + "|".join(re.escape(w) for w in words) + r")\b")
+
+
+# checked in this order; the first match wins. Whole words only, and no everyday
+# connectives ("porque", "programa"): a false match costs a bigger answer.
+_INTENTS = (
+    ("code", _keywords("codigo", "python", "javascript", "typescript", "funcao", "script", "bug", "stack trace",
+                       "sql", "regex", "compilar", "compilador", "programar", "programacao", "api")),
+    ("detailed", _keywords("explique", "explica", "explicar", "passo a passo", "detalhe", "detalhes", "detalhado",
+                           "detalhada", "detalhadamente", "como funciona", "compare", "comparar", "comparacao",
+                           "diferenca entre", "vantagens", "desvantagens", "analise", "analisar", "tutorial",
+                           "aprofunde", "aprofundar")),
+    ("creative", _keywords("escreva", "poema", "poesia", "conte uma historia", "piada", "crie", "invente",
+                           "ideias", "sugestao", "sugestoes", "sugira", "slogan")),
+)
+_BRIEF = _keywords("e", "eh", "sim", "nao", "existe", "tem", "pode", "posso", "voce", "sabe", "qual", "quem",
+                   "quando", "onde", "quanto", "quantos", "quanta", "quantas", "oi", "ola", "bom dia", "boa tarde",
+                   "boa noite", "obrigado", "obrigada", "valeu")
+
+
+@dataclass(frozen=True)
+class Route:
+    name: str
+    model: str
+    max_tokens: int
+    temperature: float
+    reason: str = ""
+    voice: bool = False
+
+    def params(self) -> Dict[str, Any]:
+        """Keyword arguments for ``chat.completions.create``."""
+        return {"model": self.model, "max_tokens": self.max_tokens, "temperature": self.temperature}
+
+    @property
+    def cache_tag(self) -> str:
+        """Goes into the response-cache key: a reply cut at 80 tokens must not answer a detailed request."""
+        return f"{self.model}/{self.max_tokens}"
+
+
+def classify(prompt: str) -> Tuple[str, str]:
+    """``(route name, reason)`` for ``prompt``."""
+    text = normalize(prompt)
+    for name, pattern in _INTENTS:
+        m = pattern.search(text)
+        if m is not None:
+            return name, f"palavra '{m.group(0).strip()}'"
+    tokens = estimate_tokens(prompt)
+    if tokens > LONG_PROMPT:
+        return "detailed", f"prompt longo ({tokens} tokens)"
+    if tokens <= SHORT_PROMPT and _BRIEF.match(text):
+        return "brief", "pergunta curta"
+    return "default", "padrão"
+
+
+class ModelRouter:
+    """Routes prompts and keeps per-route totals; thread-safe, one per front-end."""
+
+    def __init__(self, voice: bool = False, fast_model: str = FAST_MODEL, deep_model: str = DEEP_MODEL,
+                 enabled: Optional[bool] = None) -> None:
+        self.voice = voice
+        self.models = {"fast": fast_model, "deep": deep_model}
+        if enabled is None:
+            enabled = os.getenv("JARVIS_ROUTING", "1").lower() not in {"0", "false", "no", "off"}
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, float]] = {}
+
+    def route(self, prompt: str, voice: Optional[bool] = None) -> Route:
+        voice = self.voice if voice is None else voice
+        name, reason = classify(prompt) if self.enabled else ("default", "roteamento desligado")
+        tier, max_tokens, temperature = PROFILES[name][1 if voice else 0]
+        route = Route(name, self.models[tier], max_tokens, temperature, reason, voice)
+        with self._lock:
+            totals = self._totals.setdefault(name, {"n": 0, "calls": 0, "seconds": 0.0, "tokens": 0, "cut": 0})
+            totals["n"] += 1
+        LOGGER.info("route=%s model=%s max_tokens=%d temperature=%.1f voice=%s (%s)",
+                    name, route.model, max_tokens, temperature, voice, reason)
+        return route
+
+    def record(self, route: Route, seconds: float, reply: str) -> None:
+        """Account one upstream answer for ``route`` (skip cache hits: they say nothing about the route)."""
+        tokens = estimate_tokens(reply)
+        cut = tokens >= route.max_tokens * 0.95  # most likely stopped by max_tokens
+        with self._lock:
+            totals = self._totals[route.name]
+            totals["calls"] += 1
+            totals["seconds"] += seconds
+            totals["tokens"] += tokens
+            totals["cut"] += cut
+        METRICS.observe(f"llm.{route.name}", seconds)
+        LOGGER.info("route=%s latency=%.2fs reply_tokens=%d/%d%s",
+                    route.name, seconds, tokens, route.max_tokens, " (cortada)" if cut else "")
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """``{route: {n, calls, mean_s, mean_tokens, cut}}``; ``n`` counts decisions, ``calls`` upstream answers."""
+        with self._lock:
+            items = [(name, dict(t)) for name, t in sorted(self._totals.items())]
+        return {
+            name: {
+                "n": t["n"],
+                "calls": t["calls"],
+                "mean_s": t["seconds"] / t["calls"] if t["calls"] else 0.0,
+                "mean_tokens": t["tokens"] / t["calls"] if t["calls"] else 0.0,
+                "cut": t["cut"],
+            }
+            for name, t in items
+        }
+
+    def summary(self) -> str:
+        stats = self.stats()
+        if not stats:
+            return "Nenhuma rota escolhida ainda."
+        rows = [f"{'rota':<10} {'n':>5} {'chamadas':>8} {'média':>8} {'tokens':>7} {'cortadas':>8}"]
+        for name, s in stats.items():
+            rows.append(f"{name:<10} {s['n']:>5} {s['calls']:>8} {s['mean_s']:>7.2f}s "
+                        f"{s['mean_tokens']:>7.0f} {s['cut']:>8}")
+        return "\n".join(rows)
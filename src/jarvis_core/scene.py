@@ -0,0 +1,216 @@
+"""Client for the 3D scene server (``POST /spawn``) with pooling and batch spawns.
+
+One keep-alive connection pool is shared per server URL. Many objects are sent
+through ``POST /spawn/batch`` in chunks, several chunks in flight at once; if the
+server has no batch endpoint the client falls back to one ``/spawn`` per object
+over the same pool. Object ids carry a random per-client prefix, so several
+front-ends (or restarts) sharing one scene never overwrite each other's objects.
+"""
+import itertools
+import math
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+DEFAULT_URL = "http://127.0.0.1:8000"
+
+SHAPES = {
+    "cubo": "cube",
+    "esfera": "sphere",
+    "cilindro": "cylinder",
+    "cone": "cone",
+    "plano": "plane",
+}
+SHAPE_NAMES_PT = {v: k for k, v in SHAPES.items()}
+
+COLORS = {
+    "ciano": "#00ffff",
+    "vermelho": "#ff3b30",
+    "azul": "#007aff",
+    "verde": "#34c759",
+    "amarelo": "#ffcc00",
+    "laranja": "#ff9500",
+    "roxo": "#af52de",
+    "rosa": "#ff2d55",
+    "branco": "#ffffff",
+    "preto": "#111111",
+    "cinza": "#8e8e93",
+}
+DEFAULT_COLOR = COLORS["ciano"]
+DEFAULT_POS = (0.0, 1.2, 0.5)
+
+LAYOUTS = ("grade", "linha", "circulo")
+
+# Matched against normalized (lowercase, accent-free) text by the command router.
+_COLOR_WORDS = (
+    r"#[0-9a-f]{6}|ciano|vermelh[oa]s?|azu(?:l|is)|verdes?|amarel[oa]s?|laranjas?|rox[oa]s?"
+    r"|rosas?|branc[oa]s?|pret[oa]s?|cinzas?"
+)
+SPAWN_PATTERN = (
+    r"(?<!\w)(?:criar|crie|spawn|gerar|gere|adicionar|adicione)\s+"
+    r"(?:(?P<count>\d+)\s+)?(?P<shape>cubos?|esferas?|cilindros?|cones?|planos?)(?!\w)"
+    r"(?:\s+(?P<color>" + _COLOR_WORDS + r"))?"
+    r"(?:\s+(?:em|no|na)\s+(?:uma\s+|um\s+)?(?P<layout>grade|linha|circulo))?"
+)
+
+
+def _singular(word: str) -> str:
+    """Shape/color word in its dictionary form (cubos -> cubo, azuis -> azul, vermelhas -> vermelho)."""
+    if word in SHAPES or word in COLORS:
+        return word
+    if word.endswith("is") and word[:-2] + "l" in COLORS:
+        return word[:-2] + "l"
+    if word.endswith("s"):
+        word = word[:-1]
+    if word not in COLORS and word.endswith("a") and word[:-1] + "o" in COLORS:
+        word = word[:-1] + "o"
+    return word
+
+
+def color_hex(word: Optional[str]) -> str:
+    if not word:
+        return DEFAULT_COLOR
+    if word.startswith("#"):
+        return word
+    return COLORS.get(_singular(word), DEFAULT_COLOR)
+
+
+def layout_positions(n: int, layout: str = "grade", spacing: float = 0.6,
+                     origin: Sequence[float] = DEFAULT_POS) -> List[List[float]]:
+    """Positions for ``n`` objects: a square-ish grid on the floor, a line, or a circle."""
+    ox, oy, oz = origin
+    if n <= 1:
+        return [[ox, oy, oz]]
+    if layout == "linha":
+        start = ox - spacing * (n - 1) / 2
+        return [[round(start + i * spacing, 4), oy, oz] for i in range(n)]
+    if layout == "circulo":
+        radius = max(spacing, spacing * n / (2 * math.pi))
+        return [
+            [round(ox + radius * math.cos(2 * math.pi * i / n), 4), oy,
+             round(oz + radius * math.sin(2 * math.pi * i / n), 4)]
+            for i in range(n)
+        ]
+    cols = math.ceil(math.sqrt(n))
+    x0 = ox - spacing * (cols - 1) / 2
+    return [[round(x0 + (i % cols) * spacing, 4), oy, round(oz + (i // cols) * spacing, 4)] for i in range(n)]
+
+
+class SceneClient:
+    """Pooled, batching client for one scene server."""
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_URL,
+        pool_size: int = 4,
+        timeout: float = 3.0,
+        batch_size: int = 100,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.supports_batch: Optional[bool] = None  # learned from the first batch call
+        self._http: Any = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._id_prefix = uuid.uuid4().hex[:8]  # unique per client: the scene is shared across processes
+
+    @property
+    def http(self) -> Any:
+        if self._http is None:
+            with self._lock:
+                if self._http is None:
+                    import httpx
+
+                    self._http = httpx.Client(
+                        base_url=self.base_url,
+                        timeout=self.timeout,
+                        limits=httpx.Limits(
+                            max_connections=self.pool_size, max_keepalive_connections=self.pool_size
+                        ),
+                    )
+        return self._http
+
+    def close(self) -> None:
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
+    def make_objects(
+        self,
+        shape: str = "cube",
+        count: int = 1,
+        color: str = DEFAULT_COLOR,
+        layout: str = "grade",
+        spacing: float = 0.6,
+        origin: Sequence[float] = DEFAULT_POS,
+    ) -> List[Dict[str, Any]]:
+        return [
+            {"id": f"{shape}-{self._id_prefix}-{next(self._ids)}", "type": shape, "pos": pos, "color": color}
+            for pos in layout_positions(count, layout, spacing, origin)
+        ]
+
+    def spawn(self, obj: Dict[str, Any]) -> None:
+        self.http.post("/spawn", json=obj).raise_for_status()
+
+    def spawn_many(self, objects: Sequence[Dict[str, Any]]) -> int:
+        """Create ``objects``; returns how many HTTP requests it took."""
+        if len(objects) == 1 and not self.supports_batch:
+            self.spawn(objects[0])
+            return 1
+        chunks = [objects[i:i + self.batch_size] for i in range(0, len(objects), self.batch_size)]
+        if self.supports_batch is not False:
+            first = self.http.post("/spawn/batch", json={"objects": list(chunks[0])})
+            if first.status_code in (404, 405):
+                self.supports_batch = False
+            else:
+                first.raise_for_status()
+                self.supports_batch = True
+                self._parallel(lambda c: self.http.post("/spawn/batch", json={"objects": list(c)})
+                               .raise_for_status(), chunks[1:])
+                return len(chunks)
+        self._parallel(self.spawn, objects)
+        return len(objects)
+
+    def _parallel(self, fn, items: Sequence[Any]) -> None:
+        if not items:
+            return
+        if len(items) == 1 or self.pool_size <= 1:
+            for item in items:
+                fn(item)
+            return
+        with ThreadPoolExecutor(max_workers=self.pool_size) as ex:
+            for _ in ex.map(fn, items):
+                pass
+
+    def spawn_command(self, args: Optional[Dict[str, Optional[str]]] = None) -> str:
+        """Run a parsed spawn command ("criar 200 cubos azuis em grade") and describe the result."""
+        args = args or {}
+        shape_pt = _singular(args.get("shape") or "cubo")
+        shape = SHAPES.get(shape_pt, "cube")
+        count = max(1, min(int(args.get("count") or 1), 10_000))
+        layout = args.get("layout") or "grade"
+        objects = self.make_objects(shape, count, color_hex(args.get("color")), layout)
+        try:
+            self.spawn_many(objects)
+        except Exception:
+            return "Não consegui falar com o servidor de cena."
+        made = "criada" if shape_pt == "esfera" else "criado"
+        if count == 1:
+            return f"{shape_pt.capitalize()} {made}."
+        return f"{count} {shape_pt}s {made}s em {layout}."
+
+
+_clients: Dict[str, SceneClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_scene_client(base_url: str = DEFAULT_URL) -> SceneClient:
+    """Process-wide ``SceneClient`` per URL (keeps its connection pool alive)."""
+    client = _clients.get(base_url)
+    if client is None:
+        with _clients_lock:
+            client = _clients.setdefault(base_url, SceneClient(base_url))
+    return client
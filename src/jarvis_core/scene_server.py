@@ -0,0 +1,136 @@
+"""Local stand-in for the 3D scene server, for offline tests and benchmarks.
+
+Endpoints: ``POST /spawn`` (one object), ``POST /spawn/batch`` (``{"objects": [...]}``),
+``GET /scene`` (all objects) and ``DELETE /scene``.
+
+    python -m src.jarvis_core.scene_server --port 8000
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def setup(self) -> None:
+        super().setup()
+        scene = self.server.scene
+        with scene.lock:
+            scene.connections += 1
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, payload: Any) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_POST(self) -> None:
+        scene = self.server.scene
+        try:
+            body = self._body()
+        except ValueError:
+            self._send(400, {"error": "invalid json"})
+            return
+        if self.path == "/spawn":
+            objects = [body]
+        elif self.path == "/spawn/batch" and scene.batch:
+            objects = body.get("objects") or []
+        else:
+            self._send(404, {"error": f"unknown path {self.path}"})
+            return
+        if scene.latency:
+            time.sleep(scene.latency)
+        with scene.lock:
+            scene.requests += 1
+            for obj in objects:
+                scene.objects[str(obj.get("id"))] = obj
+        self._send(200, {"ok": True, "count": len(objects)})
+
+    def do_GET(self) -> None:
+        if self.path != "/scene":
+            self._send(404, {"error": f"unknown path {self.path}"})
+            return
+        with self.server.scene.lock:
+            self._send(200, {"objects": list(self.server.scene.objects.values())})
+
+    def do_DELETE(self) -> None:
+        with self.server.scene.lock:
+            self.server.scene.objects.clear()
+        self._send(200, {"ok": True})
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    scene: "SceneStandin"
+
+
+class SceneStandin:
+    """In-memory scene server. ``latency`` is added per request; ``batch=False``
+    disables ``/spawn/batch`` to exercise the client's fallback path."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, batch: bool = True) -> None:
+        self.latency = latency
+        self.batch = batch
+        self.objects: Dict[str, Dict[str, Any]] = {}
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        self._httpd = _Server((host, port), _Handler)
+        self._httpd.scene = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "SceneStandin":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "SceneStandin":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the local stand-in scene server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    args = parser.parse_args()
+    scene = SceneStandin(args.host, args.port, args.latency)
+    print(f"Scene stand-in listening on {scene.url}")
+    try:
+        scene.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+"""Long-term conversation memory with offline TF-IDF retrieval.
+
+Every turn (user prompt + reply) is appended to a JSONL log and embedded with a
+hashing vectorizer: unigrams and bigrams hashed into ``dim`` buckets (2**20 by
+default, so collisions are rare), sublinear term frequency, IDF from
+per-bucket document counts. Vectors live in flat NumPy arrays and top-k cosine
+retrieval is fully vectorized, with no vocabulary to grow and no network.
+
+The index is snapshotted next to the log (``<path>.npz``) every
+``snapshot_every`` turns and on :meth:`SemanticMemory.close`; at startup only
+turns newer than the snapshot are re-embedded. The snapshot carries a checksum
+of the turns it covers. Several front-ends may append to the same log, so a
+snapshot whose turns are not the log's first ones is ignored and the log is
+re-embedded.
+"""
+import json
+import logging
+import math
+import os
+import re
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.jarvis_core.commands import normalize
+
+LOGGER = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+_RESET = {"op": "reset"}
+
+STOPWORDS = frozenset(
+    "a o as os um uma uns umas de do da dos das e em no na nos nas por para pra com "
+    "que se me te eu voce ele ela isso isto esse essa este esta ao aos ou mas "
+    "qual quais como quando onde quanto quantos meu minha meus minhas seu sua "
+    "the of and to is in it".split()
+)
+
+
+def _digest(turns: Iterable[Tuple[str, str]], crc: int = 0) -> int:
+    """CRC-32 of ``turns`` as written to the log, chained from ``crc``."""
+    for u, a in turns:
+        crc = zlib.crc32(json.dumps({"u": u, "a": a}, ensure_ascii=False).encode("utf-8"), crc)
+    return crc
+
+
+def _stem(word: str) -> str:
+    """Crude plural folding ("gatos" -> "gato") so singular and plural share a bucket."""
+    return word[:-1] if len(word) > 3 and word.endswith("s") else word
+
+
+class HashingVectorizer:
+    """Text -> sparse hashed term-frequency vectors (no fitted vocabulary)."""
+
+    def __init__(self, dim: int = 1 << 20, bigrams: bool = True) -> None:
+        self.dim = dim
+        self.bigrams = bigrams
+        self._buckets: Dict[str, int] = {}
+
+    def tokens(self, text: str) -> List[str]:
+        words = [_stem(w) for w in _WORD.findall(normalize(text)) if w not in STOPWORDS]
+        if self.bigrams:
+            words += [f"{a} {b}" for a, b in zip(words, words[1:])]
+        return words
+
+    def _bucket(self, token: str) -> int:
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            bucket = zlib.crc32(token.encode("utf-8")) % self.dim  # stable across runs, unlike hash()
+            if len(self._buckets) > 500_000:
+                self._buckets.clear()
+            self._buckets[token] = bucket
+        return bucket
+
+    def features(self, text: str) -> Dict[int, float]:
+        """``{bucket: 1 + log(tf)}`` for the non-empty buckets of ``text``."""
+        counts: Dict[int, int] = {}
+        for tok in self.tokens(text):
+            bucket = self._bucket(tok)
+            counts[bucket] = counts.get(bucket, 0) + 1
+        return {bucket: 1.0 + math.log(tf) for bucket, tf in counts.items()}
+
+    def transform(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """``(indptr, indices, values)`` CSR arrays, one row per text."""
+        indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+        indices: List[int] = []
+        values: List[float] = []
+        for i, text in enumerate(texts):
+            feats = self.features(text)
+            indices.extend(feats)
+            values.extend(feats.values())
+            indptr[i + 1] = len(indices)
+        return indptr, np.array(indices, dtype=np.int32), np.array(values, dtype=np.float32)
+
+
+@dataclass
+class Recall:
+    """One retrieved past turn."""
+
+    turn: int
+    score: float
+    user: str
+    assistant: str
+
+    def text(self) -> str:
+        return f"Usuário: {self.user}\nJarvis: {self.assistant}"
+
+
+class SemanticMemory:
+    """All past turns, searchable by TF-IDF cosine similarity.
+
+    Vectors are stored as growable CSR arrays (row offsets, bucket ids, term
+    weights), so memory is proportional to the number of distinct terms per
+    turn, not to ``dim``. Entries are also indexed by bucket (a sorted
+    permutation, i.e. posting lists), so a query gathers only the entries that
+    share a bucket with it, scores rows with one ``np.bincount`` and takes the
+    top-k with ``argpartition``.
+
+    Row norms and the bucket index are rebuilt in bulk once the store has grown
+    by ``refresh_ratio`` since the last refresh; turns added in between get
+    their norms with the IDF of the moment and are scanned linearly. Thread-safe;
+    one instance per process.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        dim: int = 1 << 20,
+        min_score: float = 0.12,
+        refresh_ratio: float = 0.1,
+        snapshot_every: int = 500,
+    ) -> None:
+        self.path = path
+        self.vectorizer = HashingVectorizer(dim)
+        self.min_score = min_score
+        self.refresh_ratio = refresh_ratio
+        self.snapshot_every = snapshot_every
+        self._lock = threading.Lock()
+        self._turns: List[Tuple[str, str]] = []
+        self._indptr = np.zeros(1024 + 1, dtype=np.int64)
+        self._norms = np.zeros(1024, dtype=np.float32)
+        self._indices = np.zeros(16 * 1024, dtype=np.int32)
+        self._values = np.zeros(16 * 1024, dtype=np.float32)
+        self._rows = np.zeros(16 * 1024, dtype=np.int32)  # row of each entry, for bincount
+        self._df = np.zeros(dim, dtype=np.int32)
+        self._post_order = np.zeros(0, dtype=np.int64)  # entry ids sorted by bucket
+        self._post_keys = np.zeros(0, dtype=np.int32)  # their buckets, ascending
+        self._refreshed_at = 0
+        self._unsaved = 0
+        self._digest = 0  # of self._turns, stored in the snapshot
+        if path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the index arrays."""
+        arrays = (self._indptr, self._norms, self._indices, self._values, self._rows, self._df,
+                  self._post_order, self._post_keys)
+        return sum(a.nbytes for a in arrays)
+
+    # ---- storage ------------------------------------------------------------
+    @property
+    def snapshot_path(self) -> str:
+        return f"{self.path}.npz"
+
+    def _read_log(self) -> List[Tuple[str, str]]:
+        turns: List[Tuple[str, str]] = []
+        if not os.path.exists(self.path):
+            return turns
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line after a crash
+                if entry == _RESET:
+                    turns.clear()
+                elif isinstance(entry, dict) and "u" in entry and "a" in entry:
+                    turns.append((entry["u"], entry["a"]))
+        return turns
+
+    def _load(self) -> None:
+        turns = self._read_log()
+        done = 0
+        try:
+            with np.load(self.snapshot_path) as snap:
+                n = int(snap["n"])
+                if (int(snap["dim"]) == self.vectorizer.dim and n <= len(turns)
+                        and int(snap["digest"]) == _digest(turns[:n])):
+                    self._put_rows(0, snap["indptr"], snap["indices"], snap["values"])
+                    self._df[:] = snap["df"]
+                    self._digest = int(snap["digest"])
+                    done = n
+                else:
+                    LOGGER.info("semantic memory: snapshot does not match %s, re-embedding", self.path)
+        except (OSError, KeyError, ValueError):
+            pass
+        self._turns = turns[:done]
+        self._append_rows(turns[done:])
+        self._refresh()
+        if done < len(turns):
+            LOGGER.info("semantic memory: embedded %d new turns (%d from snapshot)", len(turns) - done, done)
+
+    def save(self) -> None:
+        """Snapshot the index (atomic replace) so the next start skips re-embedding."""
+        if not self.path:
+            return
+        with self._lock:
+            n = len(self._turns)
+            nnz = int(self._indptr[n])
+            tmp = f"{self.path}.tmp.npz"
+            np.savez(
+                tmp, n=np.int64(n), dim=np.int64(self.vectorizer.dim), digest=np.int64(self._digest), df=self._df,
+                indptr=self._indptr[: n + 1], indices=self._indices[:nnz], values=self._values[:nnz],
+            )
+            os.replace(tmp, self.snapshot_path)
+            self._unsaved = 0
+
+    def close(self) -> None:
+        if self._unsaved:
+            self.save()
+
+    # ---- indexing -----------------------------------------------------------
+    @staticmethod
+    def _grow(array: np.ndarray, size: int) -> np.ndarray:
+        if size <= len(array):
+            return array
+        cap = len(array)
+        while cap < size:
+            cap *= 2
+        grown = np.zeros(cap, dtype=array.dtype)
+        grown[: len(array)] = array
+        return grown
+
+    def _put_rows(self, start: int, indptr: np.ndarray, indices: np.ndarray, values: np.ndarray) -> None:
+        """Write CSR rows (``indptr`` relative to its own first row) at row ``start``."""
+        count = len(indptr) - 1
+        base = int(self._indptr[start])
+        end = base + len(indices)
+        self._indptr = self._grow(self._indptr, start + count + 1)
+        self._norms = self._grow(self._norms, start + count)
+        self._indices = self._grow(self._indices, end)
+        self._values = self._grow(self._values, end)
+        self._rows = self._grow(self._rows, end)
+        self._indptr[start : start + count + 1] = base + indptr
+        self._indices[base:end] = indices
+        self._values[base:end] = values
+        self._rows[base:end] = np.repeat(np.arange(start, start + count, dtype=np.int32), np.diff(indptr))
+
+    def _idf(self, buckets: np.ndarray) -> np.ndarray:
+        """Smoothed IDF of ``buckets`` (computed per lookup; the full table is 2**20 wide)."""
+        return (np.log((1.0 + len(self._turns)) / (1.0 + self._df[buckets])) + 1.0).astype(np.float32)
+
+    def _row_norms(self, lo: int, hi: int) -> np.ndarray:
+        a, b = int(self._indptr[lo]), int(self._indptr[hi])
+        weighted = self._values[a:b] * self._idf(self._indices[a:b])
+        sq = np.bincount(self._rows[a:b] - lo, weights=weighted * weighted, minlength=hi - lo)
+        return np.sqrt(sq).astype(np.float32)
+
+    def _append_rows(self, turns: Sequence[Tuple[str, str]]) -> None:
+        if not turns:
+            return
+        start = len(self._turns)
+        indptr, indices, values = self.vectorizer.transform([f"{u}\n{a}" for u, a in turns])
+        self._put_rows(start, indptr, indices, values)
+        np.add.at(self._df, indices, 1)
+        self._turns.extend(turns)
+        self._digest = _digest(turns, self._digest)
+        self._norms[start : len(self._turns)] = self._row_norms(start, len(self._turns))
+
+    def _refresh(self) -> None:
+        """Recompute all row norms with the current IDF and rebuild the bucket index."""
+        n = len(self._turns)
+        nnz = int(self._indptr[n])
+        if n:
+            self._norms[:n] = self._row_norms(0, n)
+        self._post_order = np.argsort(self._indices[:nnz], kind="stable")
+        self._post_keys = self._indices[:nnz][self._post_order]
+        self._refreshed_at = n
+
+    def _entries_for(self, buckets: np.ndarray, nnz: int) -> np.ndarray:
+        """Ids of the stored entries (below ``nnz``) whose bucket is in ``buckets``."""
+        lo = np.searchsorted(self._post_keys, buckets, side="left")
+        hi = np.searchsorted(self._post_keys, buckets, side="right")
+        parts = [self._post_order[a:b] for a, b in zip(lo, hi) if b > a]
+        indexed = len(self._post_keys)
+        if nnz > indexed:  # turns added since the last refresh
+            parts.append(indexed + np.flatnonzero(np.isin(self._indices[indexed:nnz], buckets)))
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        sel = np.concatenate(parts)
+        return sel[sel < nnz] if nnz < indexed else sel
+
+    def add(self, user: str, assistant: str) -> int:
+        """Store one turn; returns its index."""
+        return self.add_many([(user, assistant)])
+
+    def add_many(self, turns: Iterable[Tuple[str, str]]) -> int:
+        turns = [(u, a) for u, a in turns if u or a]
+        with self._lock:
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps({"u": u, "a": a}, ensure_ascii=False) + "\n" for u, a in turns)
+            self._append_rows(turns)
+            self._unsaved += len(turns)
+            due = self.path and self._unsaved >= self.snapshot_every
+        if due:
+            self.save()
+        return len(self._turns) - 1
+
+    def reset(self) -> None:
+        """Forget everything (a reset marker in the log, like the conversation journal)."""
+        with self._lock:
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(_RESET) + "\n")
+                try:
+                    os.remove(self.snapshot_path)  # it describes the forgotten turns
+                except FileNotFoundError:
+                    pass
+            self._turns.clear()
+            self._digest = 0
+            self._df[:] = 0
+            self._refresh()
+            self._unsaved = 0
+
+    # ---- retrieval ----------------------------------------------------------
+    def search(self, query: str, k: int = 3, skip_last: int = 0) -> List[Recall]:
+        """Top-``k`` past turns by cosine similarity to ``query``.
+
+        The newest ``skip_last`` turns are excluded (they are already in the
+        prompt's recent window); hits below ``min_score`` are dropped.
+        """
+        feats = self.vectorizer.features(query)
+        with self._lock:
+            n = len(self._turns) - max(0, skip_last)
+            if n <= 0 or not feats or k <= 0:
+                return []
+            if len(self._turns) - self._refreshed_at > self.refresh_ratio * max(self._refreshed_at, 1):
+                self._refresh()
+            buckets = np.fromiter(feats, dtype=np.int32, count=len(feats))
+            idf = self._idf(buckets)
+            q = np.fromiter(feats.values(), dtype=np.float32, count=len(feats)) * idf
+            q_norm = float(np.linalg.norm(q))
+            sel = self._entries_for(buckets, int(self._indptr[n]))
+            if not len(sel):
+                return []
+            # weight of each selected entry's bucket in the query (buckets are unique)
+            order = np.argsort(buckets)
+            pos = order[np.searchsorted(buckets, self._indices[sel], sorter=order)]
+            contrib = self._values[sel] * idf[pos] * q[pos]
+            rows = self._rows[sel]
+            scores = np.bincount(rows, weights=contrib, minlength=n)
+            scores /= np.maximum(self._norms[:n], 1e-9) * q_norm
+            k = min(k, n)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                Recall(int(i), float(scores[i]), *self._turns[i])
+                for i in top
+                if scores[i] >= self.min_score
+            ]
+
+
+def turn_pairs(messages: Sequence[Dict[str, str]]) -> List[Tuple[str, str]]:
+    """``(user, assistant)`` pairs from a chat message list (unpaired messages skipped)."""
+    pairs = []
+    for prev, cur in zip(messages, messages[1:]):
+        if prev.get("role") == "user" and cur.get("role") == "assistant":
+            pairs.append((prev.get("content", ""), cur.get("content", "")))
+    return pairs
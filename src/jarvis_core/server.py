@@ -0,0 +1,718 @@
+"""Headless Jarvis server: HTTP and WebSocket on one asyncio loop, for many users at once.
+
+Endpoints:
+
+``POST /v1/chat`` with ``{"session": "...", "message": "...", "stream": false}``
+    Returns a JSON reply. With ``"stream": true`` it returns Server-Sent Events
+    instead: ``delta`` events, then one ``done`` event.
+``GET /v1/ws?session=...``
+    WebSocket. Send ``{"message": "..."}`` or plain text. The server answers
+    with ``delta`` frames and then a ``done`` frame.
+``DELETE /v1/sessions/<id>``
+    Forgets a session.
+``GET /health`` and ``GET /metrics``
+    Health check, and latency metrics in Prometheus text format.
+
+Session state: each session keeps its own conversation and ContextBuilder in
+memory, and nothing is written to the journal. All sessions share one pooled
+``AsyncOpenAI`` client and the response cache. Identical concurrent prompts
+are coalesced. Every upstream call goes through
+:meth:`ResilientLLM.acomplete`: it is bounded by the policy budget and
+retried on 429/5xx. When the budget runs out, the reply is what already
+streamed, or a stale cached answer.
+
+Backpressure:
+
+- At most ``max_upstream`` LLM calls run at once, and ``max_waiting`` more may
+  queue. Past that, requests are refused right away with ``503`` (HTTP) or a
+  ``busy`` error (WebSocket).
+- Streamed writes wait for the socket to drain, so a slow reader slows only
+  its own stream.
+- A session handles one turn at a time.
+
+Run it with::
+
+    python -m src.jarvis_core.server --port 8765
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import socket
+import struct
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from src.jarvis_core.commands import CommandRouter
+from src.jarvis_core.context import ContextBuilder
+from src.jarvis_core.llm import POOL_SIZE, StreamStats, make_async_client
+from src.jarvis_core.metrics import METRICS
+from src.jarvis_core.resilience import PARTIAL_MARK, CallPolicy, LLMUnavailable, ResilientLLM, degrade
+from src.jarvis_core.response_cache import ResponseCache, cache_key, split_bypass, window_for
+from src.jarvis_core.routing import ModelRouter
+from src.jarvis_core.scene import get_scene_client
+
+LOGGER = logging.getLogger(__name__)
+
+BLOCKING_COMMANDS = {"spawn", "ip"}  # scene HTTP and socket calls run on a worker thread
+
+SYSTEM_PROMPT = (
+    "Você é o Jarvis, um assistente útil e educado. "
+    "Responda em português BR por padrão. "
+    "Se o usuário pedir explicitamente outro idioma, responda nesse idioma. "
+    "Seja claro e objetivo; use explicações passo a passo apenas quando pedirem."
+)
+CONTEXT_BUDGET = int(os.getenv("JARVIS_CONTEXT_TOKENS", "1500"))
+CACHE_WINDOW = 4
+MAX_HISTORY = 200  # messages kept per session; the prompt itself is bounded by CONTEXT_BUDGET
+MAX_BODY = 1 << 20  # request bodies and WebSocket messages
+
+Delta = Callable[[str], Awaitable[None]]
+
+
+class Busy(Exception):
+    """Too many turns are already waiting for the upstream API."""
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class Session:
+    __slots__ = ("id", "conversation", "context", "lock", "last_seen", "turns")
+
+    def __init__(self, sid: str) -> None:
+        self.id = sid
+        self.conversation: List[Dict[str, str]] = []
+        self.context = ContextBuilder(budget=CONTEXT_BUDGET)
+        self.lock = asyncio.Lock()
+        self.last_seen = time.monotonic()
+        self.turns = 0
+
+
+def ip_local() -> str:
+    try:
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.connect(("8.8.8.8", 80))
+        ip = s.getsockname()[0]
+        s.close()
+        return ip
+    except Exception:
+        return "desconhecido"
+
+
+class JarvisService:
+    """Command handling and LLM replies for many sessions; every method runs on the event loop."""
+
+    def __init__(
+        self,
+        client: Any,
+        cache: Optional[ResponseCache] = None,
+        max_upstream: int = POOL_SIZE,
+        max_waiting: Optional[int] = None,
+        max_sessions: int = 10_000,
+        session_ttl: float = 3600.0,
+        scene_url: str = "http://127.0.0.1:8000",
+        llm: Optional[ResilientLLM] = None,
+    ) -> None:
+        self.client = client
+        self.llm = llm if llm is not None else ResilientLLM(CallPolicy(hedges=0), max_workers=1)
+        self.cache = cache if cache is not None else ResponseCache(disk_path=os.getenv("JARVIS_LLM_CACHE") or None)
+        self.max_upstream = max_upstream
+        self.max_waiting = max_waiting if max_waiting is not None else 4 * max_upstream
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.scene_url = scene_url
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.waiting = 0
+        self.inflight = 0
+        self.rejected = 0
+        self._upstream = asyncio.Semaphore(max_upstream)
+        self._pending: Dict[str, "asyncio.Future[str]"] = {}  # cache key -> reply being computed
+        self.model_router = ModelRouter()
+        self.router = self._build_router()
+
+    # ---- sessions -----------------------------------------------------------
+    def session(self, sid: Optional[str] = None) -> Session:
+        """The session ``sid`` (created on first use; a new id when ``None``)."""
+        sid = sid or uuid.uuid4().hex
+        session = self.sessions.get(sid)
+        if session is None:
+            session = self.sessions[sid] = Session(sid)
+        else:
+            self.sessions.move_to_end(sid)
+        session.last_seen = now = time.monotonic()
+        while self.sessions:
+            oldest = next(iter(self.sessions.values()))
+            if oldest is session:
+                break
+            if len(self.sessions) <= self.max_sessions and now - oldest.last_seen <= self.session_ttl:
+                break
+            del self.sessions[oldest.id]
+        return session
+
+    def drop(self, sid: str) -> bool:
+        return self.sessions.pop(sid, None) is not None
+
+    # ---- commands -----------------------------------------------------------
+    def _build_router(self) -> CommandRouter:
+        """Same commands as the other front-ends; handlers get the caller's session."""
+        router = CommandRouter()
+
+        @router.command("exit")
+        def _exit(m, session):
+            self.drop(session.id)
+            return "Sessão encerrada."
+
+        @router.command("reset")
+        def _reset(m, session):
+            session.conversation.clear()
+            session.context.reset()
+            return "Memória limpa."
+
+        @router.command("mem")
+        def _mem(m, session):
+            return f"Itens na memória: {len(session.conversation)}"
+
+        @router.command("cache")
+        def _cache(m, session):
+            return self.cache.summary()
+
+        @router.command("stats")
+        def _stats(m, session):
+            return METRICS.summary() + "\n" + self.llm.summary() + "\n" + self.model_router.summary()
+
+        @router.command("time")
+        def _time(m, session):
+            return time.strftime("Agora são %H:%M.")
+
+        @router.command("ip")
+        def _ip(m, session):
+            return f"Seu IP local é {ip_local()}"
+
+        @router.command("spawn")
+        def _spawn(m, session):
+            return get_scene_client(self.scene_url).spawn_command(m.args)
+
+        return router
+
+    # ---- turns --------------------------------------------------------------
+    async def reply(self, session: Session, text: str, on_delta: Optional[Delta] = None) -> Dict[str, Any]:
+        """Answer one message: a local command or an LLM reply (streamed through ``on_delta``)."""
+        t0 = time.perf_counter()
+        text, bypass = split_bypass(text.strip())
+        async with session.lock:
+            match = self.router.match(text)
+            if match is not None:
+                if match.name in BLOCKING_COMMANDS:
+                    out = await asyncio.to_thread(match.run, session)
+                else:
+                    out = match.run(session)  # on the loop: exit/reset touch self.sessions and the session
+                result: Dict[str, Any] = {"kind": "command", "command": match.name, "reply": str(out or "")}
+                if on_delta is not None:
+                    await on_delta(result["reply"])
+            else:
+                reply, source = await self._llm(session, text, not bypass, on_delta)
+                result = {"kind": "llm", "reply": reply, "source": source}
+            session.turns += 1
+        elapsed = time.perf_counter() - t0
+        METRICS.observe("turn", elapsed)
+        result["session"] = session.id
+        result["latency_ms"] = round(elapsed * 1e3, 2)
+        return result
+
+    async def _llm(self, session: Session, prompt: str, use_cache: bool, on_delta: Optional[Delta]) -> Tuple[str, str]:
+        conversation = session.conversation
+        conversation.append({"role": "user", "content": prompt})
+        if len(conversation) > MAX_HISTORY:
+            del conversation[: len(conversation) - MAX_HISTORY]
+        route = self.model_router.route(prompt)
+        key = None
+        if use_cache:
+            key = cache_key(route.cache_tag, SYSTEM_PROMPT, window_for(conversation, CACHE_WINDOW), prompt)
+
+        try:
+            reply, source = None, "miss" if key else "direct"
+            try:
+                if key is not None:
+                    reply = self.cache.get(key)
+                    if reply is not None:
+                        source = "hit"
+                    elif key in self._pending:
+                        source = "coalesced"
+                        reply = await asyncio.shield(self._pending[key])
+                if reply is None:
+                    messages, _ = session.context.build({"role": "system", "content": SYSTEM_PROMPT}, conversation)
+                    params = dict(messages=messages, **route.params())
+                    t0 = time.perf_counter()
+                    reply = await self._compute(key, params, on_delta)
+                    self.model_router.record(route, time.perf_counter() - t0, reply)
+                elif on_delta is not None:
+                    await on_delta(reply)  # whole reply came from the cache or another session's call
+            except LLMUnavailable as e:
+                # out of budget: keep what already streamed, or an expired cached answer
+                fallback = degrade(e, self.cache.stale(key) if key is not None else None)
+                if fallback is None:
+                    raise
+                streamed = source != "coalesced"  # a coalesced waiter saw none of the deltas
+                reply, source = fallback
+                if on_delta is not None:
+                    await on_delta(PARTIAL_MARK if source == "partial" and streamed else reply)
+        except BaseException:
+            conversation.pop()  # the turn did not happen
+            raise
+        conversation.append({"role": "assistant", "content": reply})
+        return reply, source
+
+    async def _compute(self, key: Optional[str], params: Dict[str, Any], on_delta: Optional[Delta]) -> str:
+        if self.waiting >= self.max_waiting and self._upstream.locked():
+            self.rejected += 1
+            raise Busy(f"{self.inflight} chamadas em andamento e {self.waiting} na fila")
+        future: Optional["asyncio.Future[str]"] = None
+        if key is not None:
+            future = self._pending[key] = asyncio.get_running_loop().create_future()
+        t0 = time.perf_counter()
+        try:
+            self.waiting += 1
+            try:
+                await self._upstream.acquire()
+            finally:
+                self.waiting -= 1
+            self.inflight += 1
+            try:
+                reply = await self._stream(params, on_delta)
+            finally:
+                self.inflight -= 1
+                self._upstream.release()
+        except BaseException as e:
+            if future is not None:
+                del self._pending[key]
+                future.set_exception(e)
+                future.exception()  # retrieved: waiters (if any) re-raise it themselves
+            raise
+        if future is not None:
+            self.cache.put(key, reply, time.perf_counter() - t0)
+            del self._pending[key]
+            future.set_result(reply)
+        return reply
+
+    async def _stream(self, params: Dict[str, Any], on_delta: Optional[Delta]) -> str:
+        stats = StreamStats()
+
+        async def on_token(delta: str) -> None:
+            nonlocal on_delta
+            if on_delta is not None:
+                try:
+                    await on_delta(delta)
+                except (ConnectionError, OSError):
+                    on_delta = None  # the client left; finish anyway for the cache and coalesced waiters
+
+        reply = await self.llm.acomplete(self.client, params, on_token, stats)
+        if stats.ttft is not None:
+            METRICS.observe("llm_ttft", stats.ttft)
+        METRICS.observe("llm", stats.total or 0.0)
+        return reply
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "ok": True,
+            "sessions": len(self.sessions),
+            "inflight": self.inflight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+# ---- HTTP ------------------------------------------------------------------
+_REASONS = {
+    200: "OK", 101: "Switching Protocols", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: Dict[str, List[str]]
+    headers: Dict[str, str]
+    body: bytes = b""
+    keep_alive: bool = True
+
+    def json(self) -> Dict[str, Any]:
+        try:
+            data = json.loads(self.body or b"{}")
+        except ValueError as e:
+            raise HttpError(400, f"JSON inválido: {e}") from e
+        if not isinstance(data, dict):
+            raise HttpError(400, "o corpo deve ser um objeto JSON")
+        return data
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Request]:
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "linha de requisição inválida")
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY:
+        raise HttpError(413, "corpo grande demais")
+    body = await reader.readexactly(length) if length else b""
+    url = urlsplit(target)
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return Request(method.upper(), url.path, parse_qs(url.query), headers, body, keep_alive)
+
+
+def _head(status: int, headers: Dict[str, str]) -> bytes:
+    lines = [f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}"]
+    lines.extend(f"{k}: {v}" for k, v in headers.items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def send(
+    writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool = True,
+    content_type: str = "application/json", headers: Optional[Dict[str, str]] = None,
+) -> None:
+    data = payload if isinstance(payload, bytes) else (
+        payload.encode("utf-8") if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    )
+    head = {
+        "Content-Type": content_type,
+        "Content-Length": str(len(data)),
+        "Connection": "keep-alive" if keep_alive else "close",
+        **(headers or {}),
+    }
+    writer.write(_head(status, head) + data)
+    await writer.drain()
+
+
+class _EventStream:
+    """Chunked ``text/event-stream`` response; headers go out with the first event."""
+
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+        self.started = False
+
+    async def event(self, payload: Dict[str, Any]) -> None:
+        if not self.started:
+            self.writer.write(_head(200, {
+                "Content-Type": "text/event-stream",
+                "Cache-Control": "no-cache",
+                "Transfer-Encoding": "chunked",
+                "Connection": "keep-alive",
+            }))
+            self.started = True
+        data = b"data: " + json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n\n"
+        self.writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+        await self.writer.drain()  # a slow reader holds up only its own stream
+
+    async def end(self) -> None:
+        self.writer.write(b"0\r\n\r\n")
+        await self.writer.drain()
+
+
+# ---- WebSocket (RFC 6455, text frames) --------------------------------------
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONT, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+def _mask(data: bytes, key: bytes) -> bytes:
+    n = len(data)
+    if not n:
+        return data
+    stream = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(stream, "big")).to_bytes(n, "big")
+
+
+def encode_frame(opcode: int, payload: bytes, mask: bool = False) -> bytes:
+    """One final frame. Clients must mask (``mask=True``); servers must not."""
+    n = len(payload)
+    head = bytes([0x80 | opcode])
+    bit = 0x80 if mask else 0
+    if n < 126:
+        head += bytes([bit | n])
+    elif n < 1 << 16:
+        head += bytes([bit | 126]) + struct.pack("!H", n)
+    else:
+        head += bytes([bit | 127]) + struct.pack("!Q", n)
+    if mask:
+        key = os.urandom(4)
+        return head + key + _mask(payload, key)
+    return head + payload
+
+
+async def read_frame(reader: asyncio.StreamReader, max_size: int = MAX_BODY) -> Tuple[bool, int, bytes]:
+    """``(fin, opcode, payload)`` of the next frame, unmasked."""
+    b0, b1 = await reader.readexactly(2)
+    n = b1 & 0x7F
+    if n == 126:
+        (n,) = struct.unpack("!H", await reader.readexactly(2))
+    elif n == 127:
+        (n,) = struct.unpack("!Q", await reader.readexactly(8))
+    if n > max_size:
+        raise HttpError(413, "mensagem grande demais")
+    key = await reader.readexactly(4) if b1 & 0x80 else b""
+    payload = await reader.readexactly(n)
+    return bool(b0 & 0x80), b0 & 0x0F, _mask(payload, key) if key else payload
+
+
+async def read_message(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, mask: bool = False) -> Optional[str]:
+    """Next text message, answering pings on the way; ``None`` once the peer closes."""
+    parts: List[bytes] = []
+    while True:
+        fin, opcode, payload = await read_frame(reader)
+        if opcode == OP_CLOSE:
+            writer.write(encode_frame(OP_CLOSE, payload[:2], mask))
+            await writer.drain()
+            return None
+        if opcode == OP_PING:
+            writer.write(encode_frame(OP_PONG, payload, mask))
+            await writer.drain()
+            continue
+        if opcode == OP_PONG:
+            continue
+        parts.append(payload)
+        if sum(map(len, parts)) > MAX_BODY:
+            raise HttpError(413, "mensagem grande demais")
+        if fin:
+            return b"".join(parts).decode("utf-8", errors="replace")
+
+
+async def send_message(writer: asyncio.StreamWriter, payload: Dict[str, Any], mask: bool = False) -> None:
+    writer.write(encode_frame(OP_TEXT, json.dumps(payload, ensure_ascii=False).encode("utf-8"), mask))
+    await writer.drain()
+
+
+def accept_key(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode("ascii")).digest()).decode("ascii")
+
+
+# ---- server -----------------------------------------------------------------
+class JarvisServer:
+    """asyncio front door for a :class:`JarvisService` (keep-alive HTTP/1.1 plus WebSocket upgrades)."""
+
+    def __init__(self, service: JarvisService, host: str = "127.0.0.1", port: int = 8765,
+                 idle_timeout: float = 60.0) -> None:
+        self.service = service
+        self.host = host
+        self.port = port
+        self.idle_timeout = idle_timeout
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self._tasks: Set["asyncio.Task[None]"] = set()
+
+    async def start(self) -> "JarvisServer":
+        self._server = await asyncio.start_server(self._connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._writers):  # idle keep-alive and WebSocket connections
+                writer.close()
+            if self._tasks:  # let the handlers see the closed sockets and return before the loop ends
+                await asyncio.wait(list(self._tasks), timeout=1.0)
+            await self._server.wait_closed()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        task = asyncio.current_task()
+        if task is not None:
+            self._tasks.add(task)
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), self.idle_timeout)
+                except HttpError as e:
+                    await send(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                if not await self._dispatch(request, reader, writer) or not request.keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception:
+            LOGGER.exception("connection failed")
+        finally:
+            self._writers.discard(writer)
+            self._tasks.discard(task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def _dispatch(self, req: Request, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """Answer ``req``; returns whether the connection may serve another request."""
+        try:
+            if req.path == "/v1/chat":
+                if req.method != "POST":
+                    raise HttpError(405, "use POST")
+                return await self._chat(req, writer)
+            if req.path == "/v1/ws":
+                await self._websocket(req, reader, writer)
+                return False
+            if req.path.startswith("/v1/sessions/") and req.method == "DELETE":
+                dropped = self.service.drop(req.path.rsplit("/", 1)[-1])
+                await send(writer, 200 if dropped else 404, {"dropped": dropped}, req.keep_alive)
+                return True
+            if req.path == "/health":
+                await send(writer, 200, self.service.health(), req.keep_alive)
+                return True
+            if req.path == "/metrics":
+                await send(writer, 200, METRICS.to_prometheus(), req.keep_alive, "text/plain; version=0.0.4")
+                return True
+            raise HttpError(404, f"rota desconhecida: {req.path}")
+        except HttpError as e:
+            await send(writer, e.status, {"error": str(e)}, req.keep_alive)
+            return True
+
+    async def _chat(self, req: Request, writer: asyncio.StreamWriter) -> bool:
+        data = req.json()
+        message = data.get("message")
+        if not isinstance(message, str) or not message.strip():
+            raise HttpError(400, "campo 'message' obrigatório")
+        session = self.service.session(data.get("session"))
+        if not data.get("stream"):
+            try:
+                result = await self.service.reply(session, message)
+            except Busy as e:
+                await send(writer, 503, {"error": "busy", "detail": str(e)}, req.keep_alive, headers={"Retry-After": "1"})
+                return True
+            except Exception as e:
+                LOGGER.warning("turn failed: %s", e)
+                await send(writer, 500, {"error": f"{type(e).__name__}: {e}"}, req.keep_alive)
+                return True
+            await send(writer, 200, result, req.keep_alive)
+            return True
+
+        stream = _EventStream(writer)
+        try:
+            result = await self.service.reply(session, message, lambda d: stream.event({"type": "delta", "delta": d}))
+            await stream.event({"type": "done", **result})
+        except Busy as e:
+            if not stream.started:
+                await send(writer, 503, {"error": "busy", "detail": str(e)}, req.keep_alive, headers={"Retry-After": "1"})
+                return True
+            await stream.event({"type": "error", "error": "busy"})
+        except (ConnectionError, OSError):
+            raise
+        except Exception as e:
+            LOGGER.warning("turn failed: %s", e)
+            if not stream.started:
+                await send(writer, 500, {"error": f"{type(e).__name__}: {e}"}, req.keep_alive)
+                return True
+            await stream.event({"type": "error", "error": f"{type(e).__name__}: {e}"})
+        await stream.end()
+        return True
+
+    async def _websocket(self, req: Request, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        key = req.headers.get("sec-websocket-key")
+        if req.headers.get("upgrade", "").lower() != "websocket" or not key:
+            raise HttpError(400, "esperado um upgrade para WebSocket")
+        writer.write(_head(101, {
+            "Upgrade": "websocket",
+            "Connection": "Upgrade",
+            "Sec-WebSocket-Accept": accept_key(key),
+        }))
+        session = self.service.session((req.query.get("session") or [None])[0])
+        await send_message(writer, {"type": "session", "session": session.id})
+
+        async def delta(text: str) -> None:
+            await send_message(writer, {"type": "delta", "delta": text})
+
+        while True:
+            try:
+                text = await read_message(reader, writer)
+            except HttpError as e:
+                writer.write(encode_frame(OP_CLOSE, struct.pack("!H", 1009) + str(e).encode("utf-8")))
+                await writer.drain()
+                return
+            if text is None:
+                return
+            try:
+                data = json.loads(text) if text.lstrip().startswith("{") else {"message": text}
+                message = str(data.get("message") or "")
+            except ValueError:
+                message = text
+            if not message.strip():
+                await send_message(writer, {"type": "error", "error": "mensagem vazia"})
+                continue
+            # one turn at a time per connection: a client that floods messages waits on its own socket
+            try:
+                result = await self.service.reply(session, message, delta)
+            except Busy as e:
+                await send_message(writer, {"type": "error", "error": "busy", "detail": str(e)})
+                continue
+            except (ConnectionError, OSError):
+                raise
+            except Exception as e:
+                LOGGER.warning("turn failed: %s", e)
+                await send_message(writer, {"type": "error", "error": f"{type(e).__name__}: {e}"})
+                continue
+            await send_message(writer, {"type": "done", **result})
+
+
+async def serve(host: str, port: int, max_upstream: int, max_waiting: Optional[int]) -> None:
+    client = make_async_client(pool_size=max_upstream)  # one pool for every session
+    service = JarvisService(client, max_upstream=max_upstream, max_waiting=max_waiting)
+    server = await JarvisServer(service, host, port).start()
+    print(f"Jarvis server em {server.url} (POST /v1/chat, WebSocket /v1/ws)")
+    try:
+        await server.serve_forever()
+    finally:
+        await client.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Jarvis headless server (HTTP + WebSocket)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--max-upstream", type=int, default=POOL_SIZE, help="chamadas simultâneas ao LLM")
+    ap.add_argument("--max-waiting", type=int, default=None, help="turnos na fila antes de recusar com 503 (padrão: 4x)")
+    ap.add_argument("--verbose", action="store_true")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(levelname)s: %(message)s")
+    if not os.getenv("OPENAI_API_KEY"):
+        print("Sem OPENAI_API_KEY configurada. Defina a chave (e OPENAI_BASE_URL para o stand-in) e tente novamente.")
+        return
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_upstream, args.max_waiting))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""Incremental speech output: sentence splitting over streamed text and a TTS worker.
+
+``SentenceSplitter`` turns LLM deltas into speakable sentences as soon as each
+one is complete; ``SpeechWorker`` speaks them on a background thread so the
+caller never blocks on ``runAndWait`` and the first sentence is heard while the
+rest of the answer is still being generated.
+"""
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from src.jarvis_core.metrics import METRICS
+
+LOGGER = logging.getLogger(__name__)
+
+VOICE_REVALIDATE_SECONDS = 7 * 24 * 3600  # full voice scan at most weekly when the cache is valid
+
+_BOUNDARY = re.compile(r"[.!?…]+[\"')\]]*\s+|\n+")
+_SOFT_BREAK = re.compile(r"[,;:]\s+")
+
+
+def find_ptbr_voice(voices: Sequence[Any]) -> Optional[str]:
+    """Id of the first Portuguese (preferably pt-BR) voice, if any."""
+    for v in voices:
+        name = (getattr(v, "name", "") or "").lower()
+        lang = "".join(str(x) for x in (getattr(v, "languages", None) or [])).lower()
+        if "portuguese" in name or "pt_" in lang or "brazil" in name:
+            return v.id
+    return None
+
+
+def _voices_fingerprint(voices: Sequence[Any]) -> str:
+    return hashlib.sha1("\n".join(sorted(str(v.id) for v in voices)).encode("utf-8")).hexdigest()
+
+
+def _read_voice_cache(path: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not path:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) and "fingerprint" in data else None
+    except (OSError, ValueError):
+        return None
+
+
+def _write_voice_cache(path: Optional[str], data: Dict[str, Any]) -> None:
+    if not path:
+        return
+    try:
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        LOGGER.debug("Could not write voice cache %s: %s", path, e)
+
+
+def choose_voice(engine: Any, cache_path: Optional[str] = None) -> Optional[str]:
+    """Apply the pt-BR voice to ``engine`` and return its id.
+
+    A recently validated cached id is applied without enumerating voices. The
+    full scan only reruns when that fails, when the cache is older than
+    ``VOICE_REVALIDATE_SECONDS`` and the installed voice list changed, or when
+    there is no cache.
+    """
+    cached = _read_voice_cache(cache_path)
+    if cached and time.time() - cached.get("checked", 0) < VOICE_REVALIDATE_SECONDS:
+        vid = cached.get("voice_id")
+        try:
+            if vid:
+                engine.setProperty("voice", vid)
+            return vid
+        except Exception:
+            LOGGER.info("Cached voice %s is gone; rescanning", vid)
+
+    voices = engine.getProperty("voices")
+    fingerprint = _voices_fingerprint(voices)
+    if cached and cached.get("fingerprint") == fingerprint:
+        vid = cached.get("voice_id")
+    else:
+        vid = find_ptbr_voice(voices)
+    if vid:
+        engine.setProperty("voice", vid)
+    _write_voice_cache(cache_path, {"fingerprint": fingerprint, "voice_id": vid, "checked": time.time()})
+    return vid
+
+
+def init_engine(rate: int = 185, volume: float = 1.0, voice_cache: Optional[str] = None) -> Any:
+    """Create a pyttsx3 engine with the pt-BR voice, or ``None`` if TTS is unavailable."""
+    try:
+        import pyttsx3
+
+        engine = pyttsx3.init()
+        choose_voice(engine, voice_cache)
+        engine.setProperty("rate", rate)
+        engine.setProperty("volume", volume)
+        return engine
+    except Exception as e:
+        LOGGER.warning("TTS unavailable: %s", e)
+        return None
+
+
+class SentenceSplitter:
+    """Accumulate text deltas and emit whole sentences.
+
+    Sentences shorter than ``min_chars`` are merged with the next one (so "Sim."
+    or "Dr." don't become separate utterances); a clause longer than
+    ``max_chars`` without punctuation is cut at a comma or space.
+    """
+
+    def __init__(self, min_chars: int = 24, max_chars: int = 220) -> None:
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buf = ""
+
+    def feed(self, delta: str) -> List[str]:
+        self._buf += delta
+        out: List[str] = []
+        start = 0
+        for m in _BOUNDARY.finditer(self._buf):
+            if m.end() - start >= self.min_chars:
+                out.append(self._buf[start:m.end()].strip())
+                start = m.end()
+        self._buf = self._buf[start:]
+        while len(self._buf) > self.max_chars:
+            cut = self._cut_point(self._buf)
+            out.append(self._buf[:cut].strip())
+            self._buf = self._buf[cut:]
+        return [s for s in out if s]
+
+    def _cut_point(self, text: str) -> int:
+        soft = [m.end() for m in _SOFT_BREAK.finditer(text, 0, self.max_chars)]
+        if soft:
+            return soft[-1]
+        space = text.rfind(" ", 0, self.max_chars)
+        return space + 1 if space > 0 else self.max_chars
+
+    def flush(self) -> List[str]:
+        rest, self._buf = self._buf.strip(), ""
+        return [rest] if rest else []
+
+    def split(self, chunks: Iterator[str]) -> Iterator[str]:
+        """Convenience generator: sentences from an iterator of deltas."""
+        for delta in chunks:
+            yield from self.feed(delta)
+        yield from self.flush()
+
+
+class SpeechWorker:
+    """Speak queued text on a dedicated thread.
+
+    Either pass ``speak_fn(text)`` or an ``engine_factory`` returning a
+    pyttsx3-style engine; the factory runs on the worker thread, which then owns
+    the engine. With ``speak_fn``, pass ``stop_fn`` too so that :meth:`interrupt`
+    can cut the current utterance. Call :meth:`begin_turn` when a new answer
+    starts to measure time-to-first-audio (``ttfa``).
+    """
+
+    def __init__(
+        self,
+        engine_factory: Optional[Callable[[], Any]] = None,
+        speak_fn: Optional[Callable[[str], None]] = None,
+        stop_fn: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.engine_factory = engine_factory
+        self.speak_fn = speak_fn
+        self.stop_fn = stop_fn
+        self.engine: Any = None
+        self.ttfa: List[float] = []
+        self._turn_start: Optional[float] = None
+        self._queue: "queue.Queue[Any]" = queue.Queue()  # text, a preload callable, or None
+        self._speaking = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="jarvis-tts", daemon=True)
+        self._thread.start()
+
+    @property
+    def last_ttfa(self) -> Optional[float]:
+        return self.ttfa[-1] if self.ttfa else None
+
+    def begin_turn(self) -> None:
+        self._turn_start = time.perf_counter()
+
+    def preload(self, fn: Optional[Callable[[], Any]] = None) -> None:
+        """Run ``fn`` (default: create the engine) on the worker thread now, in the background."""
+        self._queue.put(fn or self._ensure_engine)
+
+    def _ensure_engine(self) -> None:
+        if self.engine is None and self.engine_factory is not None:
+            self.engine = self.engine_factory()
+            self.engine_factory = None
+
+    def speak(self, text: str) -> None:
+        if text and text.strip():
+            self._queue.put(text)
+
+    def _say(self, text: str) -> None:
+        with METRICS.span("tts"):
+            if self.speak_fn is not None:
+                self.speak_fn(text)
+                return
+            self._ensure_engine()
+            if self.engine is not None:
+                self.engine.say(text)
+                self.engine.runAndWait()
+
+    def _run(self) -> None:
+        while True:
+            text = self._queue.get()
+            try:
+                if text is None:
+                    return
+                if callable(text):
+                    text()
+                    continue
+                if self._turn_start is not None:
+                    self.ttfa.append(time.perf_counter() - self._turn_start)
+                    METRICS.observe("tts_ttfa", self.ttfa[-1])
+                    LOGGER.info("tts time_to_first_audio=%.2fs", self.ttfa[-1])
+                    self._turn_start = None
+                self._speaking.set()
+                self._say(text)
+            except Exception as e:
+                LOGGER.debug("TTS failed: %s", e)
+            finally:
+                self._speaking.clear()
+                self._queue.task_done()
+
+    def wait(self) -> None:
+        """Block until everything queued so far has been spoken."""
+        self._queue.join()
+
+    def interrupt(self) -> None:
+        """Drop queued text and stop the current utterance (barge-in)."""
+        try:
+            while True:
+                self._queue.get_nowait()
+                self._queue.task_done()
+        except queue.Empty:
+            pass
+        if not self._speaking.is_set():
+            return
+        stop = self.stop_fn or (self.engine.stop if self.engine is not None else None)
+        if stop is not None:
+            try:
+                stop()
+            except Exception:
+                pass
+
+    def close(self, wait: bool = True) -> None:
+        if not wait:
+            self.interrupt()
+        self._queue.put(None)
+        if wait:
+            self._thread.join()
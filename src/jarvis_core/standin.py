@@ -0,0 +1,207 @@
+"""Local OpenAI-compatible stand-in server for offline benchmarks and load tests.
+
+Only ``POST /v1/chat/completions`` is implemented (plain JSON and SSE streaming).
+Latency knobs let benchmarks emulate a remote API without leaving the machine,
+and fault knobs inject errors and slow tail responses.
+"""
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+DEFAULT_REPLY = "Olá! Aqui é o Jarvis, respondendo a partir do servidor local de testes."
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so client-side pooling is observable
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def setup(self) -> None:
+        super().setup()
+        standin = self.server.standin
+        with standin.lock:
+            standin.connections += 1
+        if standin.connect_delay:
+            # emulate TCP+TLS handshake round trips on a fresh connection
+            time.sleep(standin.connect_delay)
+
+    def log_message(self, format: str, *args: Any) -> None:  # silence per-request logs
+        pass
+
+    def do_POST(self) -> None:
+        standin = self.server.standin
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            body = {}
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+
+        with standin.lock:
+            standin.requests += 1
+            roll = standin.random.random()
+        if roll < standin.error_rate:
+            with standin.lock:
+                standin.errors += 1
+            self._send_json(standin.error_status, {"error": {"message": "injected failure", "type": "server_error"}})
+            return
+        latency = standin.latency
+        if roll < standin.error_rate + standin.slow_rate:
+            latency = standin.slow_latency
+            with standin.lock:
+                standin.slow += 1
+        if latency:
+            time.sleep(latency)
+
+        model = body.get("model", "standin")
+        reply = standin.reply_for(body)
+        if body.get("max_tokens"):
+            reply = " ".join(reply.split(" ")[: body["max_tokens"]])  # one word ~ one token here
+        if body.get("stream"):
+            self._stream(model, reply)
+        else:
+            self._send_json(200, _completion(model, reply, body.get("messages") or []))
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, model: str, reply: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        delay = self.server.standin.token_delay
+        for token in _tokens(reply):
+            if delay:
+                time.sleep(delay)
+            self._chunk(_chunk(model, {"content": token}, None))
+        self._chunk(_chunk(model, {}, "stop"))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _chunk(self, payload: Dict[str, Any]) -> None:
+        self._write_chunk(b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n")
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    standin: "StandinServer"
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return  # the client hung up (e.g. an abandoned hedged request)
+        super().handle_error(request, client_address)
+
+
+def _tokens(text: str) -> List[str]:
+    words = text.split(" ")
+    return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+
+def _completion(model: str, reply: str, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+    completion_tokens = len(reply.split())
+    return {
+        "id": "chatcmpl-standin",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def _chunk(model: str, delta: Dict[str, Any], finish_reason: Optional[str]) -> Dict[str, Any]:
+    return {
+        "id": "chatcmpl-standin",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+class StandinServer:
+    """Threaded stand-in for the OpenAI chat API, bound to ``127.0.0.1`` on a free port.
+
+    ``latency`` is added before every response, ``token_delay`` between streamed
+    tokens and ``connect_delay`` once per new TCP connection. A fraction
+    ``error_rate`` of requests fails with ``error_status``, and a further
+    ``slow_rate`` waits ``slow_latency`` instead of ``latency``.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        token_delay: float = 0.0,
+        connect_delay: float = 0.0,
+        reply: str = DEFAULT_REPLY,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        slow_rate: float = 0.0,
+        slow_latency: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.latency = latency
+        self.token_delay = token_delay
+        self.connect_delay = connect_delay
+        self.reply = reply
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.connections = 0
+        self.errors = 0
+        self.slow = 0
+        self.lock = threading.Lock()
+        self._httpd = _Server((host, port), _Handler)
+        self._httpd.standin = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def reply_for(self, body: Dict[str, Any]) -> str:
+        return self.reply
+
+    def start(self) -> "StandinServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StandinServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
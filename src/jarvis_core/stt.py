@@ -0,0 +1,186 @@
+"""Speech-to-text backends behind one interface, selected by config.
+
+``google`` is the original online recognizer; ``vosk`` and ``sphinx`` run fully
+offline. Backends are created once per process and keep their model loaded.
+
+Config (environment): ``JARVIS_STT`` picks the backend (default ``google``),
+``JARVIS_STT_FALLBACK`` names a backend to use when the primary fails with a
+network error, ``JARVIS_VOSK_MODEL`` points at an unpacked Vosk model
+directory (e.g. ``vosk-model-small-pt-0.3``) and ``JARVIS_SPHINX_MODEL`` at a
+pocketsphinx pt-BR model directory containing ``acoustic-model``,
+``language-model.lm.bin`` and ``pronounciation-dictionary.dict``.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from src.jarvis_core.metrics import METRICS
+
+LOGGER = logging.getLogger(__name__)
+
+LANGUAGE = "pt-BR"
+SAMPLE_RATE = 16000
+
+
+class STTError(RuntimeError):
+    """Backend could not produce a transcript (network, missing model, ...)."""
+
+
+class STTBackend:
+    """Base class: subclasses implement :meth:`_load` and :meth:`_transcribe`."""
+
+    name = "base"
+    offline = False
+
+    def __init__(self) -> None:
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        """Load models once; later calls are free."""
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+    def _load(self) -> None:
+        pass
+
+    def transcribe(self, audio: Any) -> str:
+        """Text for ``audio`` (a ``speech_recognition.AudioData``); "" if nothing was understood."""
+        self.load()
+        return self._transcribe(audio).strip()
+
+    def _transcribe(self, audio: Any) -> str:
+        raise NotImplementedError
+
+
+class GoogleBackend(STTBackend):
+    name = "google"
+
+    def _load(self) -> None:
+        import speech_recognition as sr
+
+        self._sr = sr
+        self._recognizer = sr.Recognizer()
+
+    def _transcribe(self, audio: Any) -> str:
+        try:
+            return self._recognizer.recognize_google(audio, language=LANGUAGE)
+        except self._sr.UnknownValueError:
+            return ""
+        except self._sr.RequestError as e:
+            raise STTError(f"google: {e}") from e
+
+
+class VoskBackend(STTBackend):
+    name = "vosk"
+    offline = True
+
+    def __init__(self, model_path: Optional[str] = None) -> None:
+        super().__init__()
+        self.model_path = model_path or os.getenv("JARVIS_VOSK_MODEL", "")
+
+    def _load(self) -> None:
+        try:
+            from vosk import KaldiRecognizer, Model, SetLogLevel
+        except ImportError as e:
+            raise STTError("vosk não instalado (pip install vosk)") from e
+        if not self.model_path or not os.path.isdir(self.model_path):
+            raise STTError(f"modelo Vosk não encontrado: {self.model_path!r} (defina JARVIS_VOSK_MODEL)")
+        SetLogLevel(-1)
+        self._model = Model(self.model_path)
+        self._recognizer_cls = KaldiRecognizer
+
+    def _transcribe(self, audio: Any) -> str:
+        rec = self._recognizer_cls(self._model, SAMPLE_RATE)
+        rec.AcceptWaveform(audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=2))
+        return json.loads(rec.FinalResult()).get("text", "")
+
+
+class SphinxBackend(STTBackend):
+    name = "sphinx"
+    offline = True
+
+    def __init__(self, model_dir: Optional[str] = None) -> None:
+        super().__init__()
+        self.model_dir = model_dir or os.getenv("JARVIS_SPHINX_MODEL", "")
+
+    def _load(self) -> None:
+        import speech_recognition as sr
+
+        try:
+            import pocketsphinx  # noqa: F401
+        except ImportError as e:
+            raise STTError("pocketsphinx não instalado (pip install pocketsphinx)") from e
+        self._sr = sr
+        self._recognizer = sr.Recognizer()
+        if self.model_dir:
+            self._language: Any = (
+                os.path.join(self.model_dir, "acoustic-model"),
+                os.path.join(self.model_dir, "language-model.lm.bin"),
+                os.path.join(self.model_dir, "pronounciation-dictionary.dict"),
+            )
+        else:
+            self._language = LANGUAGE  # needs the pt-BR pack under speech_recognition/pocketsphinx-data
+
+    def _transcribe(self, audio: Any) -> str:
+        try:
+            return self._recognizer.recognize_sphinx(audio, language=self._language)
+        except self._sr.UnknownValueError:
+            return ""
+        except self._sr.RequestError as e:
+            raise STTError(f"sphinx: {e}") from e
+
+
+BACKENDS: Dict[str, Callable[[], STTBackend]] = {
+    "google": GoogleBackend,
+    "vosk": VoskBackend,
+    "sphinx": SphinxBackend,
+}
+
+_instances: Dict[str, STTBackend] = {}
+_instances_lock = threading.Lock()
+
+
+def register_backend(name: str, factory: Callable[[], STTBackend]) -> None:
+    BACKENDS[name] = factory
+
+
+def get_backend(name: Optional[str] = None) -> STTBackend:
+    """Shared backend instance (model loaded once per process)."""
+    name = name or os.getenv("JARVIS_STT", "google")
+    if name not in BACKENDS:
+        raise STTError(f"backend STT desconhecido: {name!r} (opções: {', '.join(BACKENDS)})")
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = BACKENDS[name]()
+        return _instances[name]
+
+
+class Transcriber:
+    """Primary backend with an optional fallback used when the primary errors out."""
+
+    def __init__(self, primary: Optional[str] = None, fallback: Optional[str] = None) -> None:
+        self.primary = get_backend(primary)
+        fallback = fallback if fallback is not None else os.getenv("JARVIS_STT_FALLBACK") or None
+        self.fallback = get_backend(fallback) if fallback and fallback != self.primary.name else None
+
+    def preload(self) -> None:
+        for backend in (self.primary, self.fallback):
+            if backend is not None and backend.offline:
+                backend.load()
+
+    def __call__(self, audio: Any) -> str:
+        with METRICS.span("stt"):
+            try:
+                return self.primary.transcribe(audio)
+            except STTError as e:
+                if self.fallback is None:
+                    raise
+                LOGGER.warning("STT %s falhou (%s); usando %s", self.primary.name, e, self.fallback.name)
+                return self.fallback.transcribe(audio)
@@ -0,0 +1,247 @@
+"""Continuous capture with an energy-based voice activity detector (VAD).
+
+The noise floor is calibrated once from the first frames and then tracked in
+the background (an exponential moving average over non-speech frames), so no
+per-utterance ``adjust_for_ambient_noise`` pause is needed. Utterances are cut
+automatically: speech starts after a few loud frames (a pre-roll ring buffer
+keeps the onset) and ends after a run of quiet frames.
+
+Audio is 16-bit mono PCM. Sources yield fixed-size frames; ``WavSource``
+replays recorded files so the endpointing can be measured without a microphone.
+``close()`` on a source ends its frames at the next frame boundary, from any
+thread, so a capture thread blocked on the microphone can finish.
+"""
+import math
+import threading
+import time
+import wave
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Iterator, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python RMS fallback
+    np = None
+
+SAMPLE_WIDTH = 2
+
+
+def frame_rms(frame: bytes) -> float:
+    if not frame:
+        return 0.0
+    if np is not None:
+        samples = np.frombuffer(frame, dtype="<i2").astype(np.float64)
+        return float(np.sqrt(np.mean(samples * samples)))
+    samples = array("h", frame)
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+@dataclass
+class Utterance:
+    pcm: bytes
+    sample_rate: int
+    start: float  # stream time (s) of the first voiced frame
+    end: float  # stream time of the last voiced frame
+    detected_at: float  # perf_counter when the endpoint was decided
+    endpoint_delay: float  # stream seconds between end of speech and the decision
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / (self.sample_rate * SAMPLE_WIDTH)
+
+    def to_audio_data(self) -> Any:
+        """``speech_recognition.AudioData`` for the recognizers."""
+        import speech_recognition as sr
+
+        return sr.AudioData(self.pcm, self.sample_rate, SAMPLE_WIDTH)
+
+
+class EnergyVAD:
+    """Frame-by-frame endpointer with one-time calibration and an adaptive threshold."""
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 30,
+        calibrate_ms: int = 500,
+        ratio: float = 3.0,
+        min_threshold: float = 150.0,
+        adapt: float = 0.05,
+        start_ms: int = 90,
+        end_silence_ms: int = 600,
+        pre_roll_ms: int = 300,
+        max_utterance_s: float = 15.0,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_bytes = sample_rate * frame_ms // 1000 * SAMPLE_WIDTH
+        self.ratio = ratio
+        self.min_threshold = min_threshold
+        self.adapt = adapt
+        self._calib_frames = max(1, calibrate_ms // frame_ms)
+        self._start_frames = max(1, start_ms // frame_ms)
+        self._end_frames = max(1, end_silence_ms // frame_ms)
+        self._max_frames = int(max_utterance_s * 1000 // frame_ms)
+        self._pre_roll: Deque[bytes] = deque(maxlen=max(1, pre_roll_ms // frame_ms))
+        self._calib: List[float] = []
+        self.noise_floor: Optional[float] = None
+        self._frames_seen = 0
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._speech: Optional[List[bytes]] = None
+        self._speech_start = 0.0
+        self._last_voiced = 0.0
+
+    @property
+    def calibrated(self) -> bool:
+        return self.noise_floor is not None
+
+    @property
+    def threshold(self) -> float:
+        floor = self.noise_floor if self.noise_floor is not None else 0.0
+        return max(self.min_threshold, floor * self.ratio)
+
+    def _stream_time(self) -> float:
+        return self._frames_seen * self.frame_ms / 1000.0
+
+    def process(self, frame: bytes) -> Optional[Utterance]:
+        """Feed one frame; returns an :class:`Utterance` when one just ended."""
+        self._frames_seen += 1
+        energy = frame_rms(frame)
+        if self.noise_floor is None:
+            self._calib.append(energy)
+            if len(self._calib) >= self._calib_frames:
+                self.noise_floor = sum(self._calib) / len(self._calib)
+                self._calib = []
+            return None
+
+        voiced = energy > self.threshold
+        now = self._stream_time()
+        if self._speech is None:
+            self._pre_roll.append(frame)
+            if voiced:
+                self._voiced_run += 1
+                if self._voiced_run >= self._start_frames:
+                    self._speech = list(self._pre_roll)
+                    self._pre_roll.clear()
+                    self._speech_start = now - self._voiced_run * self.frame_ms / 1000.0
+                    self._last_voiced = now
+                    self._silent_run = 0
+            else:
+                self._voiced_run = 0
+                # track slow changes in background noise only while nobody talks
+                self.noise_floor += self.adapt * (energy - self.noise_floor)
+            return None
+
+        self._speech.append(frame)
+        if voiced:
+            self._silent_run = 0
+            self._last_voiced = now
+        else:
+            self._silent_run += 1
+        if self._silent_run >= self._end_frames or len(self._speech) >= self._max_frames:
+            return self._finish(now)
+        return None
+
+    def flush(self) -> Optional[Utterance]:
+        """End-of-stream: return a pending utterance, if any."""
+        if self._speech is None:
+            return None
+        return self._finish(self._stream_time())
+
+    def _finish(self, now: float) -> Utterance:
+        pcm = b"".join(self._speech or [])
+        self._speech = None
+        self._voiced_run = 0
+        self._silent_run = 0
+        return Utterance(pcm, self.sample_rate, self._speech_start, self._last_voiced,
+                         time.perf_counter(), now - self._last_voiced)
+
+
+class WavSource:
+    """Frames from a 16-bit WAV file; ``realtime`` paces them like a live microphone."""
+
+    def __init__(self, path: str, frame_bytes: int, realtime: bool = False) -> None:
+        self.path = path
+        self.frame_bytes = frame_bytes
+        self.realtime = realtime
+        self._closed = threading.Event()
+        with wave.open(path, "rb") as w:
+            if w.getsampwidth() != SAMPLE_WIDTH:
+                raise ValueError(f"{path}: only 16-bit PCM is supported")
+            self.sample_rate = w.getframerate()
+            self.channels = w.getnchannels()
+
+    def frames(self) -> Iterator[bytes]:
+        per_frame = self.frame_bytes // SAMPLE_WIDTH
+        seconds = per_frame / self.sample_rate
+        t0 = time.perf_counter()
+        n = 0
+        with wave.open(self.path, "rb") as w:
+            while not self._closed.is_set():
+                raw = w.readframes(per_frame)
+                if not raw:
+                    return
+                if self.channels > 1:  # keep the first channel
+                    samples = array("h", raw)[:: self.channels]
+                    raw = samples.tobytes()
+                if len(raw) < self.frame_bytes:
+                    raw += b"\0" * (self.frame_bytes - len(raw))
+                n += 1
+                if self.realtime:
+                    delay = t0 + n * seconds - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                yield raw
+
+    def close(self) -> None:
+        self._closed.set()
+
+
+class MicrophoneSource:
+    """Frames from the default microphone through ``speech_recognition``/PyAudio."""
+
+    def __init__(self, sample_rate: int = 16000, frame_bytes: int = 960, device_index: Optional[int] = None) -> None:
+        self.sample_rate = sample_rate
+        self.frame_bytes = frame_bytes
+        self.device_index = device_index
+        self._closed = threading.Event()
+
+    def frames(self) -> Iterator[bytes]:
+        import speech_recognition as sr
+
+        per_frame = self.frame_bytes // SAMPLE_WIDTH
+        with sr.Microphone(device_index=self.device_index, sample_rate=self.sample_rate,
+                           chunk_size=per_frame) as mic:
+            while not self._closed.is_set():
+                yield mic.stream.read(per_frame)
+
+    def close(self) -> None:
+        """Stop reading after the current frame; the microphone is released when ``frames`` returns."""
+        self._closed.set()
+
+
+class ContinuousListener:
+    """Iterate over utterances from ``source`` (``WavSource``/``MicrophoneSource``)."""
+
+    def __init__(self, source: Any, vad: Optional[EnergyVAD] = None) -> None:
+        self.source = source
+        self.vad = vad or EnergyVAD(sample_rate=source.sample_rate)
+        self._it: Optional[Iterator[Utterance]] = None
+
+    def __iter__(self) -> Iterator[Utterance]:
+        for frame in self.source.frames():
+            utt = self.vad.process(frame)
+            if utt is not None:
+                yield utt
+        utt = self.vad.flush()
+        if utt is not None:
+            yield utt
+
+    def next_utterance(self) -> Optional[Utterance]:
+        """Block until the next utterance (``None`` when the source is exhausted)."""
+        if self._it is None:
+            self._it = iter(self)
+        return next(self._it, None)
@@ -0,0 +1,314 @@
+"""Asyncio voice loop: capture -> STT -> respond -> TTS as overlapping stages.
+
+Every stage runs its blocking library call on its own single-thread executor
+and hands work to the next stage through a bounded ``asyncio.Queue``, so the
+microphone keeps listening while the previous answer is still being generated
+or spoken. New speech interrupts playback (barge-in). A capture that overlaps
+playback is only taken as barge-in when it lasts ``min_barge_in`` seconds;
+shorter ones are most likely the speaker's own echo and are dropped before
+STT. Per-stage timings are kept for every turn.
+"""
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.jarvis_core.metrics import METRICS
+
+LOGGER = logging.getLogger(__name__)
+
+
+def audio_seconds(audio: Any) -> Optional[float]:
+    """Length of a capture: a VAD ``Utterance`` or ``speech_recognition.AudioData``; ``None`` if unknown."""
+    duration = getattr(audio, "duration", None)
+    if isinstance(duration, (int, float)):
+        return float(duration)
+    data = getattr(audio, "frame_data", None)
+    if data is not None:
+        return len(data) / (audio.sample_rate * audio.sample_width)
+    return None
+
+
+@dataclass
+class Turn:
+    """One utterance travelling through the pipeline (perf_counter timestamps)."""
+
+    id: int
+    listen_start: float
+    audio: Any = None
+    text: str = ""
+    captured: float = 0.0
+    recognized: float = 0.0
+    responded: float = 0.0
+    speech_start: float = 0.0
+    speech_end: float = 0.0
+    pending_speech: int = 0
+    done: bool = False
+    overlapped: bool = False  # playback ran while this was being captured
+    cancel: threading.Event = field(default_factory=threading.Event, repr=False)  # set on barge-in
+
+    def stage_times(self) -> Dict[str, float]:
+        """Seconds spent per stage, plus ``ttfa`` (end of capture to first audio)."""
+        times = {
+            "capture": self.captured - self.listen_start,
+            "stt": self.recognized - self.captured,
+            "respond": self.responded - self.recognized,
+        }
+        if self.speech_start:
+            times["tts"] = self.speech_end - self.speech_start
+            times["ttfa"] = self.speech_start - self.captured
+        return {k: round(v, 4) for k, v in times.items()}
+
+
+class VoicePipeline:
+    """Run ``capture``/``recognize``/``respond``/``speak`` as concurrent stages.
+
+    ``respond(text)`` produces speech by calling :meth:`say` (from any thread);
+    raising ``SystemExit`` in it ends the loop once pending speech is done.
+    Barge-in sets the turn's :meth:`cancel_token`: its later speech is dropped
+    and ``respond`` should abandon the work it is still doing.
+    ``capture()`` may return ``None`` for "nothing heard" and raises
+    ``EOFError`` when its input is exhausted (e.g. a replayed recording), which
+    ends the loop after the queued turns; ``recognize()`` returns an empty
+    string for "not understood". ``warmup`` (e.g. TTS engine creation)
+    runs on the TTS thread as soon as the loop starts. ``stop_capture`` is
+    called when the loop ends so a ``capture()`` blocked on its input returns
+    and the capture thread can exit. Captures that overlap
+    playback are dropped when ``barge_in`` is off, or when they are shorter
+    than ``min_barge_in`` seconds (see :func:`audio_seconds`).
+    """
+
+    def __init__(
+        self,
+        capture: Callable[[], Any],
+        recognize: Callable[[Any], str],
+        respond: Callable[[str], None],
+        speak: Callable[[str], None],
+        stop_speaking: Optional[Callable[[], None]] = None,
+        barge_in: bool = True,
+        max_queue: int = 4,
+        warmup: Optional[Callable[[], Any]] = None,
+        min_barge_in: float = 0.6,
+        stop_capture: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.capture = capture
+        self.recognize = recognize
+        self.respond = respond
+        self.speak = speak
+        self.stop_speaking = stop_speaking
+        self.stop_capture = stop_capture
+        self.barge_in = barge_in
+        self.max_queue = max_queue
+        self.warmup = warmup
+        self.min_barge_in = min_barge_in
+        self.echoes = 0  # captures dropped as playback echo
+        self.timings: List[Dict[str, float]] = []
+        self._ids = itertools.count(1)
+        self._pools = {name: ThreadPoolExecutor(1, thread_name_prefix=f"voice-{name}")
+                       for name in ("capture", "stt", "respond", "tts")}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._speech: Optional["asyncio.Queue[Tuple[Optional[Turn], str]]"] = None
+        self._current: Optional[Turn] = None
+        self._speaking = threading.Event()
+        self._utterances = 0  # playback starts so far, to tell whether a capture overlapped one
+        self._stopping = False
+        self._exit_requested = False
+        self._done: Optional[asyncio.Event] = None
+        self._early: List[str] = []
+
+    # ---- speech sink --------------------------------------------------------
+    def say(self, text: str) -> None:
+        """Queue ``text`` for speech; safe to call from executor threads.
+
+        Text said before :meth:`run` starts is spoken as soon as it does, and
+        text from a turn that was interrupted is dropped.
+        """
+        if self._loop is None or self._speech is None:
+            self._early.append(text)
+            return
+        turn = self._current
+        if turn is not None and turn.cancel.is_set():
+            return
+        self._loop.call_soon_threadsafe(self._enqueue, turn, text)
+
+    def _enqueue(self, turn: Optional[Turn], text: str) -> None:
+        # on the loop thread, like every other ``pending_speech`` update
+        if turn is not None:
+            if turn.cancel.is_set():
+                return
+            turn.pending_speech += 1
+        self._speech.put_nowait((turn, text))
+
+    def cancel_token(self) -> Optional[threading.Event]:
+        """The answering turn's cancel event (set by :meth:`interrupt`); ``None`` outside ``respond``."""
+        turn = self._current
+        return turn.cancel if turn is not None else None
+
+    def interrupt(self) -> None:
+        """Barge-in: cancel the answering turn, drop queued speech and stop the current utterance."""
+        assert self._speech is not None
+        turn = self._current
+        if turn is not None:
+            turn.cancel.set()
+        while not self._speech.empty():
+            turn, _ = self._speech.get_nowait()
+            if turn is not None:
+                turn.pending_speech -= 1
+                self._maybe_finish(turn)
+        if self._speaking.is_set() and self.stop_speaking is not None:
+            try:
+                self.stop_speaking()
+            except Exception as e:
+                LOGGER.debug("stop_speaking failed: %s", e)
+
+    # ---- stages -------------------------------------------------------------
+    async def _run_in(self, pool: str, fn: Callable, *args: Any) -> Any:
+        assert self._loop is not None
+        return await self._loop.run_in_executor(self._pools[pool], fn, *args)
+
+    async def _capture_stage(self, audio_q: "asyncio.Queue[Optional[Turn]]") -> None:
+        while not self._stopping:
+            turn = Turn(next(self._ids), time.perf_counter())
+            utterances = self._utterances
+            try:
+                audio = await self._run_in("capture", self.capture)
+            except EOFError:
+                await audio_q.put(None)  # end of input: drain the pipeline, then stop
+                return
+            if audio is None:
+                continue
+            turn.overlapped = self._speaking.is_set() or self._utterances != utterances
+            if turn.overlapped and self._is_echo(audio):
+                self.echoes += 1
+                LOGGER.debug("Dropped capture during playback (turn %d)", turn.id)
+                continue
+            turn.audio, turn.captured = audio, time.perf_counter()
+            await audio_q.put(turn)  # bounded: capture waits if STT falls behind
+
+    def _is_echo(self, audio: Any) -> bool:
+        if not self.barge_in:
+            return True
+        seconds = audio_seconds(audio)
+        return seconds is not None and seconds < self.min_barge_in
+
+    async def _stt_stage(self, audio_q: "asyncio.Queue[Optional[Turn]]",
+                         text_q: "asyncio.Queue[Optional[Turn]]") -> None:
+        while True:
+            turn = await audio_q.get()
+            if turn is None:
+                await text_q.put(None)
+                return
+            turn.text = (await self._run_in("stt", self.recognize, turn.audio)) or ""
+            turn.audio = None
+            turn.recognized = time.perf_counter()
+            if not turn.text:
+                continue
+            if self.barge_in and (self._speaking.is_set() or not self._speech.empty()):
+                LOGGER.info("Barge-in on turn %d", turn.id)
+                self.interrupt()
+            await text_q.put(turn)
+
+    async def _respond_stage(self, text_q: "asyncio.Queue[Optional[Turn]]") -> None:
+        while not self._exit_requested:
+            turn = await text_q.get()
+            if turn is None:
+                self._exit_requested = True
+                break
+            self._current = turn
+            try:
+                await self._run_in("respond", self.respond, turn.text)
+            except SystemExit:
+                self._exit_requested = True
+            except Exception as e:
+                LOGGER.warning("respond failed on turn %d: %s", turn.id, e)
+            finally:
+                self._current = None
+                turn.responded = time.perf_counter()
+                turn.done = True
+            self._maybe_finish(turn)
+        self._check_exit()
+
+    async def _speak_stage(self) -> None:
+        assert self._speech is not None
+        while True:
+            turn, text = await self._speech.get()
+            if turn is not None and not turn.speech_start:
+                turn.speech_start = time.perf_counter()
+            self._utterances += 1
+            self._speaking.set()
+            try:
+                with METRICS.span("tts"):
+                    await self._run_in("tts", self.speak, text)
+            except Exception as e:
+                LOGGER.debug("speak failed: %s", e)
+            finally:
+                self._speaking.clear()
+            if turn is not None:
+                turn.speech_end = time.perf_counter()
+                turn.pending_speech -= 1
+                self._maybe_finish(turn)
+            self._check_exit()
+
+    def _maybe_finish(self, turn: Turn) -> None:
+        if turn.done and turn.pending_speech <= 0:
+            times = turn.stage_times()
+            self.timings.append(times)
+            LOGGER.info("turn %d %s", turn.id, " ".join(f"{k}={v:.2f}s" for k, v in times.items()))
+
+    def _check_exit(self) -> None:
+        if self._exit_requested and self._speech.empty() and not self._speaking.is_set():
+            self._done.set()
+
+    # ---- lifecycle ----------------------------------------------------------
+    async def run(self) -> None:
+        """Run until ``respond`` raises ``SystemExit`` or :meth:`stop` is called."""
+        self._loop = asyncio.get_running_loop()
+        self._speech = asyncio.Queue()
+        self._done = asyncio.Event()
+        for text in self._early:
+            self._speech.put_nowait((None, text))
+        self._early.clear()
+        if self.warmup is not None:
+            self._pools["tts"].submit(self.warmup)
+        audio_q: "asyncio.Queue[Optional[Turn]]" = asyncio.Queue(self.max_queue)
+        text_q: "asyncio.Queue[Optional[Turn]]" = asyncio.Queue(self.max_queue)
+        tasks = [
+            asyncio.create_task(self._capture_stage(audio_q)),
+            asyncio.create_task(self._stt_stage(audio_q, text_q)),
+            asyncio.create_task(self._respond_stage(text_q)),
+            asyncio.create_task(self._speak_stage()),
+        ]
+        try:
+            await self._done.wait()
+        finally:
+            self._stopping = True
+            if self.stop_capture is not None:
+                try:
+                    self.stop_capture()
+                except Exception as e:
+                    LOGGER.debug("stop_capture failed: %s", e)
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for pool in self._pools.values():
+                pool.shutdown(wait=False)
+            self._loop = None
+
+    def stop(self) -> None:
+        """Request shutdown (thread-safe)."""
+        loop, done = self._loop, self._done
+        if loop is not None and done is not None:
+            loop.call_soon_threadsafe(done.set)
+
+    def summary(self) -> Dict[str, float]:
+        """Mean seconds per stage over the recorded turns."""
+        out: Dict[str, float] = {}
+        for key in ("capture", "stt", "respond", "tts", "ttfa"):
+            values = [t[key] for t in self.timings if key in t]
+            if values:
+                out[key] = round(sum(values) / len(values), 4)
+        return out
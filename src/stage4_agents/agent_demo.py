@@ -1,102 +1,217 @@
 ﻿import argparse
 import logging
 import os
-from typing import Iterable, List, Optional
+import sys
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from src.stage4_agents.dag import DependencyFailed, PlanStep, run_dag
+from src.stage4_agents.memory import Memory
+from src.stage4_agents.tool_cache import ToolCache, tool_key
 
 LOGGER = logging.getLogger(__name__)
 
 
-class Memory:
-    """Lightweight in-memory log to mimic short-term recall for the agent."""
+Tool = Union[str, Callable[..., str]]
 
-    def __init__(self) -> None:
-        self.events: List[str] = []
+# Tools that must not run concurrently with themselves (one GPU, one deploy at a time)
+DEFAULT_TOOL_LIMITS = {"model_trainer": 1, "deployment_pipeline": 1}
+# Expensive, idempotent tools whose results are reused across plans with the same inputs
+DEFAULT_CACHEABLE = ("data_extractor", "evaluation_suite")
 
-    def remember(self, entry: str) -> None:
-        self.events.append(entry)
+_shared_cache: Optional[ToolCache] = None
+_shared_cache_lock = threading.Lock()
 
-    def recall(self) -> List[str]:
-        return list(self.events)
 
-    def recent(self, limit: Optional[int] = None) -> List[str]:
-        """Return the most recent events, preserving order."""
-        if limit is None:
-            return self.recall()
-        return list(self.events[-limit:])
+def shared_tool_cache() -> ToolCache:
+    """The process-wide cache handed to every registry built for a demo run or batch goal."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = ToolCache()
+        return _shared_cache
 
 
 class ToolRegistry:
-    """Registry of mock tools the Worker can call to act on the environment."""
-
-    def __init__(self) -> None:
-        self.tools = {
+    """Registry of mock tools the Worker can call to act on the environment.
+
+    A tool is either a fixed result string or a callable returning one. Tools
+    with an entry in ``limits`` accept at most that many concurrent calls.
+    Tools declared ``cacheable`` must be idempotent: their results are served
+    from ``cache`` (keyed on tool name and arguments) while still fresh.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, int]] = None,
+        cache: Optional[ToolCache] = None,
+        cacheable: Iterable[str] = DEFAULT_CACHEABLE,
+    ) -> None:
+        self.tools: Dict[str, Tool] = {
             "data_extractor": "Fetched customer churn dataset",
             "model_trainer": "Trained gradient boosting model",
             "evaluation_suite": "Calculated ROC-AUC and precision-recall curves",
             "deployment_pipeline": "Shipped model to production with feature monitoring",
         }
+        self._limits: Dict[str, threading.BoundedSemaphore] = {}
+        for name, limit in {**DEFAULT_TOOL_LIMITS, **(limits or {})}.items():
+            self.set_limit(name, limit)
+        self.cache = cache if cache is not None else ToolCache()
+        self._cacheable: Set[str] = set(cacheable)
+
+    def register(
+        self,
+        name: str,
+        tool: Tool,
+        limit: Optional[int] = None,
+        cacheable: bool = False,
+        ttl: Optional[float] = None,
+    ) -> None:
+        self.tools[name] = tool
+        if limit is not None:
+            self.set_limit(name, limit)
+        self.set_cacheable(name, cacheable, ttl)
+
+    def set_limit(self, name: str, limit: Optional[int]) -> None:
+        """Cap concurrent calls to ``name`` (``None`` removes the cap)."""
+        if limit is None:
+            self._limits.pop(name, None)
+        else:
+            self._limits[name] = threading.BoundedSemaphore(limit)
+
+    def set_cacheable(self, name: str, cacheable: bool = True, ttl: Optional[float] = None) -> None:
+        """Declare ``name`` idempotent (or not); ``ttl`` overrides the cache's default lifetime."""
+        if cacheable:
+            self._cacheable.add(name)
+        else:
+            self._cacheable.discard(name)
+            self.cache.invalidate(name)
+        self.cache.set_ttl(name, ttl)
+
+    def invalidate(self, name: Optional[str] = None) -> int:
+        """Forget cached results of ``name`` (of every tool if ``None``)."""
+        return self.cache.invalidate(name)
 
     def list_tools(self) -> List[str]:
         return list(self.tools.keys())
 
-    def use(self, name: Optional[str]) -> str:
+    def _call(self, name: str, tool: Tool, args: Tuple[Any, ...]) -> str:
+        if not callable(tool):
+            return tool
+        limit = self._limits.get(name)
+        if limit is None:
+            return tool(*args)
+        with limit:
+            return tool(*args)
+
+    def use(self, name: Optional[str], *args: Any) -> str:
         if name is None:
             return "Executed step with no external tool"
-        return self.tools.get(name, f"Tool '{name}' not found")
+        tool = self.tools.get(name)
+        if tool is None:
+            return f"Tool '{name}' not found"
+        if name not in self._cacheable:
+            return self._call(name, tool, args)
+        result, _ = self.cache.get_or_compute(name, tool_key(name, args), lambda: self._call(name, tool, args))
+        return result
 
 
 class Planner:
-    def plan(self, goal: str) -> List[str]:
-        """Return a transparent, tool-annotated plan."""
-        return [
-            f"Analyze goal: {goal}",
-            "Collect relevant data [tool:data_extractor]",
-            "Train baseline model [tool:model_trainer]",
-            "Evaluate results [tool:evaluation_suite]",
-            "Deploy system [tool:deployment_pipeline]",
-            "Confirm monitoring thresholds and alerting",
-        ]
+    def iter_plan(self, goal: str) -> Iterator[PlanStep]:
+        """Yield a transparent, tool-annotated plan with explicit dependencies, step by step.
+
+        Tool steps carry the goal as their argument, so a shared tool cache
+        reuses results only for the same goal.
+        """
+        args = (goal,)
+        yield PlanStep(1, f"Analyze goal: {goal}")
+        yield PlanStep(2, "Collect relevant data", "data_extractor", (1,), args)
+        yield PlanStep(3, "Train baseline model", "model_trainer", (2,), args)
+        yield PlanStep(4, "Evaluate results", "evaluation_suite", (3,), args)
+        yield PlanStep(5, "Deploy system", "deployment_pipeline", (4,), args)
+        yield PlanStep(6, "Confirm monitoring thresholds and alerting", None, (1,))
+
+    def plan(self, goal: str) -> List[PlanStep]:
+        return list(self.iter_plan(goal))
+
+
+def as_plan(steps: Iterable[Union[PlanStep, str]]) -> Iterator[PlanStep]:
+    """Accept plain step strings too; each one then depends on the previous (serial)."""
+    for idx, step in enumerate(steps, start=1):
+        if isinstance(step, str):
+            step = PlanStep.parse(idx, step, (idx - 1,) if idx > 1 else ())
+        yield step
 
 
 class Worker:
-    def execute(self, steps: Iterable[str], tools: ToolRegistry, memory: Memory) -> List[str]:
-        results: List[str] = []
-        for idx, step in enumerate(steps, start=1):
-            tool_used: Optional[str] = None
-            if "[tool:" in step:
-                tool_used = step.split("[tool:")[1].split("]")[0].strip()
+    """Runs plan steps as a DAG: independent steps overlap, up to ``max_workers`` at once.
+
+    Steps are pulled from the plan lazily and records reach ``memory`` (and the
+    caller) in plan order as soon as they complete, whatever the completion
+    order; ``max_workers=1`` is the old serial loop.
+    """
 
-            action_result = tools.use(tool_used)
-            record = f"Step {idx}: {step} -> {action_result}"
+    def __init__(self, max_workers: int = 4) -> None:
+        self.max_workers = max_workers
 
-            memory.remember(record)
-            results.append(record)
+    def stream(
+        self, steps: Iterable[Union[PlanStep, str]], tools: ToolRegistry, memory: Memory
+    ) -> Iterator[str]:
+        for step, action_result, error in run_dag(as_plan(steps), lambda s: tools.use(s.tool, *s.args), self.max_workers):
+            if isinstance(error, DependencyFailed):
+                action_result = f"Skipped ({error})"
+            elif error is not None:
+                action_result = f"Failed: {error}"
+            event = memory.record(step.index, step.tool, step.description, action_result)
+            yield str(event)
 
-        return results
+    def execute(
+        self, steps: Iterable[Union[PlanStep, str]], tools: ToolRegistry, memory: Memory
+    ) -> List[str]:
+        return list(self.stream(steps, tools, memory))
 
 
 class Critic:
-    def review(self, results: Iterable[str], memory: Memory) -> List[str]:
-        feedback: List[str] = []
-        result_list = list(results)
+    """Reviews results; with ``tools`` it also reports the registry's cache hit/miss counters."""
 
-        for r in result_list:
-            if "Deploy system" in r or "Deploy" in r:
-                feedback.append("Add monitoring, logging, and rollback strategy")
+    def __init__(self, tools: Optional[ToolRegistry] = None) -> None:
+        self.tools = tools
 
-        if not feedback:
-            feedback.append("Execution looks safe, but continuous validation is required")
+    def watch(self, results: Iterable[str], memory: Memory) -> Iterator[Tuple[str, str]]:
+        """Pass results through as ``("result", r)`` and interleave ``("feedback", f)`` as issues appear.
 
-        if len(memory.recall()) < len(result_list):
-            feedback.append("Memory is missing some steps—verify logging pipeline")
-        elif not memory.recent(1):
-            feedback.append("No execution events captured in memory")
+        Each result is reviewed when it arrives; only counters are kept, so a
+        plan of any length is reviewed in constant memory.
+        """
+        count = 0
+        flagged = False
+        for r in results:
+            count += 1
+            yield "result", r
+            if "Deploy system" in r or "Deploy" in r:
+                flagged = True
+                yield "feedback", "Add monitoring, logging, and rollback strategy"
+            if "-> Failed:" in r or "-> Skipped (" in r:
+                flagged = True
+                yield "feedback", f"{r.split(':')[0]} did not complete—review it before relying on later steps"
+
+        if not flagged:
+            yield "feedback", "Execution looks safe, but continuous validation is required"
+
+        last_event = memory.last()
+        if memory.total < count:
+            yield "feedback", "Memory is missing some steps—verify logging pipeline"
+        elif last_event is None:
+            yield "feedback", "No execution events captured in memory"
         else:
-            last_event = memory.recent(1)[0]
-            step_label = last_event.split(":")[0]
-            feedback.append(f"Last recorded event: {step_label} (details redacted)")
+            step_label = str(last_event).split(":")[0]
+            yield "feedback", f"Last recorded event: {step_label} (details redacted)"
 
-        return feedback
+        if self.tools is not None and self.tools.cache.stats():
+            yield "feedback", self.tools.cache.summary()
+
+    def review(self, results: Iterable[str], memory: Memory) -> List[str]:
+        return [item for kind, item in self.watch(results, memory) if kind == "feedback"]
 
 
 def configure_logging(verbose: Optional[bool] = None) -> None:
@@ -109,52 +224,117 @@ def configure_logging(verbose: Optional[bool] = None) -> None:
     LOGGER.debug("Logger configured with verbose=%s", verbose)
 
 
-def run_stage4_demo(verbose: Optional[bool] = None) -> None:
-    configure_logging(verbose)
+def run_stage4_demo(
+    verbose: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    echo: Optional[Callable[[str], None]] = None,
+    cache: Optional[ToolCache] = None,
+) -> None:
+    """Run the demo goal end to end.
+
+    By default this configures the root logger and prints progress to stdout.
+    An embedding app passes its own ``logger`` (the root logger is then left
+    alone; ``verbose`` only matters via that logger's level) and ``echo``,
+    which receives each progress line instead of ``print``. Tool results are
+    cached in ``cache`` (default :func:`shared_tool_cache`), so repeated runs
+    reuse them.
+    """
+    if logger is None:
+        configure_logging(verbose)
+        logger = LOGGER
+    if echo is None:
+        echo = lambda line: print(line, flush=True)
 
     goal = "Build a production-ready churn prediction system"
 
     planner = Planner()
     worker = Worker()
-    critic = Critic()
     memory = Memory()
-    tools = ToolRegistry()
-
-    plan = planner.plan(goal)
-    results = worker.execute(plan, tools=tools, memory=memory)
-    feedback = critic.review(results, memory=memory)
+    tools = ToolRegistry(cache=cache if cache is not None else shared_tool_cache())
+    critic = Critic(tools)
+
+    logger.info("[Stage 4] Agentic & Multi-Agent System Demo")
+    logger.info("Goal: %s", goal)
+    logger.debug("Tools available: %s", ", ".join(tools.list_tools()))
+
+    show = logger.isEnabledFor(logging.DEBUG)
+    if show:
+        echo(f"\nGOAL: {goal}")
+        echo("\n--- PLAN → EXECUTION → CRITIC (streaming) ---")
+
+    counts = {"plan": 0, "result": 0, "feedback": 0}
+
+    def planned() -> Iterator[PlanStep]:
+        for step in planner.iter_plan(goal):
+            counts["plan"] += 1
+            if show:
+                echo(f"[plan]   {step}")
+            yield step
+
+    # Planner -> Worker -> Critic are chained generators: each step flows through as soon as it is ready
+    for kind, item in critic.watch(worker.stream(planned(), tools=tools, memory=memory), memory=memory):
+        counts[kind] += 1
+        if show:
+            echo(f"{'[done]  ' if kind == 'result' else '[critic]'} {item}")
+
+    logger.info("Plan steps: %d", counts["plan"])
+    logger.info("Execution steps: %d", counts["result"])
+    logger.info("Memory captured %d events", len(memory))
+    logger.info("Critic feedback items: %d", counts["feedback"])
+
+    if show:
+        echo("\nStage 4 Complete.\n")
+
+
+def run_stage4_batch(
+    goals_path: str,
+    out_path: Optional[str] = None,
+    verbose: Optional[bool] = None,
+    **options: Any,
+) -> Dict[str, Any]:
+    """Run every goal in ``goals_path`` (``-`` for stdin) and write JSONL to ``out_path`` (stdout if unset)."""
+    from src.stage4_agents.batch import read_goals, write_batch
 
-    LOGGER.info("[Stage 4] Agentic & Multi-Agent System Demo")
-    LOGGER.info("Goal: %s", goal)
-    LOGGER.info("Plan steps: %d", len(plan))
-    LOGGER.info("Execution steps: %d", len(results))
-    LOGGER.info("Memory captured %d events", len(memory.recall()))
-    LOGGER.info("Critic feedback items: %d", len(feedback))
-
-    LOGGER.debug("Tools available: %s", ", ".join(tools.list_tools()))
-
-    if logging.getLogger().isEnabledFor(logging.DEBUG):
-        print("\nGOAL:", goal)
-        print("\n--- PLAN ---")
-        for step in plan:
-            print("-", step)
-
-        print("\n--- EXECUTION ---")
-        for r in results:
-            print("-", r)
-
-        print("\n--- CRITIC FEEDBACK ---")
-        for f in feedback:
-            print("-", f)
-
-        print("\nStage 4 Complete.\n")
+    configure_logging(verbose)
+    source = sys.stdin if goals_path == "-" else open(goals_path, "r", encoding="utf-8")
+    out = sys.stdout if out_path in (None, "-") else open(out_path, "w", encoding="utf-8")
+    try:
+        summary = write_batch(read_goals(source), out, **options)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    LOGGER.info(
+        "[Stage 4 batch] %d goals in %.2fs (%.1f goals/s) on %d process(es); goal p50=%.2fms p95=%.2fms p99=%.2fms",
+        summary["goals"], summary["wall_s"], summary["goals_per_s"], summary["processes"],
+        summary["goal_ms_p50"], summary["goal_ms_p95"], summary["goal_ms_p99"],
+    )
+    if summary["errors"] or summary["failed_steps"]:
+        LOGGER.warning("%d goal(s) raised, %d step(s) failed or skipped", summary["errors"], summary["failed_steps"])
+    return summary
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Run the stage 4 agent demo")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    parser.add_argument("--goals", metavar="FILE", help="Batch mode: one goal per line ('-' reads stdin)")
+    parser.add_argument("--out", metavar="FILE", help="Batch mode: JSONL output file (default stdout)")
+    parser.add_argument("--processes", type=int, default=None, help="Batch mode: worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=64, help="Batch mode: goals sent to a process at a time")
+    parser.add_argument("--step-workers", type=int, default=1, help="Batch mode: concurrent steps within a goal")
     args = parser.parse_args()
-    run_stage4_demo(verbose=args.verbose)
+    if args.goals:
+        run_stage4_batch(
+            args.goals,
+            args.out,
+            verbose=args.verbose,
+            processes=args.processes,
+            chunksize=args.chunksize,
+            step_workers=args.step_workers,
+        )
+    else:
+        run_stage4_demo(verbose=args.verbose)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,132 @@
+"""Run Stage 4 demos on a background executor with per-run log capture.
+
+Each run gets a private logger that is outside the logging hierarchy. Its
+``QueueHandler`` feeds the run's own queue, so concurrent runs never share
+output. Nothing touches ``sys.stdout`` or the root logger, which belong to
+the embedding server. Completed runs are cached by their parameters.
+"""
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from logging.handlers import QueueHandler
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+_FORMAT = logging.Formatter("%(levelname)s: %(message)s")
+_run_ids = itertools.count(1)
+
+
+class Stage4Run:
+    """One submitted run; its output accumulates in :attr:`lines` as :meth:`poll` drains the queue."""
+
+    def __init__(self, params: Dict[str, Any]) -> None:
+        self.id = next(_run_ids)
+        self.params = params
+        self.lines: List[str] = []
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.future: "Future[None]" = Future()
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+
+    def logger(self) -> logging.Logger:
+        """Private logger for this run (not registered with ``logging.getLogger``, never propagates)."""
+        logger = logging.Logger(f"stage4.run.{self.id}", logging.DEBUG if self.params.get("verbose") else logging.INFO)
+        handler = QueueHandler(self._queue)
+        handler.setFormatter(_FORMAT)
+        logger.addHandler(handler)
+        logger.propagate = False
+        return logger
+
+    def echo(self, line: str) -> None:
+        self._queue.put(line)
+
+    @property
+    def done(self) -> bool:
+        return self.future.done()
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        return self.future.exception() if self.future.done() else None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def poll(self) -> List[str]:
+        """Move queued output into :attr:`lines`; returns just the new lines."""
+        new = []
+        with self._lock:
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                new.append(item.getMessage() if isinstance(item, logging.LogRecord) else item)
+            self.lines.extend(new)
+        return new
+
+    def text(self) -> str:
+        self.poll()
+        return "\n".join(self.lines).strip()
+
+    def wait(self, timeout: Optional[float] = None) -> str:
+        """Block until the run ends (re-raising its error) and return its full output."""
+        self.future.result(timeout)
+        return self.text()
+
+
+class Stage4Runner:
+    """Executor plus a parameter-keyed cache of runs.
+
+    ``submit`` with parameters that match a finished run returns that run, and
+    it also returns a run that is still in flight. A failed run is replaced.
+    At most ``max_cached`` runs are kept.
+    """
+
+    def __init__(self, demo: Callable[..., None], max_workers: int = 2, max_cached: int = 8) -> None:
+        self.demo = demo
+        self.max_cached = max_cached
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage4-run")
+        self._runs: Dict[Tuple[Tuple[str, Any], ...], Stage4Run] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, force: bool = False, **params: Any) -> Stage4Run:
+        key = tuple(sorted(params.items()))
+        with self._lock:
+            run = self._runs.get(key)
+            if run is not None and not force and run.error is None:
+                return run
+            self._runs.pop(key, None)
+            run = self._runs[key] = Stage4Run(params)
+            finished = [k for k, r in self._runs.items() if r.done]  # oldest first
+            for k in finished[: max(0, len(self._runs) - self.max_cached)]:
+                del self._runs[k]
+        self._pool.submit(self._execute, run)
+        return run
+
+    def _execute(self, run: Stage4Run) -> None:
+        if not run.future.set_running_or_notify_cancel():
+            return
+        run.started = time.perf_counter()
+        try:
+            self.demo(logger=run.logger(), echo=run.echo, **run.params)
+        except BaseException as e:
+            LOGGER.exception("Stage 4 run %d failed", run.id)
+            run.finished = time.perf_counter()
+            run.future.set_exception(e)
+        else:
+            run.finished = time.perf_counter()
+            run.future.set_result(None)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for run in self._runs.values():
+                run.future.cancel()  # only runs still queued
+        self._pool.shutdown(wait=False, cancel_futures=True)
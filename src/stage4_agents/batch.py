@@ -0,0 +1,155 @@
+"""Run many Stage 4 goals across a process pool, one JSONL record per goal.
+
+Goals are sharded into chunks so each process round-trip carries many goals.
+Every process builds its own Planner, Worker and tool cache once. Every goal
+gets a fresh Memory, ToolRegistry and Critic. The cache is keyed on the goal,
+so only repeats of the same goal reuse tool results.
+"""
+import json
+import logging
+import os
+import time
+from array import array
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from src.stage4_agents.agent_demo import Critic, Planner, ToolRegistry, Worker
+from src.stage4_agents.memory import Memory
+from src.stage4_agents.tool_cache import ToolCache
+
+LOGGER = logging.getLogger(__name__)
+
+GOAL_MEMORY = 256  # events kept per goal; a plan is a handful of steps
+
+_planner: Optional[Planner] = None
+_worker: Optional[Worker] = None
+_cache: Optional[ToolCache] = None
+
+
+def read_goals(source: TextIO) -> Iterator[str]:
+    """One goal per line; blank lines and ``#`` comments are skipped."""
+    for line in source:
+        goal = line.strip()
+        if goal and not goal.startswith("#"):
+            yield goal
+
+
+def _init_process(step_workers: int) -> None:
+    global _planner, _worker, _cache
+    _planner = Planner()
+    _worker = Worker(max_workers=step_workers)
+    _cache = ToolCache()
+
+
+def run_goal(goal: str, planner: Planner, worker: Worker, cache: Optional[ToolCache] = None) -> Dict[str, Any]:
+    """Plan, execute and review one goal with its own memory, tools and critic (``cache`` may be shared)."""
+    t0 = time.perf_counter()
+    memory = Memory(capacity=GOAL_MEMORY)
+    tools = ToolRegistry(cache=cache)
+    results: List[str] = []
+    feedback: List[str] = []
+    for kind, item in Critic(tools).watch(worker.stream(planner.iter_plan(goal), tools, memory), memory):
+        (results if kind == "result" else feedback).append(item)
+    return {
+        "goal": goal,
+        "results": results,
+        "feedback": feedback,
+        "failed": sum("-> Failed:" in r or "-> Skipped (" in r for r in results),
+        "elapsed_ms": round((time.perf_counter() - t0) * 1e3, 3),
+    }
+
+
+def _run_chunk(chunk: List[Tuple[int, str]]) -> List[Dict[str, Any]]:
+    pid = os.getpid()
+    records = []
+    for index, goal in chunk:
+        try:
+            record = run_goal(goal, _planner, _worker, _cache)
+        except Exception as e:  # one bad goal must not sink its chunk
+            LOGGER.debug("Goal %d failed", index, exc_info=True)
+            record = {"goal": goal, "error": f"{type(e).__name__}: {e}"}
+        record["index"] = index
+        record["pid"] = pid
+        records.append(record)
+    return records
+
+
+def _chunks(goals: Iterable[str], size: int) -> Iterator[List[Tuple[int, str]]]:
+    chunk: List[Tuple[int, str]] = []
+    for item in enumerate(goals):
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_batch(
+    goals: Iterable[str],
+    processes: Optional[int] = None,
+    chunksize: int = 64,
+    step_workers: int = 1,
+) -> Iterator[Dict[str, Any]]:
+    """Yield one record per goal, in input order.
+
+    ``processes`` defaults to the CPU count; ``1`` runs in this process. At
+    most ``2 * processes`` chunks are in flight, so ``goals`` is read lazily
+    and memory stays flat however many goals there are. ``step_workers`` is
+    each goal's DAG concurrency. The default of 1 runs steps inline, because
+    the processes already provide the parallelism.
+    """
+    processes = processes or os.cpu_count() or 1
+    chunks = _chunks(goals, max(chunksize, 1))
+    if processes <= 1:
+        _init_process(step_workers)
+        for chunk in chunks:
+            yield from _run_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(processes, initializer=_init_process, initargs=(step_workers,)) as pool:
+        pending: Deque[Future] = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_run_chunk, chunk))
+            if len(pending) >= 2 * processes:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))]
+
+
+def write_batch(goals: Iterable[str], out: TextIO, **options: Any) -> Dict[str, Any]:
+    """Stream :func:`run_batch` records to ``out`` as JSONL and return a throughput summary."""
+    t0 = time.perf_counter()
+    elapsed = array("d")
+    errors = failed_steps = 0
+    pids = set()
+    for record in run_batch(goals, **options):
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        pids.add(record["pid"])
+        if "error" in record:
+            errors += 1
+        else:
+            elapsed.append(record["elapsed_ms"])
+            failed_steps += record["failed"]
+    out.flush()
+    wall = time.perf_counter() - t0
+    ordered = sorted(elapsed)
+    total = len(elapsed) + errors
+    return {
+        "goals": total,
+        "errors": errors,
+        "failed_steps": failed_steps,
+        "processes": len(pids),
+        "wall_s": round(wall, 3),
+        "goals_per_s": round(total / wall, 1) if wall > 0 else 0.0,
+        "goal_ms_p50": _percentile(ordered, 50),
+        "goal_ms_p95": _percentile(ordered, 95),
+        "goal_ms_p99": _percentile(ordered, 99),
+    }
@@ -0,0 +1,173 @@
+"""Dependency-aware execution of plan steps on a bounded thread pool."""
+import logging
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PlanStep:
+    """One plan step; ``depends_on`` lists the indexes of steps that must finish first.
+
+    ``args`` are passed to the tool (and are part of its cache key).
+    """
+
+    index: int
+    description: str
+    tool: Optional[str] = None
+    depends_on: Tuple[int, ...] = ()
+    args: Tuple[Any, ...] = ()
+
+    def __str__(self) -> str:
+        return f"{self.description} [tool:{self.tool}]" if self.tool else self.description
+
+    @classmethod
+    def parse(cls, index: int, text: str, depends_on: Iterable[int] = ()) -> "PlanStep":
+        """Build a step from the legacy ``"... [tool:name]"`` string form."""
+        tool = None
+        description = text
+        if "[tool:" in text:
+            tool = text.split("[tool:")[1].split("]")[0].strip()
+            description = text.split("[tool:")[0].rstrip()
+        return cls(index, description, tool, tuple(depends_on))
+
+
+class DependencyFailed(RuntimeError):
+    """A step was not run because one of its dependencies failed."""
+
+
+Outcome = Tuple[PlanStep, Optional[str], Optional[BaseException]]
+
+
+class _Slot:
+    __slots__ = ("step", "state", "result", "error")
+
+    def __init__(self, step: PlanStep) -> None:
+        self.step = step
+        self.state = "waiting"  # waiting -> running -> done
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+def _check(step: PlanStep, last_index: Optional[int], seen: Set[int]) -> None:
+    """Validate ``step`` against the steps before it, then add it to ``seen``."""
+    if last_index is not None and step.index <= last_index:
+        raise ValueError(f"Step indexes must increase along the plan (got {step.index} after {last_index})")
+    for d in step.depends_on:
+        if d >= step.index:
+            raise ValueError(f"Step {step.index} depends on step {d}, which does not come before it")
+    missing = [d for d in step.depends_on if d not in seen]
+    if missing:
+        raise ValueError(f"Step {step.index} depends on unknown step(s) {missing}")
+    seen.add(step.index)
+
+
+def run_dag(
+    steps: Iterable[PlanStep],
+    run: Callable[[PlanStep], str],
+    max_workers: int = 4,
+    lookahead: Optional[int] = None,
+) -> Iterator[Outcome]:
+    """Run ``run(step)`` for every step as soon as its dependencies are done.
+
+    ``steps`` is consumed lazily: at most ``lookahead`` (default
+    ``4 * max_workers``) unfinished steps are held at once, so arbitrarily long
+    (even generated) plans run in near-constant memory (one int per step index is
+    kept to reject unknown dependencies). Dependencies must name earlier steps,
+    which also rules out cycles. At most ``max_workers`` steps
+    run at once.
+
+    Outcomes ``(step, result, error)`` are yielded in plan order, each as soon
+    as it and every earlier step have finished, so consumers see a
+    deterministic sequence regardless of completion order. Dependents of a
+    failed step are skipped with :class:`DependencyFailed`. ``max_workers=1``
+    runs serially on the calling thread.
+    """
+    failed: Set[int] = set()  # only failures are remembered once a step is emitted
+    last_index: Optional[int] = None
+    seen: Set[int] = set()
+
+    def failed_dependency(step: PlanStep, window: Dict[int, _Slot]) -> Tuple[bool, Optional[int]]:
+        """``(ready, failed_dep)`` for ``step`` given the steps still in the window."""
+        for d in step.depends_on:
+            slot = window.get(d)
+            if slot is not None and slot.state != "done":
+                return False, None
+            if d in failed or (slot is not None and slot.error is not None):
+                return True, d
+        return True, None
+
+    if max_workers <= 1:
+        for step in steps:
+            _check(step, last_index, seen)
+            last_index = step.index
+            _, dep = failed_dependency(step, {})
+            if dep is not None:
+                outcome: Outcome = (step, None, DependencyFailed(f"step {dep} failed"))
+            else:
+                try:
+                    outcome = (step, run(step), None)
+                except Exception as e:
+                    outcome = (step, None, e)
+            if outcome[2] is not None:
+                failed.add(step.index)
+            yield outcome
+        return
+
+    lookahead = max(lookahead or 4 * max_workers, 1)
+    source = iter(steps)
+    exhausted = False
+    window: "OrderedDict[int, _Slot]" = OrderedDict()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage4-step") as pool:
+        running: Dict[Future, _Slot] = {}
+
+        def schedule_ready() -> None:
+            for slot in window.values():
+                if slot.state != "waiting":
+                    continue
+                ready, dep = failed_dependency(slot.step, window)
+                if not ready:
+                    continue
+                if dep is not None:
+                    slot.state, slot.error = "done", DependencyFailed(f"step {dep} failed")
+                else:
+                    slot.state = "running"
+                    running[pool.submit(run, slot.step)] = slot
+
+        while True:
+            while not exhausted and len(window) < lookahead:
+                step = next(source, None)
+                if step is None:
+                    exhausted = True
+                    break
+                _check(step, last_index, seen)
+                last_index = step.index
+                window[step.index] = _Slot(step)
+            schedule_ready()  # one pass in plan order also settles chains of skips
+
+            while window:
+                head = next(iter(window.values()))
+                if head.state != "done":
+                    break
+                del window[head.step.index]
+                if head.error is not None:
+                    failed.add(head.step.index)
+                yield head.step, head.result, head.error
+            if not window and exhausted:
+                return
+            if not running:
+                continue  # room in the window again; pull more steps
+
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in finished:
+                slot = running.pop(fut)
+                slot.state = "done"
+                slot.error = fut.exception()
+                if slot.error is None:
+                    slot.result = fut.result()
+                else:
+                    LOGGER.debug("Step %d failed: %s", slot.step.index, slot.error)
@@ -0,0 +1,214 @@
+"""Bounded, indexed short-term memory for the Stage 4 agents."""
+import json
+import logging
+import time
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence, TextIO, Union, overload
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Event:
+    """One remembered step outcome. ``__slots__`` keeps it at a fixed, small size."""
+
+    __slots__ = ("step", "tool", "description", "result", "timestamp")
+
+    def __init__(
+        self,
+        step: Optional[int],
+        tool: Optional[str],
+        description: str,
+        result: Optional[str],
+        timestamp: Optional[float] = None,
+    ) -> None:
+        self.step = step
+        self.tool = tool
+        self.description = description
+        self.result = result
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    def __str__(self) -> str:
+        if self.result is None:  # free-form entry from remember()
+            return self.description
+        step = f"{self.description} [tool:{self.tool}]" if self.tool else self.description
+        return f"Step {self.step}: {step} -> {self.result}"
+
+    def __repr__(self) -> str:
+        return f"Event({self.step!r}, {self.tool!r}, {self.result!r})"
+
+    def to_row(self) -> list:
+        return [self.step, self.tool, self.description, self.result, self.timestamp]
+
+
+class _SeqIndex:
+    """Ascending event sequence numbers for one key: 8 bytes each, O(1) amortized pop from the front."""
+
+    __slots__ = ("seqs", "head")
+
+    def __init__(self) -> None:
+        self.seqs = array("q")
+        self.head = 0
+
+    def __len__(self) -> int:
+        return len(self.seqs) - self.head
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.seqs[self.head :])
+
+    def append(self, seq: int) -> None:
+        self.seqs.append(seq)
+
+    def drop_oldest(self, seq: int) -> None:
+        if self.head < len(self.seqs) and self.seqs[self.head] == seq:
+            self.head += 1
+            if self.head >= 1024 and 2 * self.head >= len(self.seqs):
+                del self.seqs[: self.head]
+                self.head = 0
+
+
+class _RingView(Sequence[Event]):
+    """Read-only window over the ring buffer; creating one copies nothing."""
+
+    __slots__ = ("_memory", "_start", "_len")
+
+    def __init__(self, memory: "Memory", start: int, length: int) -> None:
+        self._memory = memory
+        self._start = start  # sequence number of the first event in the view
+        self._len = length
+
+    def __len__(self) -> int:
+        return self._len
+
+    @overload
+    def __getitem__(self, i: int) -> Event: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> List[Event]: ...
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Event, List[Event]]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._len))]
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("memory view index out of range")
+        return self._memory._at(self._start + i)
+
+
+class Memory:
+    """Fixed-capacity ring buffer of :class:`Event` records.
+
+    ``recent(k)`` returns an O(1) view; lookups by tool and by step index go
+    through secondary indexes that are trimmed as old events are evicted.
+    Evicted events are dropped, or appended to ``spill_path`` (one JSON array
+    per line, written in batches) when one is given. Intended for a single
+    writer (the Worker commits records from one thread).
+    """
+
+    def __init__(self, capacity: int = 10_000, spill_path: Optional[str] = None, spill_batch: int = 1024) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.spill_batch = spill_batch
+        self._ring: List[Optional[Event]] = [None] * capacity
+        self._next = 0  # sequence number of the next event
+        self._by_tool: Dict[Optional[str], _SeqIndex] = {}
+        self._by_step: Dict[Optional[int], _SeqIndex] = {}
+        self._spill_buffer: List[Event] = []
+        self._spill_file: Optional[TextIO] = None
+        self.spilled = 0
+
+    # ---- writing ------------------------------------------------------------
+    def record(self, step: Optional[int], tool: Optional[str], description: str, result: Optional[str]) -> Event:
+        event = Event(step, tool, description, result)
+        seq = self._next
+        slot = seq % self.capacity
+        old = self._ring[slot]
+        if old is not None:
+            self._evict(seq - self.capacity, old)
+        self._ring[slot] = event
+        for index, key in ((self._by_tool, tool), (self._by_step, step)):
+            seqs = index.get(key)
+            if seqs is None:
+                seqs = index[key] = _SeqIndex()
+            seqs.append(seq)
+        self._next = seq + 1
+        return event
+
+    def remember(self, entry: str) -> None:
+        """Free-form entry (kept for callers that log plain strings)."""
+        self.record(None, None, entry, None)
+
+    def _evict(self, seq: int, event: Event) -> None:
+        # the evicted event is the oldest overall, hence the oldest in its index lists
+        for index, key in ((self._by_tool, event.tool), (self._by_step, event.step)):
+            seqs = index[key]
+            seqs.drop_oldest(seq)
+            if seqs.head == len(seqs.seqs):
+                del index[key]
+        if self.spill_path:
+            self._spill_buffer.append(event)
+            if len(self._spill_buffer) >= self.spill_batch:
+                self.flush()
+
+    def flush(self) -> None:
+        """Write buffered evicted events to ``spill_path``."""
+        if not self._spill_buffer:
+            return
+        if self._spill_file is None:
+            self._spill_file = open(self.spill_path, "a", encoding="utf-8")
+        self._spill_file.writelines(json.dumps(e.to_row()) + "\n" for e in self._spill_buffer)
+        self._spill_file.flush()
+        self.spilled += len(self._spill_buffer)
+        self._spill_buffer.clear()
+
+    def close(self) -> None:
+        self.flush()
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    # ---- reading ------------------------------------------------------------
+    @property
+    def total(self) -> int:
+        """Events ever recorded, including evicted ones."""
+        return self._next
+
+    def __len__(self) -> int:
+        return min(self._next, self.capacity)
+
+    def _at(self, seq: int) -> Event:
+        return self._ring[seq % self.capacity]
+
+    def recent(self, limit: Optional[int] = None) -> Sequence[Event]:
+        """The most recent ``limit`` retained events (all if ``None``), oldest first, as a view."""
+        size = len(self)
+        k = size if limit is None else max(0, min(limit, size))
+        return _RingView(self, self._next - k, k)
+
+    def last(self) -> Optional[Event]:
+        return self._at(self._next - 1) if self._next else None
+
+    def recall(self) -> List[str]:
+        """Every retained event rendered as text, oldest first (O(n): prefer :meth:`recent`)."""
+        return [str(e) for e in self.recent()]
+
+    def by_tool(self, tool: Optional[str]) -> List[Event]:
+        return [self._at(seq) for seq in self._by_tool.get(tool, ())]
+
+    def by_step(self, step: Optional[int]) -> List[Event]:
+        return [self._at(seq) for seq in self._by_step.get(step, ())]
+
+    def spilled_events(self) -> Iterator[Event]:
+        """Read evicted events back from ``spill_path``, oldest first."""
+        if not self.spill_path:
+            return
+        self.flush()
+        try:
+            f = open(self.spill_path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                yield Event(*json.loads(line))
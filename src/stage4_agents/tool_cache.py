@@ -0,0 +1,167 @@
+"""Result cache for idempotent Stage 4 tools: LRU+TTL in memory, optional SQLite tier.
+
+Keys hash the tool name and its call arguments. Concurrent identical calls
+are coalesced: the first caller runs the tool, the others wait for its result.
+Failures are never cached.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+
+def tool_key(tool: str, args: Tuple[Any, ...] = (), kwargs: Optional[Dict[str, Any]] = None) -> str:
+    payload = json.dumps([tool, list(args), sorted((kwargs or {}).items())], default=repr, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _DiskTier:
+    """SQLite-backed results, with the tool name kept for per-tool invalidation."""
+
+    def __init__(self, path: str) -> None:
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tool_results (key TEXT PRIMARY KEY, tool TEXT, result TEXT, created REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS tool_results_tool ON tool_results (tool)")
+        self._lock = threading.Lock()
+
+    def get(self, key: str, ttl: float) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            row = self._db.execute("SELECT result, created FROM tool_results WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[1] > ttl:
+            return None
+        return row
+
+    def put(self, key: str, tool: str, result: str, created: float) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO tool_results VALUES (?, ?, ?, ?)", (key, tool, result, created))
+
+    def invalidate(self, tool: Optional[str]) -> None:
+        with self._lock:
+            if tool is None:
+                self._db.execute("DELETE FROM tool_results")
+            else:
+                self._db.execute("DELETE FROM tool_results WHERE tool = ?", (tool,))
+
+
+class ToolCache:
+    """Thread-safe cache shared by the Worker's step threads.
+
+    ``ttl`` is the default lifetime; :meth:`set_ttl` overrides it per tool.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, disk_path: Optional[str] = None) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._ttls: Dict[str, float] = {}
+        self._mem: "OrderedDict[str, Tuple[str, str, float]]" = OrderedDict()  # key -> (tool, result, created)
+        self._keys: Dict[str, Set[str]] = {}  # tool -> its keys in memory
+        self._disk = _DiskTier(disk_path) if disk_path else None
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def set_ttl(self, tool: str, ttl: Optional[float]) -> None:
+        if ttl is None:
+            self._ttls.pop(tool, None)
+        else:
+            self._ttls[tool] = ttl
+
+    def _count(self, tool: str, what: str) -> None:
+        counts = self._counts.setdefault(tool, {"hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0})
+        counts[what] += 1
+
+    def _store_mem(self, key: str, entry: Tuple[str, str, float]) -> None:
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        self._keys.setdefault(entry[0], set()).add(key)
+        while len(self._mem) > self.max_entries:
+            old_key, (old_tool, _, _) = self._mem.popitem(last=False)
+            self._keys[old_tool].discard(old_key)
+
+    def _lookup(self, tool: str, key: str) -> Optional[str]:
+        ttl = self._ttls.get(tool, self.ttl)
+        entry = self._mem.get(key)
+        if entry is not None:
+            if time.time() - entry[2] <= ttl:
+                self._mem.move_to_end(key)
+                return entry[1]
+            del self._mem[key]
+            self._keys[tool].discard(key)
+        if self._disk is not None:
+            row = self._disk.get(key, ttl)
+            if row is not None:
+                self._count(tool, "disk_hits")
+                self._store_mem(key, (tool, row[0], row[1]))
+                return row[0]
+        return None
+
+    def get_or_compute(self, tool: str, key: str, compute: Callable[[], str]) -> Tuple[str, str]:
+        """Return ``(result, source)`` where source is ``"hit"``, ``"coalesced"`` or ``"miss"``."""
+        with self._lock:
+            result = self._lookup(tool, key)
+            if result is not None:
+                self._count(tool, "hits")
+                return result, "hit"
+            waiting = self._inflight.get(key)
+            if waiting is None:
+                leader = Future()
+                self._inflight[key] = leader
+                self._count(tool, "misses")
+            else:
+                self._count(tool, "coalesced")
+
+        if waiting is not None:
+            return waiting.result(), "coalesced"
+
+        try:
+            result = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            leader.set_exception(e)
+            raise
+        created = time.time()
+        with self._lock:
+            self._store_mem(key, (tool, result, created))
+            del self._inflight[key]
+        if self._disk is not None:
+            self._disk.put(key, tool, result, created)
+        leader.set_result(result)
+        return result, "miss"
+
+    def invalidate(self, tool: Optional[str] = None) -> int:
+        """Drop cached results of ``tool`` (all tools if ``None``); returns the in-memory entries removed."""
+        with self._lock:
+            if tool is None:
+                removed = len(self._mem)
+                self._mem.clear()
+                self._keys.clear()
+            else:
+                keys = self._keys.pop(tool, set())
+                for key in keys:
+                    self._mem.pop(key, None)
+                removed = len(keys)
+        if self._disk is not None:
+            self._disk.invalidate(tool)
+        return removed
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-tool counters: hits, disk_hits, misses, coalesced."""
+        with self._lock:
+            return {tool: dict(counts) for tool, counts in self._counts.items()}
+
+    def summary(self) -> str:
+        stats = self.stats()
+        hits = sum(c["hits"] + c["coalesced"] for c in stats.values())
+        misses = sum(c["misses"] for c in stats.values())
+        per_tool = ", ".join(
+            f"{tool} {c['hits'] + c['coalesced']}/{c['misses']}" for tool, c in sorted(stats.items())
+        )
+        return f"Tool cache: {hits} hits / {misses} misses ({per_tool})"